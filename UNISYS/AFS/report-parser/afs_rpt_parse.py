@@ -6,12 +6,12 @@ afs_rpt_parser.py - UNISYS data report parser
 Author:  Ron Reidy, WFAS
 Creation date:
 
-This program runs under Python 2.7 or higher and Jython 2.7 or higher
+This program runs under Python 2.7 or Python 3, and Jython 2.7 or higher
 
 Synopsys: pyython afs_rpt_parse.py args
 
-usage: USRRPT_parser.py [-h] [-v] [-c] [-d FLD_DELIM] -i INFILE -t
-                        {empdwn,tslist,trnsec} [-b] -o OUTFILE
+usage: USRRPT_parser.py [-h] [-v] [-c] [-d FLD_DELIM] -i INFILE [INFILE ...]
+                        [-t {empdwn,tslist,trnsec}] [-b] -o OUTFILE
 
 AFS report parser
 
@@ -19,10 +19,74 @@ optional arguments:
   -h, --help            show this help message and exit
   -v, --version         show program's version number and exit
   -c, --copyright       print copyright statement and exit
-  -i INFILE, --infile INFILE
-                        name of file to parse
+  -i INFILE [INFILE ...], --infile INFILE [INFILE ...]
+                        report files, directories or glob patterns to parse
+                        ("-" for standard input; needs -t); gzip, bz2 and xz
+                        compressed reports are read directly
+  -o OUTPUT, --output OUTPUT
+                        CSV file name, Excel workbook name (.xlsx), directory,
+                        sqlite:path.db or "-" for standard output (default:
+                        <infile>.csv in the current directory)
   -t {empdwn,tslist}, --type {empdwn,tslist}
-                        Unisys report file type
+                        Unisys report file type (default: detected from the
+                        report title)
+  -s, --stream          write rows as they are parsed instead of buffering
+                        the whole report
+  -p, --pipeline        like -s/--stream, with reading, parsing and writing
+                        on three threads connected by bounded queues
+  -z {gz,bz2,xz}, --compress {gz,bz2,xz}
+                        compress CSV output named after the input (an -o name
+                        ending in .gz, .bz2 or .xz is always compressed)
+  -x, --xlsx            write Excel workbooks named after the input instead of
+                        CSV files (an -o name ending in .xlsx is always a
+                        workbook)
+  -r, --resume          keep a checkpoint next to the output and resume from
+                        it on the next run
+  --cache CACHE_DIR     directory for cached parse results (default: no cache)
+  --cache-size CACHE_SIZE
+                        cache size limit in MB (default: 1024)
+  -n, --normalized      write TSLIST reports as a transactions file and a
+                        transaction -> job ID file instead of one row per
+                        job ID
+  --pivot               write EMPDWN reports as one row per teller/employee
+                        with STATUS, AUTH LVL, PIN CHG and LAST LOGIN columns
+                        for each association
+  --rules RULES         write the rows that violate the audit rules in the JSON
+                        rule set RULES instead of the parsed report (needs
+                        numpy; see rptaudit.load_rules())
+  --entitlements        write TRNSEC reports as an employee x transaction
+                        matrix: one row per employee, one column per
+                        transaction code holding the authority level(s) that
+                        grant it
+  --who-can CODE        write the TRNSEC employees who can run transaction
+                        CODE; may be given more than once
+  --both A,B            write the TSLIST job IDs that can run both
+                        transaction A and transaction B (TRNSEC codes, TRX#
+                        numbers or code patterns); may be given more than once
+  --sod SOD             write the TSLIST transaction pairs that conflict under
+                        the segregation of duties rules in the JSON file SOD
+                        (see jobsets.load_rules())
+  --diff                compare two runs of a report (-i OLD NEW) and write the
+                        added, removed and changed records
+  --index INDEX         write a lookup index of the -i report to INDEX (with
+                        --query: the index to look up)
+  --query FIELD=VALUE   look FIELD=VALUE up in the --index INDEX and write the
+                        matching rows (default: to standard output); FIELD is
+                        empl_id, teller or name (EMPDWN, TRNSEC) or trx or job
+                        (TSLIST); may be given more than once
+  --join                join one EMPDWN, TSLIST and TRNSEC report into user ->
+                        level -> transaction rows
+  --join-key {teller,empl_id}
+                        match EMPDWN users to TRNSEC employees on teller
+                        number or employee ID (default: teller)
+  -w WORKERS, --workers WORKERS
+                        number of report files processed at once (default:
+                        number of CPUs)
+  -j JOBS, --jobs JOBS  number of processes used to parse report pages
+  --metrics METRICS     write per-phase metrics (time, input read, line
+                        counts, peak memory) for each report as JSON
+  --profile PROFILE     run under cProfile and write the stats to PROFILE
+                        (parsing done in other processes is not profiled)
   -d, --debug           enable debug logging
 
 This Python program will parse the following UNISYS mainframe reports that can be obtained
@@ -32,16 +96,20 @@ during fieldwork.
 import os
 import sys
 import atexit
+import signal
+import cProfile
 import logging
 import argparse
 import datetime
+import multiprocessing
 
 from os.path import basename
 from os.path import splitext
 
-import empdwn
-import trnsec
-import tslist
+import batch
+import rptdiff
+import rptindex
+import rptjoin
 
 _version      = "1.0"
 _author       = "Ron Reidy"
@@ -82,16 +150,18 @@ if __name__ == "__main__":
     formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - (%(filename)s:%(module)s:%(lineno)d) - %(message)s')
     ch.setFormatter(formatter)
     root.addHandler(ch)
-    
-    root.info("starting {0}".format(sys.argv[0]))
 
-    ap = argparse.ArgumentParser(
-        description = "Unisys/AFS report parser",
-        version     = "{0}: Release {1} Production on {2}".format(os.path.basename(sys.argv[0]),
-                                                                  _version,
-                                                                  datetime.datetime.now().strftime("%c")
-                                                                 )
-    )
+    version = "{0}: Release {1} Production on {2}".format(os.path.basename(sys.argv[0]),
+                                                          _version,
+                                                          datetime.datetime.now().strftime("%c")
+                                                         )
+    ap = argparse.ArgumentParser(description = "Unisys/AFS report parser")
+
+    ap.add_argument("-v", "--version",
+                    help    = "show program's version number and exit",
+                    action  = "version",
+                    version = version
+                   )
 
     ap.add_argument("-c", "--copyright",
                     dest    = "copyright",
@@ -102,18 +172,191 @@ if __name__ == "__main__":
 
     ap.add_argument("-i", "--infile",
                     dest     = "infile",
-                    help     = "name of file to parse",
+                    help     = "report files, directories or glob patterns to parse (\"-\" for standard input; needs -t); gzip, bz2 and xz compressed reports are read directly",
+                    action   = "store",
+                    nargs    = "+"
+                   )
+
+    ap.add_argument("-o", "--output",
+                    dest     = "output",
+                    help     = "CSV file name, Excel workbook name (.xlsx), directory, sqlite:path.db or \"-\" for standard output (default: <infile>.csv in the current directory)",
                     action   = "store",
-                    type     = argparse.FileType('r')
+                    default  = None
                    )
 
     ap.add_argument("-t", "--type",
                     dest     = "filetype",
-                    help     = "Unisys/AFS report file type",
+                    help     = "Unisys/AFS report file type (default: detected from the report title)",
                     action   = "store",
                     choices  = ['tslist', 'trnsec', 'empdwn']
                    )
 
+    ap.add_argument("-s", "--stream",
+                    dest    = "stream",
+                    help    = "write rows as they are parsed instead of buffering the whole report",
+                    action  = "store_true",
+                    default = False
+                   )
+
+    ap.add_argument("-p", "--pipeline",
+                    dest    = "pipeline",
+                    help    = "like -s/--stream, with reading, parsing and writing on three threads connected by bounded queues",
+                    action  = "store_true",
+                    default = False
+                   )
+
+    ap.add_argument("-z", "--compress",
+                    dest    = "compress",
+                    help    = "compress CSV output named after the input (an -o name ending in .gz, .bz2 or .xz is always compressed)",
+                    action  = "store",
+                    choices = ['gz', 'bz2', 'xz'],
+                    default = None
+                   )
+
+    ap.add_argument("-x", "--xlsx",
+                    dest    = "xlsx",
+                    help    = "write Excel workbooks named after the input instead of CSV files (an -o name ending in .xlsx is always a workbook)",
+                    action  = "store_true",
+                    default = False
+                   )
+
+    ap.add_argument("-r", "--resume",
+                    dest    = "resume",
+                    help    = "keep a checkpoint next to the output and resume from it on the next run",
+                    action  = "store_true",
+                    default = False
+                   )
+
+    ap.add_argument("--cache",
+                    dest    = "cache_dir",
+                    help    = "directory for cached parse results (default: no cache)",
+                    action  = "store",
+                    default = None
+                   )
+
+    ap.add_argument("--cache-size",
+                    dest    = "cache_size",
+                    help    = "cache size limit in MB (default: 1024)",
+                    action  = "store",
+                    type    = int,
+                    default = 1024
+                   )
+
+    ap.add_argument("-n", "--normalized",
+                    dest    = "normalized",
+                    help    = "write TSLIST reports as a transactions file and a transaction -> job ID file instead of one row per job ID",
+                    action  = "store_true",
+                    default = False
+                   )
+
+    ap.add_argument("--pivot",
+                    dest    = "pivot",
+                    help    = "write EMPDWN reports as one row per teller/employee with STATUS, AUTH LVL, PIN CHG and LAST LOGIN columns for each association",
+                    action  = "store_true",
+                    default = False
+                   )
+
+    ap.add_argument("--rules",
+                    dest    = "rules",
+                    help    = "write the rows that violate the audit rules in the JSON rule set RULES instead of the parsed report (needs numpy; see rptaudit.load_rules())",
+                    default = None
+                   )
+
+    ap.add_argument("--entitlements",
+                    dest    = "entitlements",
+                    help    = "write TRNSEC reports as an employee x transaction matrix: one row per employee, one column per transaction code holding the authority level(s) that grant it",
+                    action  = "store_true",
+                    default = False
+                   )
+
+    ap.add_argument("--who-can",
+                    dest    = "who_can",
+                    help    = "write the TRNSEC employees who can run transaction CODE; may be given more than once",
+                    metavar = "CODE",
+                    action  = "append",
+                    default = None
+                   )
+
+    ap.add_argument("--both",
+                    dest    = "both",
+                    help    = "write the TSLIST job IDs that can run both transaction A and transaction B (TRNSEC codes, TRX# numbers or code patterns); may be given more than once",
+                    metavar = "A,B",
+                    action  = "append",
+                    default = None
+                   )
+
+    ap.add_argument("--sod",
+                    dest    = "sod",
+                    help    = "write the TSLIST transaction pairs that conflict under the segregation of duties rules in the JSON file SOD (see jobsets.load_rules())",
+                    default = None
+                   )
+
+    ap.add_argument("--diff",
+                    dest    = "diff",
+                    help    = "compare two runs of a report (-i OLD NEW) and write the added, removed and changed records",
+                    action  = "store_true",
+                    default = False
+                   )
+
+    ap.add_argument("--index",
+                    dest    = "index",
+                    help    = "write a lookup index of the -i report to INDEX (with --query: the index to look up)",
+                    default = None
+                   )
+
+    ap.add_argument("--query",
+                    dest    = "query",
+                    help    = "look FIELD=VALUE up in the --index INDEX and write the matching rows (default: to standard output); FIELD is empl_id, teller or name (EMPDWN, TRNSEC) or trx or job (TSLIST); may be given more than once",
+                    metavar = "FIELD=VALUE",
+                    action  = "append",
+                    default = None
+                   )
+
+    ap.add_argument("--join",
+                    dest    = "join",
+                    help    = "join one EMPDWN, TSLIST and TRNSEC report into user -> level -> transaction rows",
+                    action  = "store_true",
+                    default = False
+                   )
+
+    ap.add_argument("--join-key",
+                    dest    = "join_key",
+                    help    = "match EMPDWN users to TRNSEC employees on teller number or employee ID (default: teller)",
+                    action  = "store",
+                    choices = rptjoin.rptjoin.JOIN_KEYS,
+                    default = 'teller'
+                   )
+
+    ap.add_argument("-w", "--workers",
+                    dest    = "workers",
+                    help    = "number of report files processed at once (default: number of CPUs)",
+                    action  = "store",
+                    type    = int,
+                    default = multiprocessing.cpu_count()
+                   )
+
+    ap.add_argument("-j", "--jobs",
+                    dest    = "jobs",
+                    help    = "number of processes used to parse report pages",
+                    action  = "store",
+                    type    = int,
+                    default = 1
+                   )
+
+    ap.add_argument("--metrics",
+                    dest    = "metrics",
+                    help    = "write per-phase metrics (time, input read, line counts, peak memory) for each report as JSON",
+                    action  = "store",
+                    default = None
+                   )
+
+    ap.add_argument("--profile",
+                    dest    = "profile",
+                    help    = "run under cProfile and write the stats to PROFILE (parsing done in other processes is not profiled)",
+                    action  = "store",
+                    default = None
+                   )
+
     ap.add_argument("-d", "--debug",
                     dest    = "debug",
                     help    = "enable debug logging",
@@ -123,27 +366,149 @@ if __name__ == "__main__":
 
     options = ap.parse_args()
 
+    if options.query and options.output is None:
+        options.output = "-"                # query results go to standard output by default
+
+    if options.output == "-":
+        #
+        #    standard output carries the rows: log to standard error, and exit
+        #    quietly when the reader goes away (e.g. "| head")
+        #
+        ch.stream = sys.stderr
+        if hasattr(signal, 'SIGPIPE'):
+            signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+
+    root.info("starting {0}".format(sys.argv[0]))
+
     if options.copyright:
-        print_copyright(ap.version)
+        print_copyright(version)
         ap.print_help()
         sys.exit(0)
         
+    if options.query and not options.index:
+        raise ValueError("error: argument --query needs --index")
+
+    if options.query:
+        try:
+            rptindex.rptindex(options.index, root, options.debug).query(options.query, options.output)
+        except (ValueError, Exception) as e:
+            root.critical(e)
+            sys.exit(1)
+        sys.exit(0)
+
     if not options.infile:
         raise ValueError("error: argument -i/--infile is required")
     
-    if not options.filetype:
-        raise ValueError("error: argument -t/--type is required")
+    if options.workers < 1:
+        raise ValueError("error: argument -w/--workers must be at least 1")
+
+    if options.jobs < 1:
+        raise ValueError("error: argument -j/--jobs must be at least 1")
+
+    if options.resume and options.jobs > 1:
+        raise ValueError("error: argument -r/--resume cannot be used with -j/--jobs")
+
+    if options.resume and options.cache_dir:
+        raise ValueError("error: argument -r/--resume cannot be used with --cache")
+
+    if options.diff and options.join:
+        raise ValueError("error: argument --diff cannot be used with --join")
+
+    if options.rules and (options.resume or options.cache_dir or options.pipeline or options.pivot or options.normalized):
+        raise ValueError("error: argument --rules cannot be used with -r/--resume, --cache, -p/--pipeline, --pivot or -n/--normalized")
+
+    if (options.entitlements or options.who_can) and (options.resume or options.cache_dir or options.pipeline or
+                                                      options.pivot or options.rules):
+        raise ValueError("error: arguments --entitlements and --who-can cannot be used with -r/--resume, --cache, -p/--pipeline, --pivot or --rules")
+
+    if (options.both or options.sod) and (options.resume or options.cache_dir or options.pipeline or
+                                          options.pivot or options.rules or options.entitlements or options.who_can):
+        raise ValueError("error: arguments --both and --sod cannot be used with -r/--resume, --cache, -p/--pipeline, --pivot, --rules, --entitlements or --who-can")
+
+    if options.both and options.sod:
+        raise ValueError("error: argument --both cannot be used with --sod")
+
+    for pair in options.both or []:
+        if len(pair.split(',')) != 2 or not all(name.strip() for name in pair.split(',')):
+            raise ValueError("error: argument --both: expected two transactions A,B, found \"{0}\"".format(pair))
+
+    if options.pivot and (options.resume or options.cache_dir or options.pipeline):
+        raise ValueError("error: argument --pivot cannot be used with -r/--resume, --cache or -p/--pipeline")
+
+    if options.pipeline and (options.resume or options.cache_dir):
+        raise ValueError("error: argument -p/--pipeline cannot be used with -r/--resume or --cache")
+
+    if options.resume and options.normalized:
+        raise ValueError("error: argument -r/--resume cannot be used with -n/--normalized")
+
+    if options.infile and "-" in options.infile:
+        if len(options.infile) != 1:
+            raise ValueError("error: argument -i/--infile: \"-\" cannot be combined with other reports")
+        if not options.filetype:
+            raise ValueError("error: argument -t/--type is required with -i -")
+        if options.jobs > 1 or options.resume or options.cache_dir or options.join or options.diff:
+            raise ValueError("error: argument -i - cannot be used with -j/--jobs, -r/--resume, --cache, --join or --diff")
+
+    if options.compress and options.resume:
+        raise ValueError("error: argument -z/--compress cannot be used with -r/--resume")
+
+    is_xlsx = options.xlsx or (options.output or "").lower().endswith(".xlsx")
+    if is_xlsx and (options.resume or options.compress or options.output == "-"):
+        raise ValueError("error: Excel output cannot be used with -r/--resume, -z/--compress or -o -")
+
+    if options.output == "-" and (options.resume or options.normalized):
+        raise ValueError("error: argument -o - cannot be used with -r/--resume or -n/--normalized")
+
+    if options.infile == ["-"] or options.output == "-":
+        options.stream = True               # rows flow through the pipeline as they are parsed
     
     try:
-        if options.filetype == 'userdatafile':
-            fp = empdwn.empdwn(options.infile, root, options.debug)
-        elif options.filetype == 'tslist':
-            fp = tslist.tslist(options.infile, root, options.debug)
-        elif options.filetype == 'trnsec':
-            fp = trnsec.trnsec(options.infile, root, options.debug)
-            
-        fp.parse()
-        fp.write_data()
+        reports = batch.expand_inputs(options.infile)
+        if len(reports) == 0:
+            raise ValueError("no report files found for -i/--infile {0}".format(" ".join(options.infile)))
+
+        if options.index:
+            if len(reports) != 1 or reports == ["-"]:
+                raise ValueError("error: argument --index needs exactly one report file")
+            rptindex.rptindex(options.index, root, options.debug).build(reports[0])
+            sys.exit(0)
+
+        if options.diff:
+            rptdiff.open_reports(options.infile, root, options.debug).write_data(options.output)
+            sys.exit(0)
+
+        if options.join:
+            rptjoin.open_reports(reports, root, options.join_key, options.debug).write_data(options.output)
+            sys.exit(0)
+
+        if len(reports) > 1:
+            if options.output is not None and not os.path.isdir(options.output):
+                raise ValueError("error: argument -o/--output must be a directory when parsing more than one report")
+
+            if options.jobs > 1 and options.workers > 1:
+                raise ValueError("error: argument -j/--jobs needs -w 1 when parsing more than one report")
+
+        if options.profile and (options.jobs > 1 or (options.workers > 1 and len(reports) > 1)):
+            root.warning("--profile only covers this process; use -w 1 -j 1 to profile the parse")
+
+        profiler = None
+        if options.profile:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            summaries = batch.run(reports, options, root)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(options.profile)
+                root.info("profile written to {0} (see the pstats module)".format(options.profile))
+
+        if options.metrics:
+            batch.write_metrics(summaries, options.metrics)
+            root.info("metrics written to {0}".format(options.metrics))
+
+        if len([summary for summary in summaries if summary['error'] is not None]) != 0:
+            sys.exit(1)
 
     except (ValueError, Exception) as e:
         root.critical(e)
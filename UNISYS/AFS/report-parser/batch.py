@@ -0,0 +1,275 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+import os
+import sys
+import glob
+import json
+import logging
+import datetime
+import multiprocessing
+from os.path import basename
+from os.path import splitext
+
+import empdwn
+import trnsec
+import tslist
+import shard
+import pipeline
+import pivot
+import entitlements
+import jobsets
+import rptaudit
+import rptcache
+import checkpoint
+import compress
+import codec
+
+REPORT_TYPES = {
+    'empdwn': empdwn.empdwn,
+    'tslist': tslist.tslist,
+    'trnsec': trnsec.trnsec,
+}
+
+def detect_type(fname):
+    """
+    detect_type - return the report type named by the title in the first line of
+                  'fname', or None if it is not a known report
+    """
+    fp = compress.open_report(fname)
+    try:
+        line = codec.to_str(next(iter(fp), b""))
+    finally:
+        fp.close()
+
+    for (filetype, cls) in sorted(REPORT_TYPES.items()):
+        if cls.REPORT_TITLE in line:
+            return filetype
+
+    return None
+
+def expand_inputs(args):
+    """
+    expand_inputs - expand -i/--infile arguments (files, directories and glob
+                    patterns) into a sorted list of report file names; "-"
+                    (standard input) is passed through as is
+    """
+    fnames = []
+    for arg in args:
+        if arg == "-":
+            matches = [arg]
+        elif os.path.isdir(arg):
+            matches = [os.path.join(arg, name) for name in os.listdir(arg) if not name.startswith(".")]
+        elif glob.has_magic(arg):
+            matches = glob.glob(arg)
+        else:
+            matches = [arg]
+
+        for fname in sorted(matches):
+            if os.path.isdir(fname):
+                continue
+            if fname not in fnames:
+                fnames.append(fname)
+
+    return fnames
+
+def output_for(fname, output, ext=".csv"):
+    """
+    output_for - output specification for one report: -o/--output as given, or
+                 <report><ext> inside -o/--output when it is a directory (or
+                 the current directory when -o/--output is not given and
+                 'ext' is not ".csv", e.g. ".csv.gz" for compressed output or
+                 ".xlsx")
+    """
+    if output is None and ext != ".csv":
+        output = os.getcwd()
+
+    if output is not None and os.path.isdir(output):
+        base = splitext(basename(compress.strip_suffix(fname)))[0]
+        return os.path.join(output, base + ext)
+
+    return output
+
+def output_ext(options):
+    """
+    output_ext - the extension of the output files selected by 'options'
+    """
+    if options.xlsx:
+        return ".xlsx"
+    if options.compress:
+        return ".csv." + options.compress
+    return ".csv"
+
+def check_outputs(fnames, options):
+    """
+    check_outputs - raise ValueError when two of 'fnames' would be written to
+                    the same output file (e.g. a/empdwn.txt and b/empdwn.txt,
+                    or tslist.txt and tslist.txt.gz), which would otherwise
+                    overwrite one another
+    """
+    ext = output_ext(options)
+    seen = {}
+    for fname in fnames:
+        output = output_for(fname, options.output, ext)
+        if output is None:                  # see sinks.open_sink()
+            output = os.path.join(os.getcwd(), splitext(basename(compress.strip_suffix(fname)))[0] + ext)
+        output = os.path.abspath(output)
+        if output in seen:
+            raise ValueError("{0} and {1} would both be written to {2}; parse them in separate runs or to different -o/--output directories".format(
+                             seen[output], fname, output))
+        seen[output] = fname
+
+def process_report(fname, filetype, options, logger):
+    """
+    process_report - parse one report and write its output as selected by
+                     'options'; returns the number of rows written and the
+                     parser's metrics (see metrics.py)
+    """
+    infile = getattr(sys.stdin, 'buffer', sys.stdin) if fname == "-" else compress.open_report(fname)
+    try:
+        fp = REPORT_TYPES[filetype](infile, logger, options.debug)
+        output = output_for(fname, options.output, output_ext(options))
+        if options.normalized and filetype == 'tslist':
+            fp.normalized = True
+
+        is_compressed = isinstance(infile, compress.decompressed)
+        if is_compressed and options.resume:
+            raise ValueError("compressed reports cannot be parsed with -r/--resume")
+
+        rows = None
+        if options.jobs > 1 and is_compressed:
+            logger.warning("{0}: compressed report, parsing in one process (-j/--jobs ignored)".format(fname))
+        elif options.jobs > 1:
+            rows = shard.records(fp, options.jobs)
+
+        if options.rules:
+            ruleset = rptaudit.load_rules(options.rules)
+            written = rptaudit.rptaudit(fp, filetype, ruleset, logger, rows, options.debug).write_data(output)
+        elif options.pivot and filetype == 'empdwn':
+            written = pivot.pivot(fp, logger, rows, debug=options.debug).write_data(output)
+        elif (options.entitlements or options.who_can) and filetype == 'trnsec':
+            written = entitlements.entitlements(fp, logger, rows, options.who_can, options.debug).write_data(output)
+        elif (options.both or options.sod) and filetype == 'tslist':
+            both = [tuple(pair.split(',')) for pair in options.both or []]
+            ruleset = jobsets.load_rules(options.sod) if options.sod else None
+            written = jobsets.jobsets(fp, logger, rows, both, ruleset, options.debug).write_data(output)
+        elif options.resume:
+            written = checkpoint.run(fp, output)
+        elif options.cache_dir:
+            cache = rptcache.rptcache(options.cache_dir, options.cache_size * 1024 * 1024, logger)
+            if not cache.load(fp):
+                fp.parse(rows)
+                cache.store(fp)
+            written = fp.write_data(output)
+        elif options.pipeline:
+            written = pipeline.run(fp, rows, output)
+        elif options.stream:
+            written = fp.stream_data(rows, output)
+        else:
+            fp.parse(rows)
+            written = fp.write_data(output)
+
+        return (written, fp.metrics)
+    finally:
+        if fname != "-":
+            infile.close()          # stops a decompressed report's reader thread
+
+def _process(args):
+    (fname, filetype, options, logger_name) = args
+    logger = logging.getLogger(logger_name)
+    summary = {'file': fname, 'type': filetype, 'bytes': 0, 'rows': 0, 'error': None, 'phases': []}
+
+    start_tm = datetime.datetime.now()
+    try:
+        if fname != "-":
+            summary['bytes'] = os.path.getsize(fname)
+        if filetype is None:
+            filetype = summary['type'] = detect_type(fname)
+        if filetype is None:
+            raise ValueError("not an EMPDWN, TSLIST or TRNSEC report")
+
+        (summary['rows'], parse_metrics) = process_report(fname, filetype, options, logger)
+        summary['phases'] = parse_metrics.phases
+        if fname == "-" or isinstance(parse_metrics.parser.fp, compress.decompressed):
+            summary['bytes'] = parse_metrics.parser.io_stats['bytes']      # as parsed, not as stored
+    except Exception as e:
+        logger.critical("{0}: {1}".format(fname, e))
+        summary['error'] = str(e)
+
+    summary['seconds'] = max((datetime.datetime.now() - start_tm).total_seconds(), 1e-6)
+    return summary
+
+def _log_summary(summary, logger):
+    if summary['error'] is not None:
+        logger.info("{0}: FAILED ({1})".format(summary['file'], summary['error']))
+        return
+
+    logger.info("{0}: {1} {2:d} rows, {3:.1f} MB in {4:.2f}s ({5:.1f} MB/s, {6:.0f} rows/s)".format(
+                    summary['file'],
+                    summary['type'],
+                    summary['rows'],
+                    summary['bytes'] / 1048576.0,
+                    summary['seconds'],
+                    summary['bytes'] / 1048576.0 / summary['seconds'],
+                    summary['rows'] / summary['seconds']
+                )
+               )
+
+def run(fnames, options, logger):
+    """
+    run - process 'fnames' on a pool of at most options.workers processes
+
+    The report type is options.filetype, or detected from each file's first line
+    when it is not given.  A summary of rows and throughput is logged for each
+    file as it finishes and for the batch as a whole.  Raises ValueError,
+    before any file is processed, when two files would have the same output
+    (see check_outputs()).  Returns the list of
+    per-file summaries (a failed file has 'error' set; 'phases' holds the
+    metrics.py measurements of each phase).
+    """
+    start_tm = datetime.datetime.now()
+    if len(fnames) > 1:
+        check_outputs(fnames, options)
+    work = [(fname, options.filetype, options, logger.name) for fname in fnames]
+
+    summaries = []
+    workers = min(options.workers, len(work))
+    if workers <= 1:
+        for args in work:
+            summaries.append(_process(args))
+            _log_summary(summaries[-1], logger)
+    else:
+        pool = multiprocessing.Pool(workers)
+        try:
+            for summary in pool.imap_unordered(_process, work):
+                summaries.append(summary)
+                _log_summary(summary, logger)
+        finally:
+            pool.close()
+            pool.join()
+
+    if len(summaries) > 1:
+        seconds = max((datetime.datetime.now() - start_tm).total_seconds(), 1e-6)
+        total_bytes = sum(summary['bytes'] for summary in summaries)
+        logger.info("batch: {0:d} files ({1:d} failed), {2:d} rows, {3:.1f} MB in {4:.2f}s ({5:.1f} MB/s)".format(
+                        len(summaries),
+                        len([summary for summary in summaries if summary['error'] is not None]),
+                        sum(summary['rows'] for summary in summaries),
+                        total_bytes / 1048576.0,
+                        seconds,
+                        total_bytes / 1048576.0 / seconds
+                    )
+                   )
+
+    return summaries
+
+def write_metrics(summaries, fname):
+    """
+    write_metrics - save the per-file summaries returned by run(), with the
+                    metrics of each phase, as JSON
+    """
+    with open(fname, "w") as fp:
+        json.dump(summaries, fp, indent=1, sort_keys=True)
@@ -0,0 +1,214 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+import os
+import sys
+import json
+import logging
+import argparse
+import datetime
+import platform
+import subprocess
+import multiprocessing
+from os.path import basename
+from os.path import splitext
+
+import batch
+import rptgen
+import pipeline
+import metrics
+
+DEFAULT_SIZES = "10M,100M,1G,5G"
+MODES         = ('buffered', 'stream', 'pipeline')
+
+def _commit():
+    try:
+        with open(os.devnull, "wb") as null:
+            return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                           cwd=os.path.dirname(os.path.abspath(__file__)),
+                                           stderr=null).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _run(args):
+    #
+    #    runs in a fresh process so peak memory is that of this run alone
+    #
+    (filetype, fname, mode, output) = args
+    logger = logging.getLogger("benchmark_run")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    parser = batch.REPORT_TYPES[filetype](open(fname, "rb"), logger)
+    if mode == 'stream':
+        rows = parser.stream_data(output=output)
+    elif mode == 'pipeline':
+        rows = pipeline.run(parser, output=output)
+    else:
+        parser.parse()
+        rows = parser.write_data(output)
+
+    return (rows, parser.metrics.phases, metrics.peak_memory())
+
+def measure(filetype, fname, mode, output):
+    """
+    measure - parse 'fname' and write it to 'output' in a new process; returns
+              a result dictionary (see run())
+    """
+    pool = multiprocessing.Pool(1)
+    try:
+        (rows, phases, peak) = pool.apply(_run, ((filetype, fname, mode, output),))
+    finally:
+        pool.terminate()
+        pool.join()
+
+    nbytes  = os.path.getsize(fname)
+    phases  = dict((phase['phase'], phase) for phase in phases)
+    seconds = sum(phase['wall_seconds'] for (name, phase) in phases.items() if name != 'init')
+    seconds = max(seconds, 1e-6)
+    result = {
+        'bytes':           nbytes,
+        'rows':            rows,
+        'seconds':         seconds,
+        'mb_per_second':   nbytes / 1048576.0 / seconds,
+        'rows_per_second': rows / seconds,
+        'cpu_seconds':     sum(phase['cpu_seconds'] for phase in phases.values()),
+        'peak_memory':     peak,
+    }
+    if 'parse' in phases:
+        result['parse_mb_per_second']   = nbytes / 1048576.0 / max(phases['parse']['wall_seconds'], 1e-6)
+        result['write_rows_per_second'] = rows / max(phases['write']['wall_seconds'], 1e-6)
+
+    return result
+
+def load_results(fname):
+    """
+    load_results - results saved by earlier runs (one JSON object per line)
+    """
+    if not os.path.exists(fname):
+        return []
+
+    with open(fname, "r") as fp:
+        return [json.loads(line) for line in fp if line.strip()]
+
+def _previous(results, result):
+    for saved in reversed(results):
+        if (saved['type'], saved['mode'], saved['size']) == (result['type'], result['mode'], result['size']):
+            return saved
+    return None
+
+def run(types, sizes, modes, data_dir, results_name, logger, max_buffered=None, threshold=10.0):
+    """
+    run - benchmark each report type, size and mode
+
+    Reports are generated by rptgen.py into 'data_dir' (and reused by later
+    runs); output is written next to them and removed after each run.  Each
+    result (throughput in MB/s and rows/s, CPU time and peak memory, plus the
+    parser VERSION, git commit and Python version) is appended as a JSON line
+    to 'results_name' and compared with the last saved result for the same
+    type, size and mode; a drop in MB/s of more than 'threshold' percent is
+    logged as a regression.  Buffered runs of reports larger than
+    'max_buffered' bytes are skipped.  Returns the number of regressions.
+    """
+    if not os.path.isdir(data_dir):
+        os.makedirs(data_dir)
+
+    saved = load_results(results_name)
+    commit = _commit()
+    regressions = 0
+    for filetype in types:
+        for size in sizes:
+            nbytes = rptgen.parse_size(size)
+            fname = os.path.join(data_dir, "{0}_{1}.txt".format(filetype, size))
+            if not os.path.exists(fname) or os.path.getsize(fname) < nbytes:
+                logger.info("generating {0}".format(fname))
+                rptgen.generate(filetype, fname, nbytes)
+
+            for mode in modes:
+                if mode == 'buffered' and max_buffered is not None and nbytes > max_buffered:
+                    logger.info("{0} {1}: skipping buffered mode (larger than --max-buffered)".format(filetype, size))
+                    continue
+
+                output = os.path.join(data_dir, "{0}_{1}.csv".format(filetype, size))
+                try:
+                    result = measure(filetype, fname, mode, output)
+                finally:
+                    if os.path.exists(output):
+                        os.remove(output)
+
+                result.update({
+                    'date':    datetime.datetime.now().isoformat(),
+                    'type':    filetype,
+                    'size':    size,
+                    'mode':    mode,
+                    'version': batch.REPORT_TYPES[filetype].VERSION,
+                    'commit':  commit,
+                    'python':  platform.python_version(),
+                })
+
+                msg = "{0} {1} {2}: {3:.1f} MB/s, {4:.0f} rows/s, peak memory {5}".format(
+                          filetype, size, mode, result['mb_per_second'], result['rows_per_second'],
+                          "{0:.0f} MB".format(result['peak_memory'] / 1048576.0) if result['peak_memory'] else "n/a")
+                change = None
+                previous = _previous(saved, result)
+                if previous is not None:
+                    change = (result['mb_per_second'] / previous['mb_per_second'] - 1.0) * 100.0
+                    msg += " ({0:+.1f}% vs {1} {2})".format(change, previous['commit'] or "", previous['date'])
+
+                if change is not None and change < -threshold:
+                    regressions += 1
+                    logger.warning("regression: " + msg)
+                else:
+                    logger.info(msg)
+
+                with open(results_name, "a") as fp:
+                    fp.write(json.dumps(result, sort_keys=True) + "\n")
+                saved.append(result)
+
+    return regressions
+
+if __name__ == "__main__":
+    start_time = datetime.datetime.now()
+
+    root = logging.getLogger(splitext(basename(sys.argv[0]))[0])
+    root.setLevel(logging.DEBUG)
+    ch = logging.StreamHandler(sys.stdout)
+    ch.setLevel(logging.DEBUG)
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - (%(filename)s:%(module)s:%(lineno)d) - %(message)s')
+    ch.setFormatter(formatter)
+    root.addHandler(ch)
+
+    ap = argparse.ArgumentParser(description = "Unisys/AFS report parser throughput benchmark")
+    ap.add_argument("-t", "--types", dest="types", default="empdwn,tslist,trnsec",
+                    help="comma separated report types (default: empdwn,tslist,trnsec)")
+    ap.add_argument("-s", "--sizes", dest="sizes", default=DEFAULT_SIZES,
+                    help="comma separated report sizes (default: {0})".format(DEFAULT_SIZES))
+    ap.add_argument("-m", "--modes", dest="modes", default=",".join(MODES),
+                    help="comma separated modes: buffered (parse, then write), stream and/or pipeline (default: buffered,stream,pipeline)")
+    ap.add_argument("--data-dir", dest="data_dir", default="bench_data",
+                    help="directory for generated reports (default: bench_data)")
+    ap.add_argument("--results", dest="results", default="bench_results.jsonl",
+                    help="file results are appended to (default: bench_results.jsonl)")
+    ap.add_argument("--max-buffered", dest="max_buffered", default="1G",
+                    help="largest report run in buffered mode (default: 1G)")
+    ap.add_argument("--threshold", dest="threshold", type=float, default=10.0,
+                    help="MB/s drop in percent reported as a regression (default: 10)")
+    options = ap.parse_args()
+
+    types = options.types.split(",")
+    modes = options.modes.split(",")
+    for filetype in types:
+        if filetype not in batch.REPORT_TYPES:
+            ap.error("unknown report type \"{0}\"".format(filetype))
+    for mode in modes:
+        if mode not in MODES:
+            ap.error("unknown mode \"{0}\"".format(mode))
+
+    regressions = run(types, options.sizes.split(","), modes, options.data_dir, options.results, root,
+                      rptgen.parse_size(options.max_buffered), options.threshold)
+    root.info("benchmark complete: {0:d} regressions (elapsed time: {1})".format(regressions,
+                                                                                datetime.datetime.now() - start_time))
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,201 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+import os
+import json
+import mmap
+import hashlib
+import datetime
+
+import lineio
+import sinks
+
+CHECKPOINT_BYTES = 32 * 1024 * 1024         # input parsed between checkpoints
+HASH_BLOCK       = 16 * 1024 * 1024
+
+def _load(ckpt_name):
+    if not os.path.exists(ckpt_name):
+        return None
+
+    with open(ckpt_name, "r") as fp:
+        return json.load(fp)
+
+def _save(ckpt_name, ckpt):
+    tmp_name = "{0}.tmp".format(ckpt_name)
+    with open(tmp_name, "w") as fp:
+        json.dump(ckpt, fp, indent=1, sort_keys=True)
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.rename(tmp_name, ckpt_name)
+
+def _save_state(parser):
+    #
+    #    JSON has no tuple dictionary keys (e.g. trnsec 'transaction_codes',
+    #    keyed by (assn, level)): such a dictionary is saved as its items
+    #
+    state = {}
+    for attr in parser.RESUME_STATE:
+        val = getattr(parser, attr)
+        if isinstance(val, dict) and any(isinstance(key, tuple) for key in val):
+            val = {'items': [[list(key), v] for (key, v) in val.items()]}
+        state[attr] = val
+    return state
+
+def _load_state(parser, state):
+    for (attr, val) in state.items():
+        if isinstance(val, dict) and list(val) == ['items']:
+            val = dict((tuple(key), v) for (key, v) in val['items'])
+        setattr(parser, attr, val)
+
+def _prefix_hash(mm, offset):
+    hasher = hashlib.sha1()
+    pos = 0
+    while pos < offset:
+        hasher.update(mm[pos:min(pos + HASH_BLOCK, offset)])
+        pos += HASH_BLOCK
+
+    return hasher
+
+def _chunks(parser, mm, start, size):
+    """
+    _chunks - split [start, size) at page header lines into ranges of about
+              CHECKPOINT_BYTES
+
+    Yields (start, end, final) tuples.  The last page of the report gets a range
+    of its own with final set, since it may still be growing or may have been
+    cut short by a crash; checkpoints are only taken before it.
+    """
+    cstart = start
+    last_page = start
+    for mtch in parser.PAGE_HDR.finditer(mm, start, size):
+        offset = mtch.start()
+        if offset == cstart:
+            continue
+        if offset - cstart >= CHECKPOINT_BYTES:
+            yield (cstart, offset, False)
+            cstart = offset
+        last_page = offset
+
+    if last_page > cstart:
+        yield (cstart, last_page, False)
+
+    yield (last_page, size, True)
+
+def _records(parser, sink, mm, start, size, hasher, progress):
+    fname = parser.fp.name
+    for (cstart, cend, final) in _chunks(parser, mm, start, size):
+        parser.fp = lineio.filerange(fname, cstart, cend)
+        for buf in parser.records():
+            yield buf
+
+        if final:
+            break
+
+        #
+        #    all rows of the chunk have been handed to the sink by the time the
+        #    next row is asked for
+        #
+        hasher.update(mm[cstart:cend])
+        if progress['sink_open']:
+            _save(sink.checkpoint_name, {
+                'input':      os.path.abspath(fname),
+                'offset':     cend,
+                'sha1':       hasher.hexdigest(),
+                'output_pos': sink.checkpoint(),
+                'version':    parser.VERSION,
+                'state':      _save_state(parser),
+            })
+
+def run(parser, output=None):
+    """
+    run - parse parser.fp into 'output', resuming from the checkpoint sidecar
+
+    The sidecar (see the sinks' 'checkpoint_name') records, for the last fully
+    parsed page boundary, the byte offset in the input, the parser's VERSION
+    and 'RESUME_STATE' attributes, the output position and a SHA-1 of the input up
+    to that offset.  When the sidecar matches the input, parsing starts at the
+    saved offset, anything written after the saved output position is dropped
+    and only new rows are appended.  Otherwise the whole report is parsed and
+    the output replaced, as it is when the output is gone or shorter than
+    the saved position (see the sinks' can_resume()).  Returns the number of
+    rows written.
+    """
+    parser.metrics.start('stream')
+    start_tm = datetime.datetime.now()
+    orig_fp = parser.fp
+    fname = parser.fp.name
+    size  = os.path.getsize(fname)
+    sink  = sinks.open_sink(parser, output)
+    ckpt  = _load(sink.checkpoint_name)
+
+    if size == 0:
+        raise ValueError("{0}: empty report".format(fname))
+
+    with open(fname, "rb") as fp:
+        mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+    parsed = None
+    try:
+        #
+        #    a last line without a newline may still be being written; leave it
+        #    for the next run
+        #
+        size = mm.rfind(b"\n") + 1 or size
+
+        start      = 0
+        resume_pos = None
+        hasher     = hashlib.sha1()
+        if ckpt is not None and ckpt.get('version') != parser.VERSION:
+            parser.logger.warning("{0}: {1} is from another parser version, parsing from the start".format(
+                                  fname, sink.checkpoint_name))
+        elif ckpt is not None and (ckpt['output_pos'] is None or not sink.can_resume(ckpt['output_pos'])):
+            parser.logger.warning("{0}: output is missing or shorter than when {1} was saved, parsing from the start".format(
+                                  fname, sink.checkpoint_name))
+        elif ckpt is not None and ckpt['input'] == os.path.abspath(fname) and ckpt['offset'] <= size:
+            hasher = _prefix_hash(mm, ckpt['offset'])
+            if hasher.hexdigest() == ckpt['sha1']:
+                start      = ckpt['offset']
+                resume_pos = ckpt['output_pos']
+                _load_state(parser, ckpt['state'])
+                parser.logger.info("{0}: resuming at byte {1:d} from {2}".format(fname, start, sink.checkpoint_name))
+            else:
+                parser.logger.warning("{0}: input changed since {1}, parsing from the start".format(fname,
+                                                                                                   sink.checkpoint_name
+                                                                                                  )
+                                     )
+                hasher = hashlib.sha1()
+
+        progress = {'sink_open': False}
+        parsed = _records(parser, sink, mm, start, size, hasher, progress)
+        first = next(parsed, None)
+        sink.open(parser.column_hdrs, resume_pos)
+        progress['sink_open'] = True
+        try:
+            written = 0
+            if first is not None:
+                written += sink.write([first])
+            written += sink.write(parsed)
+        finally:
+            sink.close()
+    finally:
+        #
+        #    a suspended _records() holds a view of the map, and closing the map
+        #    under it would raise BufferError in place of the error being raised
+        #
+        if parsed is not None:
+            parsed.close()
+        mm.close()
+        parser.fp = orig_fp
+
+    end_tm = datetime.datetime.now()
+    parser.logger.info("{0}: {1:d} rows written from byte {2:d} (elapsed time: {3})".format(fname,
+                                                                                           written,
+                                                                                           start,
+                                                                                           end_tm - start_tm
+                                                                                          )
+                      )
+    parser.metrics.stop('stream', written)
+    return written
@@ -0,0 +1,56 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+import lineio
+
+#
+#    line classes (also the keys of the parsers' 'line_counts', see metrics.py)
+#
+HEADER        = 'header'
+COLUMN_HEADER = 'column header'
+SEPARATOR     = 'separator'
+DATA          = 'data'
+INDENTED      = 'indented'
+SKIPPED       = 'skipped'
+
+def prefix_table(prefixes):
+    """
+    prefix_table - build the dispatch table for lines() from (prefix, class) pairs
+
+    Prefixes are grouped by their first character, so a line whose first
+    character starts no prefix is classified with one dictionary lookup.
+    Within a group, prefixes are tried in the order given.
+    """
+    table = {}
+    for (prefix, cls) in prefixes:
+        table.setdefault(prefix[:1], []).append((prefix, len(prefix), cls))
+
+    return dict((first, tuple(entries)) for (first, entries) in table.items())
+
+def lines(fp, table, default, use_mmap=True, stats=None):
+    """
+    lines - iterate the lines of a report as (class, buffer, start, end) tuples
+
+    Lines come from lineio.lines() (see there for 'buffer', 'start' and 'end';
+    the newline is already excluded).  Each line is classified once, by the
+    first entry of 'table' (see prefix_table()) that prefixes it, or as
+    'default'.  Parsers only run their regular expressions on the classes
+    that need capture groups, so most data lines reach the decoder after a
+    single dictionary lookup.
+    """
+    get = table.get
+    for (buf, pos, end) in lineio.lines(fp, use_mmap, stats):
+        entries = get(buf[pos:pos + 1])
+        if entries is None:
+            yield (default, buf, pos, end)
+            continue
+
+        for (prefix, size, cls) in entries:
+            if pos + size <= end and buf[pos:pos + size] == prefix:
+                yield (cls, buf, pos, end)
+                break
+        else:
+            yield (default, buf, pos, end)
@@ -0,0 +1,231 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+import struct
+import datetime
+
+#
+#    Reports are parsed as bytes; only the fields that reach the output are
+#    decoded.  Latin-1 maps every byte to one character, so decoding never
+#    fails and re-encoding the output gives back the report's bytes.
+#
+ENCODING = 'latin-1'
+
+if str is bytes:                                # Python 2: bytes are already str
+    to_str = lambda b: b
+    _DECODE = "{0}"
+else:
+    to_str = lambda b: b.decode(ENCODING)
+    _DECODE = "{0}.decode('" + ENCODING + "')"
+
+DATE_FORMAT = "%m/%d/%y"                        # dates in the reports: MM/DD/YY, month may be 1 digit
+MEMO_MAX    = 8192                              # values remembered per column (see memo)
+
+class rptdate(datetime.date):
+    """
+    rptdate - a report date: a datetime.date that prints as it appears in the
+              report, so CSV output is unchanged; sinks.py writes it as a date
+    """
+
+    __slots__ = ('text',)
+
+    def __new__(cls, text):
+        date = datetime.datetime.strptime(text.strip(), DATE_FORMAT)
+        self = datetime.date.__new__(cls, date.year, date.month, date.day)
+        self.text = text
+        return self
+
+    def __reduce__(self):
+        return (rptdate, (self.text,))          # pickled by shard.py workers
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return "rptdate({0!r})".format(self.text)
+
+    def __format__(self, spec):
+        return format(self.text, spec)
+
+def plain(values):
+    """
+    plain - 'values' with dates back as their report text, for marshal
+    """
+    return [value.text if isinstance(value, rptdate) else value for value in values]
+
+class memo(object):
+    """
+    memo - a field conversion remembered for the raw values it has seen
+
+    Repeated raw values (dates, branches, department codes, the name of a user
+    listed once per association) are converted once and every row gets the
+    same object, so the rows held by parse() share their values.  At most
+    MEMO_MAX values are kept; when a column has more, the memo starts over,
+    which keeps memory bounded and still catches values repeated on nearby
+    lines.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, conversion):
+        self.conversion = conversion
+        self.values     = {}
+
+    def __call__(self, raw):
+        value = self.values.get(raw, self._MISSING)
+        if value is self._MISSING:
+            value = self.conversion(raw)
+            if len(self.values) >= MEMO_MAX:
+                self.values.clear()
+            self.values[raw] = value
+        return value
+
+def _parse_date(text):
+    if not text.strip():
+        return None
+    try:
+        return rptdate(text)
+    except ValueError:
+        return text
+
+_dates = memo(_parse_date)
+
+def to_date(value):
+    """
+    to_date - the rptdate for report date text (parsed once per distinct
+              text); None when blank, the text itself when it is not a valid
+              date, and dates and None as they are
+    """
+    if value is None or isinstance(value, datetime.date):
+        return value
+    return _dates(value)
+
+#
+#    standard field conversions for 'fieldspecs'.  The codec recognises these,
+#    inlines them in the generated decode function and memoizes them per
+#    column (see memo); any other conversion function is called as is, with the
+#    raw bytes of the field.
+#
+cnv_text = lambda s: to_str(s.rstrip())
+cnv_int  = lambda s: int(s)                     # int() parses bytes directly
+cnv_date = lambda s: to_date(to_str(s.rstrip()))
+
+_INLINE = {
+    cnv_text: _DECODE.format("{0}.rstrip()"),
+    cnv_int:  "int({0})",
+    cnv_date: "_to_date(" + _DECODE.format("{0}.rstrip()") + ")",
+}
+
+_codecs = {}
+
+class codec(object):
+    """
+    codec - fixed-width record decoder compiled from a 'fieldspecs' list
+
+    fieldspecs entries are (column_name, start_pos, len, conversion_function)
+    tuples as used by the report parsers, start_pos being the 1-based column
+    of the field (the numbering of the rulers in the report format samples);
+    fields must be in column order and may not overlap.  decode(buf, pos, end) returns
+    the converted fields of the line buf[pos:end] as a list; 'buf' may be a
+    bytes string or the mmap from lineio.lines().  Text fields come back as
+    native strings (see to_str()), integer fields are parsed from the bytes and
+    date fields (cnv_date) as rptdate.  Each standard conversion is memoized
+    per column ('memos', see memo), so a repeated raw value is looked up
+    instead of converted again.
+
+    Use get_codec() rather than creating instances directly so each fieldspecs
+    list is compiled only once.
+    """
+
+    def __init__(self, fieldspecs):
+        self.fieldspecs  = list(fieldspecs)
+        self.column_hdrs = [fieldspec[0] for fieldspec in self.fieldspecs]
+
+        unpack_len = 0
+        unpack_fmt = ""
+        field_pos  = 0
+        self.field_offsets = []         # (start, end) of each field in the unpacked line
+        for fieldspec in self.fieldspecs:
+            start = max(fieldspec[1] - 1, 0)
+            end = start + fieldspec[2]
+            if start < unpack_len:
+                raise ValueError("fieldspec {0}: column {1:d} overlaps the previous field".format(fieldspec[0], fieldspec[1]))
+            if start > unpack_len:
+                unpack_fmt += str(start - unpack_len) + "x"
+                field_pos  += start - unpack_len
+            unpack_fmt += str(end - start) + "s"
+            self.field_offsets.append((field_pos, field_pos + end - start))
+            field_pos  += end - start
+            unpack_len = end
+
+        unpack_struct    = struct.Struct(unpack_fmt)
+        self.unpack_fmt  = unpack_fmt
+        self.unpack_len  = unpack_len
+        self.unpack_size = unpack_struct.size
+        self.decode      = self._build_decode(unpack_struct.unpack_from)
+
+    def _build_decode(self, unpack_from):
+        """
+        _build_decode - generate one decode function for this layout
+
+        Unpacking, short line slicing and every field conversion are written out
+        as straight-line code, so decoding a line costs no per-field tuple
+        indexing or lambda dispatch for the standard conversions.  A memoized
+        field costs one dictionary lookup; the memo is only called on a miss.
+        """
+        names = ["f{0:d}".format(i) for i in range(len(self.fieldspecs))]
+        env   = {'_unpack': unpack_from, '_min': min, '_to_date': to_date, '_MISSING': memo._MISSING}
+
+        self.memos = []
+        converted  = []
+        lookups    = []
+        for (i, fieldspec) in enumerate(self.fieldspecs):
+            conversion = fieldspec[3]
+            if conversion in _INLINE:
+                field_memo = memo(eval("lambda f: " + _INLINE[conversion].format("f"), env))
+                self.memos.append(field_memo)
+                env["_memo{0:d}".format(i)] = field_memo
+                env["_get{0:d}".format(i)]  = field_memo.values.get
+                lookups.append("    v{0:d} = _get{0:d}({1}, _MISSING)".format(i, names[i]))
+                lookups.append("    if v{0:d} is _MISSING:".format(i))
+                lookups.append("        v{0:d} = _memo{0:d}({1})".format(i, names[i]))
+                converted.append("v{0:d}".format(i))
+            else:
+                self.memos.append(None)
+                env["_cnv{0:d}".format(i)] = conversion
+                converted.append("_cnv{0:d}({1})".format(i, names[i]))
+
+        src  = ["def decode(buf, pos, end):"]
+        src.append("    if end - pos >= {0:d}:".format(self.unpack_size))
+        src.append("        ({0},) = _unpack(buf, pos)".format(", ".join(names)))
+        src.append("    else:")
+        for (name, (fstart, fend)) in zip(names, self.field_offsets):
+            src.append("        {0} = buf[pos + {1:d}:_min(pos + {2:d}, end)]".format(name, fstart, fend))
+        src.extend(lookups)
+        src.append("    return [{0}]".format(", ".join(converted)))
+
+        exec(compile("\n".join(src) + "\n", "<codec {0}>".format(self.unpack_fmt), "exec"), env)
+        return env['decode']
+
+    def check(self, line, expected):
+        """
+        check - decode the sample 'line' (bytes) and raise ValueError unless it
+                gives 'expected' (dates compared as their report text)
+        """
+        decoded = plain(self.decode(line, 0, len(line)))
+        if decoded != list(expected):
+            raise ValueError("field layout does not match the report: decoded {0!r}, expected {1!r}".format(decoded, list(expected)))
+
+def get_codec(fieldspecs):
+    """
+    get_codec - return the codec for 'fieldspecs', building it on first use
+    """
+    key = tuple(fieldspecs)
+    compiled = _codecs.get(key)
+    if compiled is None:
+        compiled = _codecs[key] = codec(fieldspecs)
+
+    return compiled
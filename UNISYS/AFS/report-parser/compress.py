@@ -0,0 +1,167 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+import bz2
+import gzip
+import zlib
+
+try:
+    import lzma
+except ImportError:                             # Python 2: only with backports.lzma
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+import pipeline
+
+MAGIC = (
+    (b"\x1f\x8b",        'gzip'),
+    (b"BZh",             'bz2'),
+    (b"\xfd7zXZ\x00",    'xz'),
+)
+SUFFIXES = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz'}
+
+def _need_lzma():
+    if lzma is None:
+        raise ValueError("xz compression needs the lzma module (backports.lzma on Python 2)")
+
+def detect(fname):
+    """
+    detect - compression of 'fname' from its magic bytes ('gzip', 'bz2', 'xz'),
+             or None for an uncompressed file
+    """
+    with open(fname, "rb") as fp:
+        head = fp.read(6)
+
+    for (magic, kind) in MAGIC:
+        if head.startswith(magic):
+            return kind
+
+    return None
+
+def suffix_kind(fname):
+    """
+    suffix_kind - compression named by the suffix of 'fname', or None
+    """
+    for (suffix, kind) in SUFFIXES.items():
+        if fname.endswith(suffix):
+            return kind
+
+    return None
+
+def strip_suffix(fname):
+    """
+    strip_suffix - 'fname' without a compression suffix
+    """
+    for suffix in SUFFIXES:
+        if fname.endswith(suffix):
+            return fname[:-len(suffix)]
+
+    return fname
+
+def _decompressor(kind):
+    if kind == 'gzip':
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if kind == 'bz2':
+        return bz2.BZ2Decompressor()
+    _need_lzma()
+    return lzma.LZMADecompressor()
+
+class decompressed(object):
+    """
+    decompressed - read-only view of a compressed report
+
+    A background thread (a pipeline.stage) reads the file in CHUNK_BYTES blocks and decompresses
+    them into a queue of at most QUEUE_CHUNKS chunks; zlib, bz2 and lzma
+    release the GIL while they work, so decompression overlaps with parsing.
+    Concatenated streams (e.g. "cat a.gz b.gz") are read one after the other.
+
+    Gives the parsers the part of the file interface they use ('name', 'mode'
+    and line iteration); lineio.lines() splits chunks() into lines without
+    copying them.
+    """
+
+    mode         = 'rb'
+    CHUNK_BYTES  = 1024 * 1024
+    QUEUE_CHUNKS = 16
+
+    def __init__(self, fname, kind):
+        self.name  = fname
+        self.kind  = kind
+        self.stage = None
+
+    def _decompress(self):
+        with open(self.name, "rb") as fp:
+            decomp = _decompressor(self.kind)
+            while True:
+                block = fp.read(self.CHUNK_BYTES)
+                if not block:
+                    break
+                while block:
+                    try:
+                        data = decomp.decompress(block)
+                    except EOFError:                    # bz2/lzma stream ended with the last block
+                        decomp = _decompressor(self.kind)
+                        data = decomp.decompress(block)
+                    if data:
+                        yield data
+                    block = decomp.unused_data          # start of the next stream, if any
+                    if block:
+                        decomp = _decompressor(self.kind)
+
+    def chunks(self):
+        """
+        chunks - generator yielding the decompressed report in chunks
+        """
+        if self.stage is not None:
+            raise ValueError("{0}: compressed report can only be read once".format(self.name))
+
+        self.stage = pipeline.stage("decompress {0}".format(self.name), self._decompress(), self.QUEUE_CHUNKS)
+        try:
+            for chunk in self.stage:
+                yield chunk
+        except Exception as e:
+            raise ValueError("{0}: {1}".format(self.name, e))
+
+    def __iter__(self):
+        tail = b""
+        for chunk in self.chunks():
+            lines = (tail + chunk).split(b"\n")
+            tail = lines.pop()
+            for line in lines:
+                yield line + b"\n"
+        if tail:
+            yield tail
+
+    def close(self):
+        if self.stage is not None:
+            self.stage.close()
+
+def open_report(fname):
+    """
+    open_report - open a report for the parsers, decompressing it on the fly
+                  when it is gzip, bz2 or xz compressed
+    """
+    kind = detect(fname)
+    if kind is None:
+        return open(fname, "rb")
+
+    if kind == 'xz':
+        _need_lzma()
+    return decompressed(fname, kind)
+
+def open_output(fname, kind, compresslevel=6):
+    """
+    open_output - open 'fname' for writing through the 'kind' compressor (a
+                  binary file; sinks.csv_sink adds the text layer)
+    """
+    if kind == 'gzip':
+        return gzip.open(fname, "wb", compresslevel)
+    if kind == 'bz2':
+        return bz2.BZ2File(fname, "wb", compresslevel=compresslevel)
+    _need_lzma()
+    return lzma.LZMAFile(fname, "wb", preset=compresslevel)
@@ -6,14 +6,16 @@ Created on Feb 29, 2016
 
 import re
 import sys
-import csv
-import struct
 import logging
 import datetime
-import cStringIO
 from os.path import basename
 from os.path import splitext
 
+import codec
+import classify
+import metrics
+import sinks
+
 class empdwn(object):
     """
     empdwn - Module to parse EMPDWN table data
@@ -40,36 +42,68 @@ ASSN TELLER NO BRANCH DEPT PIN CHG  STATUS AUTH LVL EMPL NAME
    2      5065    605 0000 12/28/15      1       20 AARON KENNEDY                    U302850    01/14/16
     """
 
+    VERSION           = "1.3"                         # bump when parsed output changes (see rptcache.py)
+    REPORT_TITLE      = "AFS USERS REPORT"            # see batch.detect_type()
     column_hdrs       = []
-    TRSEC_RPT_HDR     = re.compile(r'^(000|OBJECT\/RP3\/EMPDWN)')
-    TRSEC_COL_HDR     = re.compile(r"^(?P<assn>ASSN)\s+(?P<teller>TELLER NO)\s+(?P<branch>BRANCH)\s+(?P<dept>DEPT)\s+(?P<pin_chg>PIN CHG)\s+(?P<status>STATUS)\s+(?P<auth_lvl>AUTH LVL)\s+(?P<empl_name>EMPL NAME)\s+(?P<empl_id>EMPL ID)\s+(?P<last_login>LAST LOGIN)")
+    #
+    #    re.M lets '^' match at a line offset inside the memory mapped report;
+    #    patterns are bytes since lines are only decoded field by field
+    #
+    TRSEC_COL_HDR     = re.compile(br"^(?P<assn>ASSN)\s+(?P<teller>TELLER NO)\s+(?P<branch>BRANCH)\s+(?P<dept>DEPT)\s+(?P<pin_chg>PIN CHG)\s+(?P<status>STATUS)\s+(?P<auth_lvl>AUTH LVL)\s+(?P<empl_name>EMPL NAME)\s+(?P<empl_id>EMPL ID)\s+(?P<last_login>LAST LOGIN)", re.M)
     TRSEC_LINE_LENGTH = 105
+    PAGE_HDR          = re.compile(br'^000', re.M)     # first line of every report page
+    PAGE_STATE        = ()                          # no parse state crosses a page break
+    RESUME_STATE      = ('column_hdrs',)            # saved by checkpoint.py
+    LINE_STATE        = ()                          # a data line decodes on its own (see rptindex.py)
+    use_mmap          = True                        # read reports on disk through lineio's mmap
+    SQL_TYPES         = {'ASSN': 'INTEGER', 'TELLER NO': 'INTEGER', 'BRANCH': 'INTEGER',
+                         'STATUS': 'INTEGER', 'AUTH LVL': 'INTEGER',
+                         'PIN CHG': 'DATE', 'LAST LOGIN': 'DATE'}   # dates are codec.rptdate
+    SQL_INDEXES       = ('EMPL ID', 'TELLER NO')    # see sinks.sqlite_sink
+    LINE_CLASSES      = ('header', 'column header', 'separator', 'data')     # see metrics.py
+    LINE_PREFIXES     = classify.prefix_table((     # see classify.lines(); anything else is data
+        (b'000',               classify.HEADER),
+        (b'OBJECT/RP3/EMPDWN', classify.HEADER),
+        (b'ASSN TELLER',       classify.COLUMN_HEADER),
+        (b'----',              classify.SEPARATOR),
+    ))
     
     #
     #    helper functions for input file field conversions
     #
-    cnv_text           = lambda s: s.rstrip()
-    cnv_int            = lambda s: int(s)
+    cnv_text           = codec.cnv_text
+    cnv_int            = codec.cnv_int
+    cnv_date           = codec.cnv_date
 
     fieldspecs = [
-        # column_namne  start_pos  len, conversion_function (defined at the script level)
-        ('ASSN',        0,         4,   cnv_int),
-        ('TELLER NO',   6,         9,   cnv_int),
-        ('BRANCH',      15,        6,   cnv_int),
-        ('DEPT',        22,        4,   cnv_text),
-        ('PIN CHG',     28,        8,   cnv_text),
-        ('STATUS',      37,        6,   cnv_int),
-        ('AUTH LVL',    44,        7,   cnv_int),
-        ('EMPL NAME',   53,        31,  cnv_text),
-        ('EMPL ID',     86,        7,   cnv_text),
-        ('LAST LOGIN',  97,        8,   cnv_text),
+        # column_namne  start_pos (1-based column, see the ruler above)  len, conversion_function (defined at the script level)
+        ('ASSN',        1,         4,   cnv_int),
+        ('TELLER NO',   5,         10,  cnv_int),
+        ('BRANCH',      15,        7,   cnv_int),
+        ('DEPT',        23,        4,   cnv_text),
+        ('PIN CHG',     28,        8,   cnv_date),
+        ('STATUS',      36,        7,   cnv_int),
+        ('AUTH LVL',    43,        9,   cnv_int),
+        ('EMPL NAME',   53,        32,  cnv_text),
+        ('EMPL ID',     86,        8,   cnv_text),
+        ('LAST LOGIN',  97,        8,   cnv_date),
     ]
 
+    #
+    #    the second data line of the sample above and its fields (see codec.check())
+    #
+    LAYOUT_SAMPLE     = (b"   2       428    605 0000 11/24/15      1       15 AARON BAUMANN                    A784663    01/14/16",
+                         [2, 428, 605, '0000', '11/24/15', 1, 15, 'AARON BAUMANN', 'A784663', '01/14/16'])
+
     def __init__(self, fp, logger, debug=False):
+        self.line_counts = dict.fromkeys(self.LINE_CLASSES, 0)     # see metrics.py
+        self.io_stats    = {'bytes': 0}
+        self.metrics     = metrics.metrics(self)
+        self.metrics.start('init')
         start_tm = datetime.datetime.now()
         logger.info("empdwn initialization started")
         
-        if type(fp) is not file and fp.mode != 'r':
+        if getattr(fp, 'mode', None) not in ('r', 'rb'):
             raise TypeError("empdwn: first argument must be a file object opened for read")
         
         self.fp     = fp
@@ -77,65 +111,68 @@ ASSN TELLER NO BRANCH DEPT PIN CHG  STATUS AUTH LVL EMPL NAME
         self.debug  = debug
         self.buffers = []
 
-        unpack_len = 0
-        unpack_fmt = ""
-        for fieldspec in self.fieldspecs:
-            start = fieldspec[1] - 1
-            end = start + fieldspec[2]
-            if start > unpack_len:
-                unpack_fmt += str(start - unpack_len) + "x"
-            unpack_fmt += str(end - start) + "s"
-            unpack_len = end
-
-        self.field_indices = range(len(self.fieldspecs))
+        self.codec  = codec.get_codec(self.fieldspecs)
+        self.decode = self.codec.decode
+        self.codec.check(*self.LAYOUT_SAMPLE)
 
         if self.debug:
-            self.logger.debug("unpack_len = {0} unpack_fmt = {1}".format(unpack_len, unpack_fmt))
+            self.logger.debug("unpack_len = {0}, unpack_fmt = {1}".format(self.codec.unpack_len, self.codec.unpack_fmt))
 
-        self.unpacker = struct.Struct(unpack_fmt).unpack_from
         end_tm = datetime.datetime.now()
         self.logger.info("empdwn initialization complete (elapsed time: {0})".format(end_tm - start_tm))
+        self.metrics.stop('init')
 
-    def parse(self):
-        start_tm = datetime.datetime.now()
-        self.logger.info("starting parse")
-        for line in self.fp.readlines():
-            if line.startswith("000"):
-                if not "AFS USERS REPORT" in line:
-                    raise ValueError("invalid report type - \"AFS USERS REPORT\" not in '{0}'".format(line))
-                 
-            hdr_mtch = self.TRSEC_RPT_HDR.match(line.rstrip("\n"))
-            if hdr_mtch is not None:
-                continue
-            
-            if line.startswith("ASSN TELLER"):
-                colhdr_mtch = self.TRSEC_COL_HDR.match(line.rstrip("\n"))
+    def scan_state(self, line):
+        """
+        scan_state - no parse state crosses a page break in this report
+        """
+        pass
+
+    def records(self):
+        """
+        records - generator yielding parsed data rows one at a time
+
+        Lines come from classify.lines(), already classified by 'LINE_PREFIXES':
+        for a report on disk, each data line is decoded by the compiled codec
+        (see codec.py) at its offset in the memory mapped file, so no line
+        string, padded copy or StringIO is built.  Short lines (no LAST LOGIN)
+        are sliced field by field instead of being padded.  PIN CHG and LAST
+        LOGIN come back as dates (codec.rptdate, None when blank) and repeated
+        values are shared between rows (see codec.memo).  Only the column
+        header line is matched against a regular expression; the column headers
+        are saved to 'column_hdrs'.  Lines read are counted by class in
+        'line_counts'.
+        """
+        counts = self.line_counts
+        for (cls, line, pos, end) in classify.lines(self.fp, self.LINE_PREFIXES, classify.DATA,
+                                                    self.use_mmap, self.io_stats):
+            counts[cls] += 1
+            if cls is classify.DATA:
+                yield self.decode(line, pos, end)
+
+            elif cls is classify.HEADER:
+                if self.PAGE_HDR.match(line, pos, end) is not None and line.find(b"AFS USERS REPORT", pos, end) < 0:
+                    raise ValueError("invalid report type - \"AFS USERS REPORT\" not in '{0}'".format(codec.to_str(line[pos:end])))
+
+            elif cls is classify.COLUMN_HEADER:
+                colhdr_mtch = self.TRSEC_COL_HDR.match(line, pos, end)
                 if colhdr_mtch is not None and len(self.column_hdrs) == 0:
-                    self.column_hdrs = list(colhdr_mtch.groups())
+                    self.column_hdrs = [codec.to_str(hdr) for hdr in colhdr_mtch.groups()]
                 elif colhdr_mtch is None:
                     raise ValueError("invalid column headers")
                 
                 if self.debug:
                     self.logger.debug("column headers: '{0}'".format(",".join(self.column_hdrs)))
-                    
-                continue
-            
-            if line.startswith("----"):
-                    continue
-            else:
-                if len(line.rstrip("\n")) < self.TRSEC_LINE_LENGTH:
-                    field_line = "{0:<105}".format(line.rstrip("\n"))
-                else:
-                    field_line = line[:].rstrip("\n")
-
-                f = cStringIO.StringIO(field_line)
-                buf = []
-                for ln in f:
-                    flds = self.unpacker(ln)
-                    for i in self.field_indices:
-                        buf.append(self.fieldspecs[i][3](flds[i]))
-
-                self.buffers.append(buf)
+
+    def parse(self, rows=None):
+        self.metrics.start('parse')
+        start_tm = datetime.datetime.now()
+        self.logger.info("starting parse")
+        if rows is None:
+            rows = self.records()
+
+        for buf in rows:
+            self.buffers.append(buf)
 
         if self.debug:
             self.logger.info("enpdwn column headers created: {0:d}".format(len(self.column_hdrs)))
@@ -143,28 +180,48 @@ ASSN TELLER NO BRANCH DEPT PIN CHG  STATUS AUTH LVL EMPL NAME
 
         end_tm = datetime.datetime.now()            
         self.logger.info("parse complete (elapsed time: {0})".format(end_tm - start_tm))
+        self.metrics.stop('parse', len(self.buffers))
 
-    def write_data(self):
-        from os import getcwd
-        
+    def write_data(self, output=None):
+        """
+        write_data - write the parsed rows in 'buffers' (see sinks.open_sink() for 'output')
+
+        Returns the number of rows written.
+        """
+        self.metrics.start('write')
         start_tm = datetime.datetime.now()
         self.logger.info("start write_data")
-        fname = "{0}/{1}.csv".format(getcwd(), splitext(basename(self.fp.name))[0])
-        with open(fname, "wb") as csv_fp:
-            self.logger.info("writing parsed data to {0}".format(fname))
-            writer = csv.writer(csv_fp, dialect='excel', delimiter=',')
-            writer.writerow(self.column_hdrs)
-            
-            written_buf = 0
-            for buf in self.buffers:
-                writer.writerow(buf)
-                written_buf += 1
-                
-            if self.debug:
-                self.logger.info("buffers written: {0:d}".format(written_buf))
-                
-            end_tm = datetime.datetime.now()
-            self.logger.info("write_data complete (elapsed time: {0})".format(end_tm - start_tm))
+        written_buf = sinks.write_rows(self, self.buffers, output)
+        if self.debug:
+            self.logger.info("buffers written: {0:d}".format(written_buf))
+
+        end_tm = datetime.datetime.now()
+        self.logger.info("write_data complete (elapsed time: {0})".format(end_tm - start_tm))
+        self.metrics.stop('write', written_buf)
+        return written_buf
+
+    def stream_data(self, rows=None, output=None):
+        """
+        stream_data - parse and write in a single pass
+
+        Rows from records() (or 'rows', e.g. from shard.records()) go straight to
+        the output; 'buffers' is not used, so memory use does not grow with the
+        size of the report.
+        """
+        self.metrics.start('stream')
+        start_tm = datetime.datetime.now()
+        self.logger.info("start stream_data")
+        if rows is None:
+            rows = self.records()
+
+        written_buf = sinks.write_rows(self, rows, output)
+        if self.debug:
+            self.logger.info("buffers written: {0:d}".format(written_buf))
+
+        end_tm = datetime.datetime.now()
+        self.logger.info("stream_data complete (elapsed time: {0})".format(end_tm - start_tm))
+        self.metrics.stop('stream', written_buf)
+        return written_buf
 
 if __name__ == "__main__":
     start_time = datetime.datetime.now()
@@ -182,7 +239,7 @@ if __name__ == "__main__":
         if len(sys.argv) != 2:
             raise ValueError("usage: {0} tslist_input_fname tslist_out_fname.csv".format(basename(sys.argv[0])))
         
-        file_parser = empdwn(open(sys.argv[1], "r"), root, True)
+        file_parser = empdwn(open(sys.argv[1], "rb"), root, True)
         file_parser.parse()
         file_parser.write_data()
                 
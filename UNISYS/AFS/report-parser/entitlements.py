@@ -0,0 +1,180 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+import array
+import datetime
+
+import sinks
+
+class entitlements(object):
+    """
+    entitlements - which TRNSEC employees can run which transactions
+
+    TRNSEC lists, for each association, the transaction codes of each
+    authority level and then the employees holding that level, so an
+    employee can run every code of every level they are listed under in
+    their association; a level grants nothing in another association.  As
+    the report is parsed, each employee (association and EMPL NO) is given an
+    integer ID in order of first appearance and the IDs are collected per
+    (association, level); at the end each level's IDs become a sorted
+    array('i') and the inverted index maps
+
+        transaction code -> (association, authority level) -> sorted employee IDs
+
+    sharing one array per level, so it costs a few bytes per employee and
+    level however many codes a level has.  who_can() answers "who can run
+    FM-MSEMP?" with a single lookup.
+
+    write_data() writes the entitlement matrix: one row per employee (ASSN,
+    EMPL NO, HR NO, NAME, AUTH LEVELS) with a column per transaction code,
+    holding the authority level(s) that grant it (empty when none does).
+    With 'codes' (a list of transaction codes), it writes the employees who
+    can run each of them instead (see whocan).
+    """
+
+    EMPL_COLS   = ('EMPL NO', 'HR NO', 'NAME')
+    SQL_TYPES   = {'ASSN': 'INTEGER'}
+    SQL_INDEXES = ('EMPL NO', 'HR NO')
+
+    def __init__(self, parser, logger, rows=None, codes=None, debug=False):
+        self.parser      = parser               # trnsec parser
+        self.fp          = parser.fp            # see sinks.open_sink()
+        self.logger      = logger
+        self.rows        = rows                 # e.g. shard.records(); default parser.records()
+        self.codes       = codes
+        self.debug       = debug
+        self.employees   = []                   # employee ID -> (ASSN, EMPL NO, HR NO, NAME)
+        self.members     = {}                   # (ASSN, authority level) -> sorted employee IDs
+        self.index       = {}                   # transaction code -> (ASSN, authority level) -> sorted employee IDs
+        self.column_hdrs = []
+
+    def build(self):
+        """
+        build - parse the report and build the inverted index; returns the
+                number of employee rows read
+        """
+        start_tm = datetime.datetime.now()
+        parser = self.parser
+        rows = self.rows if self.rows is not None else parser.records()
+
+        ids     = {}                            # (ASSN, EMPL NO) -> employee ID
+        members = {}
+        cols    = None
+        level   = None
+        nrows   = 0
+        for row in rows:
+            if cols is None:
+                cols = [parser.column_hdrs.index(col) for col in self.EMPL_COLS]
+            if (parser.assn, parser.level) != level:
+                level = (parser.assn, parser.level)
+                level_ids = members.setdefault(level, array.array('i'))
+
+            key = (parser.assn, row[cols[0]])
+            empl_id = ids.get(key)
+            if empl_id is None:
+                empl_id = ids[key] = len(self.employees)
+                self.employees.append((parser.assn,) + tuple(row[i] for i in cols))
+            level_ids.append(empl_id)
+            nrows += 1
+
+        for (level, level_ids) in members.items():
+            self.members[level] = array.array('i', sorted(set(level_ids)))
+        for (level, codes) in parser.transaction_codes.items():
+            level_ids = self.members.get(level, array.array('i'))
+            for code in codes:
+                self.index.setdefault(code, {})[level] = level_ids
+
+        end_tm = datetime.datetime.now()
+        self.logger.info("entitlements: {0:d} employees, {1:d} authority levels, {2:d} transaction codes (elapsed time: {3})".format(
+                         len(self.employees), len(self.members), len(self.index), end_tm - start_tm))
+        return nrows
+
+    def who_can(self, code):
+        """
+        who_can - the employees who can run transaction 'code' as a list of
+                  ((ASSN, authority level), sorted employee IDs), in order
+        """
+        levels = self.index.get(code.strip().upper(), {})
+        return sorted(levels.items(), key=lambda item: self._order(item[0]))
+
+    @staticmethod
+    def _order(key):
+        (assn, level) = key
+        return (assn, int(level))
+
+    def _levels(self):
+        #
+        #    employee ID -> the (ASSN, authority level) keys they hold, in order
+        #
+        held = [[] for empl_id in range(len(self.employees))]
+        for key in sorted(self.members, key=self._order):
+            for empl_id in self.members[key]:
+                held[empl_id].append(key)
+        return held
+
+    def records(self):
+        """
+        records - generator yielding the rows of the entitlement matrix
+        """
+        self.build()
+        codes = sorted(self.index)
+        self.column_hdrs = ['ASSN'] + list(self.EMPL_COLS) + ['AUTH LEVELS'] + codes
+
+        col = dict((code, i) for (i, code) in enumerate(codes))
+        level_cols = dict((level, [col[code] for code in self.parser.transaction_codes.get(level, ())])
+                          for level in self.members)
+        for (employee, keys) in zip(self.employees, self._levels()):
+            cells = [None] * len(codes)
+            for key in keys:
+                level = key[1]
+                for i in level_cols[key]:
+                    cells[i] = level if cells[i] is None else cells[i] + " " + level
+            yield list(employee) + [" ".join(key[1] for key in keys)] + cells
+
+    def write_data(self, output=None):
+        """
+        write_data - write the entitlement matrix, or the employees who can
+                     run 'codes' (see sinks.open_sink() for 'output'); returns
+                     the number of rows written
+        """
+        self.parser.metrics.start('entitlements')
+        start_tm = datetime.datetime.now()
+        self.logger.info("start entitlements")
+        if self.codes:
+            result = whocan(self, self.codes)
+            written_buf = sinks.write_rows(result, result.records(), output)
+        else:
+            written_buf = sinks.write_rows(self, self.records(), output)
+
+        end_tm = datetime.datetime.now()
+        self.logger.info("entitlements complete: {0:d} rows (elapsed time: {1})".format(written_buf, end_tm - start_tm))
+        self.parser.metrics.stop('entitlements', written_buf)
+        return written_buf
+
+class whocan(object):
+    """
+    whocan - the employees who can run each of 'codes', for sinks.write_rows()
+    """
+
+    column_hdrs = ['TRANSACTION', 'AUTH LEVEL', 'ASSN'] + list(entitlements.EMPL_COLS)
+    SQL_TYPES   = {'AUTH LEVEL': 'INTEGER', 'ASSN': 'INTEGER'}
+    SQL_INDEXES = ('TRANSACTION', 'EMPL NO')
+
+    def __init__(self, index, codes):
+        self.index  = index
+        self.fp     = index.fp
+        self.logger = index.logger
+        self.codes  = codes
+
+    def records(self):
+        self.index.build()
+        for code in self.codes:
+            code = code.strip().upper()
+            levels = self.index.who_can(code)
+            self.logger.info("who can run {0}: {1:d} employees".format(code, sum(len(ids) for (level, ids) in levels)))
+            for ((assn, level), ids) in levels:
+                for empl_id in ids:
+                    yield [code, int(level)] + list(self.index.employees[empl_id])
@@ -0,0 +1,268 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+import json
+import fnmatch
+import datetime
+
+import sinks
+
+JOB_BITS = 100                          # TSLIST job IDs are two digits, 00 - 99
+
+def to_bits(job_ids):
+    """
+    to_bits - the bitset of a space separated TSLIST job ID list ("06 08 71"):
+              bit N is set when job ID N is in the list
+    """
+    bits = 0
+    for job_id in job_ids.split():
+        job_id = int(job_id)
+        if not 0 <= job_id < JOB_BITS:
+            raise ValueError("invalid job ID {0:d}: expected 00 - {1:02d}".format(job_id, JOB_BITS - 1))
+        bits |= 1 << job_id
+    return bits
+
+def to_jobs(bits):
+    """
+    to_jobs - the job IDs of a bitset as two digit strings, in order
+    """
+    return ["{0:02d}".format(job_id) for job_id in range(JOB_BITS) if bits >> job_id & 1]
+
+def load_rules(fname):
+    """
+    load_rules - read and check a JSON segregation of duties rule list:
+
+        {
+            "rules": [
+                {"name": "maintain and inquire CIF", "a": ["FM-CF*"], "b": ["IQ-CF*"]},
+                {"name": "name change and combine",  "a": ["5109"],   "b": ["FM-CFCCU", "FM-CFALC"]}
+            ]
+        }
+
+    A job that can run any transaction of "a" and any transaction of "b" (in
+    the same association) is a conflict.  Transactions are TRNSEC codes
+    (TT-APTRC, e.g. FM-CFALT), TRX# numbers, or TRNSEC code patterns with
+    * and ? (see fnmatch).
+    """
+    with open(fname) as fp:
+        try:
+            ruleset = json.load(fp)
+        except ValueError as e:
+            raise ValueError("{0}: invalid rule list: {1}".format(fname, e))
+
+    if not isinstance(ruleset, dict) or not isinstance(ruleset.get('rules'), list):
+        raise ValueError("{0}: expected an object with a \"rules\" list".format(fname))
+
+    for rule in ruleset['rules']:
+        name = rule.get('name')
+        if not name or not all(isinstance(rule.get(side), list) and len(rule[side]) != 0 for side in ('a', 'b')):
+            raise ValueError("{0}: rule {1}: needs a name and \"a\" and \"b\" transaction lists".format(fname, name))
+
+    return ruleset
+
+class jobsets(object):
+    """
+    jobsets - TSLIST transaction job sets as bitsets
+
+    The report is parsed once, one row per transaction (see tslist's
+    'normalized'), and each transaction's job ID list becomes a JOB_BITS wide
+    bitset (a Python int, bit N for job ID N), kept per association and
+    TRNSEC code; a code listed on more than one line gets the union.  The
+    jobs that can run two transactions are then one AND of their bitsets,
+    and a segregation of duties rule (see load_rules()) checks a transaction
+    against all of the other side at once with the OR of that side before
+    looking at pairs.
+
+    records() yields the job IDs that can run both transactions of each of
+    the 'both' pairs, in every association holding both; with 'rules' (see
+    load_rules()), write_data() writes the conflicting transaction pairs of
+    each rule instead (see conflicts).
+    """
+
+    column_hdrs = ['ASSN #', 'TRANSACTION A', 'TRANSACTION B', 'JOB ID']
+    SQL_TYPES   = {'ASSN #': 'INTEGER', 'JOB ID': 'INTEGER'}
+    SQL_INDEXES = ('TRANSACTION A', 'TRANSACTION B', 'JOB ID')
+
+    def __init__(self, parser, logger, rows=None, both=None, rules=None, debug=False):
+        self.parser  = parser               # tslist parser
+        self.fp      = parser.fp            # see sinks.open_sink()
+        self.logger  = logger
+        self.rows    = rows                 # e.g. shard.records(); default parser.records()
+        self.both    = both or []           # [(transaction, transaction)]
+        self.rules   = rules                # see load_rules()
+        self.debug   = debug
+        self.sets    = {}                   # ASSN # -> TRNSEC code -> job bitset
+        self.trx     = {}                   # ASSN # -> TRX# -> TRNSEC codes
+        self.built   = False
+
+        parser.normalized = True            # one row per transaction, job IDs in the last field
+
+    def build(self):
+        """
+        build - parse the report and build the job bitsets; returns the number
+                of transaction rows read
+        """
+        if self.built:
+            return 0
+
+        start_tm = datetime.datetime.now()
+        parser = self.parser
+        rows = self.rows if self.rows is not None else parser.records()
+
+        cols  = None
+        nrows = 0
+        for row in rows:
+            if cols is None:
+                cols = [parser.column_hdrs.index(col) for col in ('TRX#', 'TRNSEC code')]
+            (trx, code) = [row[i] for i in cols]
+            assn = parser.hdr_lvl               # the row's ASSN # lags a new association by a line
+            codes = self.sets.get(assn)
+            if codes is None:
+                codes = self.sets[assn] = {}
+                self.trx[assn] = {}
+            codes[code] = codes.get(code, 0) | to_bits(row[-1])
+            if trx:
+                self.trx[assn].setdefault(str(int(trx)) if trx.isdigit() else trx, set()).add(code)
+            nrows += 1
+        self.built = True
+
+        end_tm = datetime.datetime.now()
+        self.logger.info("jobsets: {0:d} transactions in {1:d} associations (elapsed time: {2})".format(
+                         sum(len(codes) for codes in self.sets.values()), len(self.sets), end_tm - start_tm))
+        return nrows
+
+    def resolve(self, assn, name):
+        """
+        resolve - the TRNSEC codes of association 'assn' named by 'name' (a
+                  TRNSEC code, a TRX# or a TRNSEC code pattern), in order
+        """
+        codes = self.sets.get(assn, {})
+        name = name.strip().upper()
+        if any(c in name for c in '*?['):
+            return sorted(fnmatch.filter(codes, name))
+        if name.isdigit():
+            return sorted(self.trx.get(assn, {}).get(str(int(name)), ()))
+        return [name] if name in codes else []
+
+    def jobs_for_both(self, a, b):
+        """
+        jobs_for_both - the jobs that can run both 'a' and 'b' as a list of
+                        (ASSN #, code of a, code of b, job bitset), bitset
+                        non-zero
+        """
+        found = []
+        for assn in sorted(self.sets):
+            codes = self.sets[assn]
+            b_codes = self.resolve(assn, b)
+            for code_a in self.resolve(assn, a):
+                for code_b in b_codes:
+                    bits = codes[code_a] & codes[code_b]
+                    if bits:
+                        found.append((assn, code_a, code_b, bits))
+        return found
+
+    def records(self):
+        """
+        records - generator yielding the job IDs that can run both
+                  transactions of each 'both' pair
+        """
+        self.build()
+        for (a, b) in self.both:
+            start_tm = datetime.datetime.now()
+            found = self.jobs_for_both(a, b)
+            jobs = set()
+            for (assn, code_a, code_b, bits) in found:
+                jobs.update(to_jobs(bits))
+            self.logger.info("jobs that can run {0} and {1}: {2} (elapsed time: {3})".format(
+                             a, b, " ".join(sorted(jobs)) or "none", datetime.datetime.now() - start_tm))
+            for (assn, code_a, code_b, bits) in found:
+                for job_id in to_jobs(bits):
+                    yield [assn, code_a, code_b, "={0}".format(job_id)]
+
+    def write_data(self, output=None):
+        """
+        write_data - write the jobs that can run both transactions of each
+                     'both' pair, or the conflicts of 'rules' (see
+                     sinks.open_sink() for 'output'); returns the number of
+                     rows written
+        """
+        self.parser.metrics.start('jobsets')
+        start_tm = datetime.datetime.now()
+        self.logger.info("start jobsets")
+        if self.rules is not None:
+            result = conflicts(self, self.rules)
+            written_buf = sinks.write_rows(result, result.records(), output)
+        else:
+            written_buf = sinks.write_rows(self, self.records(), output)
+
+        end_tm = datetime.datetime.now()
+        self.logger.info("jobsets complete: {0:d} rows (elapsed time: {1})".format(written_buf, end_tm - start_tm))
+        self.parser.metrics.stop('jobsets', written_buf)
+        return written_buf
+
+class conflicts(object):
+    """
+    conflicts - the transaction pairs that break each segregation of duties
+                rule, with the jobs that can run both, for sinks.write_rows()
+    """
+
+    column_hdrs = ['RULE', 'ASSN #', 'TRANSACTION A', 'TRANSACTION B', 'JOBS', 'JOB IDS']
+    SQL_TYPES   = {'ASSN #': 'INTEGER', 'JOBS': 'INTEGER'}
+    SQL_INDEXES = ('RULE', 'TRANSACTION A', 'TRANSACTION B')
+
+    def __init__(self, index, ruleset):
+        self.index  = index
+        self.fp     = index.fp
+        self.logger = index.logger
+        self.rules  = ruleset['rules']
+
+    def _side(self, assn, names):
+        codes = set()
+        for name in names:
+            codes.update(self.index.resolve(assn, name))
+        return sorted(codes)
+
+    def check(self, rule):
+        """
+        check - generator yielding the conflicts of 'rule' as (ASSN #, code,
+                code, job bitset), each pair once
+        """
+        for assn in sorted(self.index.sets):
+            codes = self.index.sets[assn]
+            a_codes = self._side(assn, rule['a'])
+            b_codes = self._side(assn, rule['b'])
+            b_bits = [(code, codes[code]) for code in b_codes]
+            b_any = 0
+            for (code, bits) in b_bits:
+                b_any |= bits
+
+            #
+            #    a pair of codes on both sides is met twice; keep it in code order
+            #
+            both = set(a_codes).intersection(b_codes)
+            for code_a in a_codes:
+                bits_a = codes[code_a]
+                if not bits_a & b_any:
+                    continue                    # no job of 'a' runs anything in 'b'
+                for (code_b, bits_b) in b_bits:
+                    bits = bits_a & bits_b
+                    if not bits or code_a == code_b:
+                        continue
+                    if code_b < code_a and code_a in both and code_b in both:
+                        continue
+                    yield (assn, code_a, code_b, bits)
+
+    def records(self):
+        self.index.build()
+        for rule in self.rules:
+            start_tm = datetime.datetime.now()
+            npairs = 0
+            for (assn, code_a, code_b, bits) in self.check(rule):
+                npairs += 1
+                jobs = to_jobs(bits)
+                yield [rule['name'], assn, code_a, code_b, len(jobs), " ".join(jobs)]
+            self.logger.info("rule {0}: {1:d} conflicting pairs (elapsed time: {2})".format(
+                             rule['name'], npairs, datetime.datetime.now() - start_tm))
@@ -0,0 +1,136 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+import os
+import mmap
+import stat
+
+class filerange(object):
+    """
+    filerange - read-only view of the byte range [start, end) of a report file
+
+    Gives the parsers the small part of the file interface they use ('name',
+    'mode' and line iteration), so records() can run on one part of a report
+    (see shard.py).
+    """
+
+    mode = 'rb'
+
+    def __init__(self, fname, start, end):
+        self.name  = fname
+        self.start = start
+        self.end   = end
+
+    def __iter__(self):
+        with open(self.name, "rb") as fp:
+            fp.seek(self.start)
+            pos = self.start
+            while pos < self.end:
+                line = fp.readline()
+                if not line:
+                    break
+                pos += len(line)
+                yield line
+
+def _file_lines(fp, stats):
+    nbytes = 0
+    try:
+        for line in fp:
+            nbytes += len(line)
+            if line.endswith(b"\n"):
+                yield (line, 0, len(line) - 1)
+            else:
+                yield (line, 0, len(line))
+    finally:
+        if stats is not None:
+            stats['bytes'] += nbytes
+
+def _mmap_lines(fp, start, end, stats):
+    with fp:
+        size = os.fstat(fp.fileno()).st_size
+        if end is None or end > size:
+            end = size
+        if start >= end:
+            return
+
+        mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        pos = start
+        try:
+            while pos < end:
+                eol = mm.find(b"\n", pos, end)
+                if eol < 0:
+                    yield (mm, pos, end)
+                    pos = end
+                    break
+                yield (mm, pos, eol)
+                pos = eol + 1
+        finally:
+            mm.close()
+            if stats is not None:
+                stats['bytes'] += pos - start
+
+def _chunk_lines(chunks, stats):
+    nbytes = 0
+    tail = b""
+    try:
+        for chunk in chunks:
+            nbytes += len(chunk)
+            if tail:
+                chunk = tail + chunk
+            pos = 0
+            while True:
+                eol = chunk.find(b"\n", pos)
+                if eol < 0:
+                    break
+                yield (chunk, pos, eol)
+                pos = eol + 1
+            tail = chunk[pos:]
+
+        if tail:
+            yield (tail, 0, len(tail))
+    finally:
+        if stats is not None:
+            stats['bytes'] += nbytes
+
+def _is_regular_file(fp):
+    try:
+        return stat.S_ISREG(os.fstat(fp.fileno()).st_mode)
+    except (AttributeError, OSError, ValueError):
+        return False
+
+def lines(fp, use_mmap=True, stats=None):
+    """
+    lines - iterate the lines of a report as (buffer, start, end) tuples
+
+    'buffer[start:end]' is the line without its newline, as bytes.  For a report on disk
+    the buffer is a read-only mmap of the whole file, so no string is built
+    for a line unless the caller slices it; struct unpack_from() and compiled
+    regex match(buffer, start, end) work on the mapped file directly.  Other
+    inputs (pipes, or use_mmap=False) fall back to the file iterator with one
+    string per line and start == 0 (a text file is read through its binary
+    'buffer', e.g. sys.stdin on Python 3).  Inputs that hand out their data in
+    chunks (see compress.decompressed) are split in place, with the chunk as
+    the buffer.
+
+    When 'stats' is given, the number of bytes read is added to stats['bytes']
+    once the iteration ends (see metrics.py).
+    """
+    if isinstance(fp, filerange):
+        if use_mmap:
+            return _mmap_lines(open(fp.name, "rb"), fp.start, fp.end, stats)
+        return _file_lines(fp, stats)
+
+    if hasattr(fp, 'chunks'):
+        return _chunk_lines(fp.chunks(), stats)
+
+    if use_mmap and _is_regular_file(fp):
+        #
+        #    map through the descriptor: the name may not be a path (standard
+        #    input redirected from a file is "<stdin>")
+        #
+        return _mmap_lines(os.fdopen(os.dup(fp.fileno()), "rb"), fp.tell(), None, stats)
+
+    return _file_lines(getattr(fp, 'buffer', fp), stats)
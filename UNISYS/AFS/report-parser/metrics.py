@@ -0,0 +1,95 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:                             # not available on Windows or Jython
+    resource = None
+
+def cpu_time():
+    """
+    cpu_time - user + system CPU seconds used by this process
+    """
+    times = os.times()
+    return times[0] + times[1]
+
+def peak_memory():
+    """
+    peak_memory - peak resident set size of this process in bytes (None when
+                  the platform does not report it)
+    """
+    if resource is None:
+        return None
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return rss                              # bytes on OS X, KB elsewhere
+    return rss * 1024
+
+class metrics(object):
+    """
+    metrics - per phase measurements for one parser
+
+    Each phase (init, parse, write, or stream when parse and write are one
+    pass) is bracketed by start() and stop().  stop() records:
+
+        wall_seconds, cpu_seconds   - elapsed and CPU time of the phase
+        bytes_read, lines_read      - input read during the phase
+        lines_per_second
+        line_counts                 - lines read during the phase by line class
+                                      (the parser's 'line_counts')
+        rows                        - rows parsed or written, when given
+        peak_memory                 - peak RSS of the process so far, in bytes
+
+    Input is counted from the parser's 'io_stats' (see lineio.lines()) and
+    'line_counts', which records() keeps up to date.  Rows parsed by shard.py
+    workers are counted in the workers and merged into the parser; their CPU
+    time and memory are not included.
+    """
+
+    def __init__(self, parser):
+        self.parser  = parser
+        self.phases  = []
+        self.started = {}
+
+    def _snapshot(self):
+        return (time.time(), cpu_time(), self.parser.io_stats['bytes'], dict(self.parser.line_counts))
+
+    def start(self, phase):
+        self.started[phase] = self._snapshot()
+
+    def stop(self, phase, rows=None):
+        (wall0, cpu0, bytes0, counts0) = self.started.pop(phase)
+        (wall1, cpu1, bytes1, counts1) = self._snapshot()
+
+        line_counts = dict((cls, counts1[cls] - counts0.get(cls, 0)) for cls in counts1)
+        lines_read  = sum(line_counts.values())
+        wall        = wall1 - wall0
+        self.phases.append({
+            'phase':            phase,
+            'wall_seconds':     wall,
+            'cpu_seconds':      cpu1 - cpu0,
+            'bytes_read':       bytes1 - bytes0,
+            'lines_read':       lines_read,
+            'lines_per_second': lines_read / wall if wall > 0 else None,
+            'line_counts':      line_counts,
+            'rows':             rows,
+            'peak_memory':      peak_memory(),
+        })
+
+    def as_dict(self):
+        """
+        as_dict - the recorded phases in a JSON serializable dictionary
+        """
+        return {
+            'report': self.parser.fp.name,
+            'type':   type(self.parser).__name__,
+            'phases': self.phases,
+        }
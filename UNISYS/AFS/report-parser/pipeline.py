@@ -0,0 +1,173 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+import datetime
+import itertools
+import threading
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+BLOCK_BYTES   = 1024 * 1024         # input read by the reader stage at a time
+QUEUE_BLOCKS  = 16                  # blocks read ahead of the parser stage
+ROW_BATCH     = 1000                # rows handed to the writer stage at a time
+QUEUE_BATCHES = 16                  # row batches parsed ahead of the writer stage
+
+class stage(object):
+    """
+    stage - run an iterator on a thread of its own, handing its items on
+            through a queue of at most 'maxsize' items
+
+    Iterating the stage yields the items in order; an exception raised by the
+    iterator is raised again in the consumer.  close() (or the consumer
+    leaving its loop early) stops the thread at its next hand-off, so neither
+    side can be left blocked on the queue; the iterator is then closed, if it
+    can be (see compress.decompressed).
+    """
+
+    _END = object()
+
+    def __init__(self, name, items, maxsize):
+        self.items   = items
+        self.error   = None
+        self.queue   = queue.Queue(maxsize)
+        self.stopped = threading.Event()
+        self.thread  = threading.Thread(target=self._run, name=name)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _put(self, item):
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, True, 0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _run(self):
+        try:
+            for item in self.items:
+                if not self._put(item):
+                    return
+        except Exception as e:
+            self.error = e
+        finally:
+            if hasattr(self.items, 'close'):
+                self.items.close()          # e.g. a generator's open files, when stopped early
+        self._put(self._END)
+
+    def __iter__(self):
+        try:
+            while True:
+                try:
+                    item = self.queue.get(True, 0.1)
+                except queue.Empty:
+                    if self.stopped.is_set():
+                        return
+                    continue
+
+                if item is self._END:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                yield item
+        finally:
+            self.close()
+
+    def close(self):
+        self.stopped.set()
+
+class prefetched(object):
+    """
+    prefetched - the reader stage: a report read in BLOCK_BYTES blocks on a
+                 thread of its own, at most QUEUE_BLOCKS blocks ahead of the
+                 parser
+
+    Gives the parsers the part of the file interface they use ('name' and
+    'mode'); lineio.lines() splits chunks() into lines, so the parser stage
+    never waits on a read unless the reader has fallen behind.
+    """
+
+    mode = 'rb'
+
+    def __init__(self, fp):
+        self.name  = fp.name
+        self.fp    = getattr(fp, 'buffer', fp)          # sys.stdin on Python 3
+        self.stage = None
+
+    def _blocks(self):
+        read = getattr(self.fp, 'read1', self.fp.read)   # don't wait for a full block from a pipe
+        while True:
+            block = read(BLOCK_BYTES)
+            if not block:
+                break
+            yield block
+
+    def chunks(self):
+        """
+        chunks - generator yielding the report in blocks as they are read
+        """
+        if self.stage is not None:
+            raise ValueError("{0}: report can only be read once".format(self.name))
+
+        self.stage = stage("read {0}".format(self.name), self._blocks(), QUEUE_BLOCKS)
+        return iter(self.stage)
+
+    def close(self):
+        if self.stage is not None:
+            self.stage.close()
+
+def _batches(rows):
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, ROW_BATCH))
+        if len(batch) == 0:
+            break
+        yield batch
+
+def run(parser, rows=None, output=None):
+    """
+    run - parse and write a report in three stages connected by bounded queues
+
+        reader  - reads parser.fp in blocks (see prefetched)
+        parser  - splits the blocks into lines and decodes them with
+                  parser.records(), handing on batches of ROW_BATCH rows
+        writer  - the calling thread; writes the rows with
+                  parser.stream_data(), so the output is that of -s/--stream
+
+    Reads, field decoding and output writes overlap, and at most QUEUE_BLOCKS
+    blocks and QUEUE_BATCHES row batches are in flight, so memory use does
+    not grow with the report.  Decoding holds the interpreter lock; the gain
+    is in the time spent waiting on reads and writes, e.g. on network shares.
+    On a local disk the memory mapped read of -s/--stream is usually faster.
+    A compressed report (see compress.py) is already read on a thread of its
+    own and is not wrapped again.  When 'rows' is given (e.g. from
+    shard.records()), it replaces the reader and parser stages' records().
+    Returns the number of rows written.
+    """
+    start_tm = datetime.datetime.now()
+    parser.logger.info("start pipeline")
+    orig_fp = parser.fp
+    reader  = None
+    if rows is None:
+        if not hasattr(parser.fp, 'chunks'):
+            reader = parser.fp = prefetched(parser.fp)
+        rows = parser.records()
+
+    parsed = stage("parse {0}".format(orig_fp.name), _batches(rows), QUEUE_BATCHES)
+    try:
+        written = parser.stream_data(itertools.chain.from_iterable(parsed), output)
+    finally:
+        parsed.close()
+        if reader is not None:
+            reader.close()
+        parser.fp = orig_fp
+
+    end_tm = datetime.datetime.now()
+    parser.logger.info("pipeline complete (elapsed time: {0})".format(end_tm - start_tm))
+    return written
@@ -0,0 +1,216 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+import os
+import marshal
+import datetime
+
+import codec
+import sinks
+import spill
+
+class pivot(object):
+    """
+    pivot - one row per EMPDWN user instead of one per user and association
+
+    EMPDWN lists every user once per association (ASSN), repeating TELLER NO,
+    BRANCH, DEPT, EMPL NAME and EMPL ID.  Rows are grouped on (TELLER NO,
+    EMPL ID) in a hash table and written as one row with those columns,
+    followed by STATUS n, AUTH LVL n, PIN CHG n and LAST LOGIN n for each
+    association n found in the report (empty when the user is not in it).
+    Users come out in the order they first appear in the report.
+
+    Memory is bounded by 'max_keys' users.  When the table outgrows it, the
+    users held and every row still to come are hash partitioned on their key
+    into PARTITIONS spill files; each file is then grouped on its own
+    (partitioned again if it is still too large), written back sorted by
+    first appearance, and the sorted runs are merged into report order.
+    Spill files are kept in a temporary directory under 'tmp_dir' (see
+    spill.py).
+    """
+
+    COMMON_COLS = ('TELLER NO', 'EMPL ID', 'EMPL NAME', 'BRANCH', 'DEPT')
+    ASSN_COLS   = ('STATUS', 'AUTH LVL', 'PIN CHG', 'LAST LOGIN')
+    SQL_INDEXES = ('EMPL ID', 'TELLER NO')
+    MAX_KEYS    = 250000
+    PARTITIONS  = 32
+    MAX_DEPTH   = 12                    # PARTITIONS ** MAX_DEPTH buckets use the 60 low hash bits
+
+    def __init__(self, parser, logger, rows=None, max_keys=None, tmp_dir=None, debug=False):
+        self.parser      = parser               # empdwn parser
+        self.fp          = parser.fp            # see sinks.open_sink()
+        self.logger      = logger
+        self.rows        = rows                 # e.g. shard.records(); default parser.records()
+        self.max_keys    = max_keys or self.MAX_KEYS
+        self.tmp_dir     = tmp_dir
+        self.debug       = debug
+        self.assns       = set()
+        self.column_hdrs = []
+
+        hdrs = [fieldspec[0] for fieldspec in parser.fieldspecs]
+        self.assn_idx   = hdrs.index('ASSN')
+        self.key_idx    = (hdrs.index('TELLER NO'), hdrs.index('EMPL ID'))
+        self.common_idx = [hdrs.index(col) for col in self.COMMON_COLS]
+        self.values_idx = [hdrs.index(col) for col in self.ASSN_COLS]
+
+    @property
+    def SQL_TYPES(self):
+        types = dict((col, self.parser.SQL_TYPES[col]) for col in self.COMMON_COLS if col in self.parser.SQL_TYPES)
+        for assn in self.assns:
+            for col in self.ASSN_COLS:
+                if col in self.parser.SQL_TYPES:
+                    types["{0} {1}".format(col, assn)] = self.parser.SQL_TYPES[col]
+        return types
+
+    @staticmethod
+    def _add(groups, key, seq, common, values):
+        #
+        #    a group is [first seq, common columns, {assn: values}]; the first
+        #    row seen for a key and association wins
+        #
+        group = groups.get(key)
+        if group is None:
+            groups[key] = [seq, common, dict(values)]
+            return
+
+        if seq < group[0]:
+            group[0] = seq
+            group[1] = common
+        for (assn, vals) in values.items():
+            group[2].setdefault(assn, vals)
+
+    @classmethod
+    def _bucket(cls, key, depth):
+        #
+        #    each level uses the next bits of the hash: the keys of one spill
+        #    file share their lower bits, so salting the hash with the depth
+        #    would send most of them to the same file again
+        #
+        return hash(key) // (cls.PARTITIONS ** depth) % cls.PARTITIONS
+
+    def _partition(self, groups, depth):
+        #
+        #    spill the groups held into PARTITIONS files by a hash of the key;
+        #    the caller writes every later row to the returned files
+        #
+        paths = [self.spill.path("{0:d}.{1:d}".format(depth, i)) for i in range(self.PARTITIONS)]
+        files = [open(path, "wb") for path in paths]
+        for (key, group) in groups:
+            values = dict((assn, codec.plain(vals)) for (assn, vals) in group[2].items())
+            marshal.dump((key, group[0], group[1], values), files[self._bucket(key, depth)])
+
+        return (paths, files)
+
+    def _runs(self, path, depth):
+        """
+        _runs - group one spill file; returns the paths of its sorted runs
+        """
+        groups = {}
+        spilled = None
+        for (key, seq, common, values) in self.spill.load(path):
+            if spilled is not None:
+                marshal.dump((key, seq, common, values), spilled[1][self._bucket(key, depth)])
+                continue
+
+            self._add(groups, key, seq, common, values)
+            if len(groups) > self.max_keys and depth < self.MAX_DEPTH:
+                spilled = self._partition(groups.items(), depth)
+                groups = {}
+        os.remove(path)
+
+        if spilled is not None:
+            runs = []
+            for fp in spilled[1]:
+                fp.close()
+            for sub_path in spilled[0]:
+                runs.extend(self._runs(sub_path, depth + 1))
+            return runs
+
+        if len(groups) == 0:
+            return []
+
+        return [self.spill.run((group[0], key, group[1], group[2])
+                               for (key, group) in sorted(groups.items(), key=lambda item: item[1][0]))]
+
+    def _row(self, common, values, assns):
+        row = list(common)
+        for assn in assns:
+            row.extend(values.get(assn, (None,) * len(self.ASSN_COLS)))
+        return row
+
+    def records(self):
+        """
+        records - generator yielding the pivoted rows
+
+        The whole report is read before the first row is yielded: the
+        associations (and so the columns) are only known at the end.
+        """
+        rows = self.rows if self.rows is not None else self.parser.records()
+        (assn_idx, key_idx, common_idx, values_idx) = (self.assn_idx, self.key_idx, self.common_idx, self.values_idx)
+
+        self.spill = None
+        groups  = {}
+        spilled = None
+        nrows   = 0
+        try:
+            for row in rows:
+                assn = row[assn_idx]
+                self.assns.add(assn)
+                key    = (row[key_idx[0]], row[key_idx[1]])
+                common = [row[i] for i in common_idx]
+                values = {assn: tuple(row[i] for i in values_idx)}
+                if spilled is not None:
+                    values[assn] = codec.plain(values[assn])
+                    marshal.dump((key, nrows, common, values), spilled[1][self._bucket(key, 0)])
+                else:
+                    self._add(groups, key, nrows, common, values)
+                    if len(groups) > self.max_keys:
+                        self.spill = spill.spill("pivot.", self.tmp_dir)
+                        self.logger.info("pivot: more than {0:d} users, spilling to {1}".format(self.max_keys, self.spill.dir))
+                        spilled = self._partition(groups.items(), 0)
+                        groups = {}
+                nrows += 1
+
+            assns = sorted(self.assns)
+            self.column_hdrs = list(self.COMMON_COLS) + ["{0} {1}".format(col, assn)
+                                                         for assn in assns for col in self.ASSN_COLS]
+            self.logger.info("pivot: {0:d} rows, {1:d} associations".format(nrows, len(assns)))
+
+            if spilled is None:
+                for (key, group) in sorted(groups.items(), key=lambda item: item[1][0]):
+                    yield self._row(group[1], group[2], assns)
+                return
+
+            for fp in spilled[1]:
+                fp.close()
+            runs = []
+            for path in spilled[0]:
+                runs.extend(self._runs(path, 1))
+            if self.debug:
+                self.logger.debug("pivot: merging {0:d} sorted runs".format(len(runs)))
+            for (seq, key, common, values) in self.spill.merge(runs):
+                yield self._row(common, values, assns)
+        finally:
+            if spilled is not None:
+                for fp in spilled[1]:
+                    fp.close()
+            if self.spill is not None:
+                self.spill.close()
+
+    def write_data(self, output=None):
+        """
+        write_data - write the pivoted rows (see sinks.open_sink() for 'output');
+                     returns the number of rows written
+        """
+        self.parser.metrics.start('pivot')
+        start_tm = datetime.datetime.now()
+        self.logger.info("start pivot")
+        written_buf = sinks.write_rows(self, self.records(), output)
+
+        end_tm = datetime.datetime.now()
+        self.logger.info("pivot complete: {0:d} users (elapsed time: {1})".format(written_buf, end_tm - start_tm))
+        self.parser.metrics.stop('pivot', written_buf)
+        return written_buf
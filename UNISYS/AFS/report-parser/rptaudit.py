@@ -0,0 +1,233 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+import json
+import datetime
+
+import codec
+import sinks
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def _need_numpy():
+    if numpy is None:
+        raise ValueError("audit rules need the numpy module (pip install numpy)")
+
+COMPARE_OPS  = {
+    '>':  lambda col, val: col > val,
+    '>=': lambda col, val: col >= val,
+    '<':  lambda col, val: col < val,
+    '<=': lambda col, val: col <= val,
+    '==': lambda col, val: col == val,
+    '!=': lambda col, val: col != val,
+}
+DATE_OPS     = ('older_than', 'before', 'after')
+OTHER_OPS    = ('in', 'missing', 'present')
+TEXT_OPS     = ('==', '!=', 'in', 'missing', 'present')
+
+def load_rules(fname):
+    """
+    load_rules - read and check a JSON rule set:
+
+        {
+            "as_of": "2016-01-15",
+            "rules": [
+                {"name": "PIN not changed in 90 days", "report": "empdwn",
+                 "where": [{"column": "PIN CHG", "op": "older_than", "days": 90}]},
+                {"name": "AUTH LVL above 25", "report": "empdwn",
+                 "where": [{"column": "AUTH LVL", "op": ">", "value": 25},
+                           {"column": "STATUS", "op": "==", "value": 1}]}
+            ]
+        }
+
+    A rule flags the rows of its report type that meet all of its "where"
+    conditions.  Operators are >, >=, <, <=, == and != (numbers, text, or
+    dates as YYYY-MM-DD), "in" (a list of values), "missing" and "present"
+    (blank or unreadable, or not), and for date columns "before" and "after"
+    (a date) and "older_than" ("days" before "as_of", which defaults to
+    today; blank dates never match, see "missing").
+    """
+    with open(fname) as fp:
+        try:
+            ruleset = json.load(fp)
+        except ValueError as e:
+            raise ValueError("{0}: invalid rule set: {1}".format(fname, e))
+
+    if not isinstance(ruleset, dict) or not isinstance(ruleset.get('rules'), list):
+        raise ValueError("{0}: expected an object with a \"rules\" list".format(fname))
+
+    for rule in ruleset['rules']:
+        name = rule.get('name')
+        if not name or rule.get('report') not in ('empdwn', 'trnsec', 'tslist') or not rule.get('where'):
+            raise ValueError("{0}: rule {1}: needs a name, a report (empdwn, trnsec or tslist) and where conditions".format(fname, name))
+        for cond in rule['where']:
+            op = cond.get('op')
+            if 'column' not in cond or (op not in COMPARE_OPS and op not in DATE_OPS and op not in OTHER_OPS):
+                raise ValueError("{0}: rule {1}: invalid condition {2}".format(fname, name, json.dumps(cond)))
+            if op == 'older_than' and not isinstance(cond.get('days'), int):
+                raise ValueError("{0}: rule {1}: older_than needs a number of \"days\"".format(fname, name))
+
+    return ruleset
+
+class rptaudit(object):
+    """
+    rptaudit - evaluate audit rules (see load_rules()) over a parsed report
+
+    The report is read once and each column named by a rule is loaded into a
+    NumPy array: DATE columns (see the parser's SQL_TYPES) as datetime64[D],
+    with NaT for blank or invalid dates, INTEGER columns as int64 with a mask
+    of the non-blank values, and other columns as text.  A date is converted
+    once, however many rows repeat it.  Each condition is evaluated as one
+    vectorized comparison over its column, the conditions of a rule are
+    and-ed into a mask, and the rows it selects are written as the
+    violations, with the rule name in a leading RULE column (rules in rule
+    set order, rows in report order).  TRNSEC rows carry their association
+    and authority level (ASSN and AUTH LEVEL columns).
+    """
+
+    def __init__(self, parser, filetype, ruleset, logger, rows=None, debug=False):
+        _need_numpy()
+
+        self.parser      = parser
+        self.fp          = parser.fp                # see sinks.open_sink()
+        self.filetype    = filetype
+        self.logger      = logger
+        self.rows        = rows                     # e.g. shard.records(); default parser.records()
+        self.debug       = debug
+        self.rules       = [rule for rule in ruleset['rules'] if rule['report'] == filetype]
+        self.column_hdrs = []
+
+        as_of = ruleset.get('as_of')
+        self.as_of = numpy.datetime64(as_of or datetime.date.today().isoformat(), 'D')
+
+        self.SQL_TYPES = dict(parser.SQL_TYPES)
+        if filetype == 'trnsec':
+            self.SQL_TYPES.update({'ASSN': 'INTEGER', 'AUTH LEVEL': 'INTEGER'})
+        self.SQL_INDEXES = ('RULE',) + tuple(parser.SQL_INDEXES)
+
+    def _records(self):
+        parser = self.parser
+        rows = self.rows if self.rows is not None else parser.records()
+        if self.filetype != 'trnsec':
+            return rows
+        return ([parser.assn, int(parser.level)] + row for row in rows)
+
+    def _hdrs(self):
+        hdrs = list(self.parser.column_hdrs)
+        if self.filetype == 'trnsec':
+            return ['ASSN', 'AUTH LEVEL'] + hdrs
+        return hdrs
+
+    @staticmethod
+    def _dates(values):
+        #
+        #    rows share their codec.rptdate objects, so the distinct values are few
+        #
+        dates = {}
+        for value in set(values):
+            date = codec.to_date(value)
+            if isinstance(date, datetime.date):
+                dates[value] = numpy.datetime64(date.isoformat(), 'D')
+            else:
+                dates[value] = numpy.datetime64('NaT')
+        return numpy.array([dates[value] for value in values], dtype='datetime64[D]')
+
+    @staticmethod
+    def _integers(values):
+        ints = [sinks.sqlite_sink._integer(value) for value in values]
+        valid = numpy.array([value is not None for value in ints], dtype=bool)
+        return (numpy.array([0 if value is None else value for value in ints], dtype=numpy.int64), valid)
+
+    def _column(self, col, values):
+        """
+        _column - (kind, array, valid mask) for the values of one column
+        """
+        if self.SQL_TYPES.get(col) == 'DATE':
+            arr = self._dates(values)
+            return ('date', arr, ~numpy.isnat(arr))
+        if self.SQL_TYPES.get(col) == 'INTEGER':
+            (arr, valid) = self._integers(values)
+            return ('int', arr, valid)
+        arr = numpy.array([(value or '').strip() for value in values], dtype=object)
+        return ('text', arr, arr != '')
+
+    def _mask(self, rule, columns, nrows):
+        mask = numpy.ones(nrows, dtype=bool)
+        for cond in rule['where']:
+            (kind, arr, valid) = columns[cond['column']]
+            op = cond['op']
+            value = cond.get('value')
+            if kind == 'date' and value is not None and op not in ('missing', 'present'):
+                value = [numpy.datetime64(v, 'D') for v in value] if op == 'in' else numpy.datetime64(value, 'D')
+
+            if op == 'missing':
+                mask &= ~valid
+            elif op == 'present':
+                mask &= valid
+            elif kind == 'text' and op not in TEXT_OPS:
+                raise ValueError("rule {0}: {1} cannot be used on text column {2}".format(rule['name'], op, cond['column']))
+            elif op in DATE_OPS and kind != 'date':
+                raise ValueError("rule {0}: {1} needs a date column, not {2}".format(rule['name'], op, cond['column']))
+            elif op == 'older_than':
+                mask &= valid & (arr < self.as_of - numpy.timedelta64(cond['days'], 'D'))
+            elif op == 'before':
+                mask &= valid & (arr < value)
+            elif op == 'after':
+                mask &= valid & (arr > value)
+            elif op == 'in':
+                mask &= valid & numpy.isin(arr, numpy.array(value, dtype=arr.dtype))
+            else:
+                mask &= valid & COMPARE_OPS[op](arr, value)
+        return mask
+
+    def records(self):
+        """
+        records - generator yielding the violations of the rules
+        """
+        rows = list(self._records())
+        hdrs = self._hdrs()
+        self.column_hdrs = ['RULE'] + hdrs
+        if len(self.rules) == 0:
+            self.logger.warning("audit: no rules for {0} reports".format(self.filetype))
+            return
+
+        used = set(cond['column'] for rule in self.rules for cond in rule['where'])
+        missing = [col for col in sorted(used) if col not in hdrs]
+        if missing:
+            raise ValueError("audit: column(s) {0} not found in {1} reports".format(", ".join(missing), self.filetype))
+
+        start_tm = datetime.datetime.now()
+        columns = {}
+        for col in used:
+            i = hdrs.index(col)
+            columns[col] = self._column(col, [row[i] if i < len(row) else None for row in rows])
+        if self.debug:
+            self.logger.debug("audit: {0:d} columns of {1:d} rows loaded (elapsed time: {2})".format(
+                              len(columns), len(rows), datetime.datetime.now() - start_tm))
+
+        for rule in self.rules:
+            hits = numpy.flatnonzero(self._mask(rule, columns, len(rows)))
+            self.logger.info("audit: {0}: {1:d} violations".format(rule['name'], len(hits)))
+            for i in hits:
+                yield [rule['name']] + list(rows[i])
+
+    def write_data(self, output=None):
+        """
+        write_data - write the violations (see sinks.open_sink() for 'output');
+                     returns the number of rows written
+        """
+        self.parser.metrics.start('audit')
+        start_tm = datetime.datetime.now()
+        self.logger.info("start audit")
+        written_buf = sinks.write_rows(self, self.records(), output)
+
+        end_tm = datetime.datetime.now()
+        self.logger.info("audit complete: {0:d} violations (elapsed time: {1})".format(written_buf, end_tm - start_tm))
+        self.parser.metrics.stop('audit', written_buf)
+        return written_buf
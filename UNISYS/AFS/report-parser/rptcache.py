@@ -0,0 +1,151 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+import os
+import sys
+import json
+import zlib
+import marshal
+import hashlib
+import datetime
+
+import codec
+
+class rptcache(object):
+    """
+    rptcache - content addressed cache of parse results
+
+    Entries are keyed by the SHA-1 of the input report, the parser type, the
+    parser's VERSION, its PARSE_OPTIONS settings and the Python major version
+    (marshal gives back Python 2 strings as bytes on Python 3), and hold the parsed rows ('buffers') together with the
+    parser's RESUME_STATE attributes (column headers, trnsec transaction codes)
+    as zlib compressed marshal data, dates as their report text (the parser's
+    DATE columns in 'SQL_TYPES' are converted back on a hit).  A hit fills the
+    parser directly so parse() can be skipped.
+
+    The cache directory is kept under 'max_bytes' by removing the least
+    recently used entries; an entry's mtime is refreshed on every hit.  The
+    SHA-1 of each input is remembered against its path, size and mtime so an
+    unchanged report is not hashed again.
+    """
+
+    HASH_BLOCK = 16 * 1024 * 1024
+    SUFFIX     = ".rpt"
+
+    def __init__(self, cache_dir, max_bytes, logger):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.logger    = logger
+
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+        self.hash_memo_name = os.path.join(cache_dir, "hashes.json")
+
+    def _file_hash(self, fname):
+        path = os.path.abspath(fname)
+        st = os.stat(path)
+
+        memo = {}
+        if os.path.exists(self.hash_memo_name):
+            with open(self.hash_memo_name, "r") as fp:
+                memo = json.load(fp)
+
+        saved = memo.get(path)
+        if saved is not None and saved[0] == st.st_size and saved[1] == st.st_mtime:
+            return saved[2]
+
+        hasher = hashlib.sha1()
+        with open(path, "rb") as fp:
+            while True:
+                block = fp.read(self.HASH_BLOCK)
+                if not block:
+                    break
+                hasher.update(block)
+
+        memo[path] = [st.st_size, st.st_mtime, hasher.hexdigest()]
+        self._atomic_write(self.hash_memo_name, json.dumps(memo).encode('utf-8'))
+        return hasher.hexdigest()
+
+    def _atomic_write(self, fname, data):
+        tmp_name = "{0}.{1:d}.tmp".format(fname, os.getpid())
+        with open(tmp_name, "wb") as fp:
+            fp.write(data)
+        os.rename(tmp_name, fname)
+
+    def entry_name(self, parser):
+        key = "{0}:{1}:{2}:py{3:d}".format(self._file_hash(parser.fp.name), type(parser).__name__, parser.VERSION,
+                                           sys.version_info[0])
+        for attr in getattr(parser, 'PARSE_OPTIONS', ()):
+            key += ":{0}={1}".format(attr, getattr(parser, attr))
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + self.SUFFIX)
+
+    def load(self, parser):
+        """
+        load - fill 'parser' from the cache; returns False on a miss
+        """
+        start_tm = datetime.datetime.now()
+        entry = self.entry_name(parser)
+        if not os.path.exists(entry):
+            self.logger.info("cache miss for {0}".format(parser.fp.name))
+            return False
+
+        with open(entry, "rb") as fp:
+            saved = marshal.loads(zlib.decompress(fp.read()))
+
+        for (attr, val) in saved['state'].items():
+            setattr(parser, attr, val)
+        parser.buffers = saved['buffers']
+        date_cols = [i for (i, col) in enumerate(parser.column_hdrs) if parser.SQL_TYPES.get(col) == 'DATE']
+        if date_cols:
+            for row in parser.buffers:
+                for i in date_cols:
+                    if i < len(row):
+                        row[i] = codec.to_date(row[i])
+        os.utime(entry, None)
+
+        end_tm = datetime.datetime.now()
+        self.logger.info("cache hit for {0}: {1:d} rows (elapsed time: {2})".format(parser.fp.name,
+                                                                                   len(parser.buffers),
+                                                                                   end_tm - start_tm
+                                                                                  )
+                        )
+        return True
+
+    def store(self, parser):
+        """
+        store - save the parse results in 'parser' and evict old entries
+        """
+        entry = self.entry_name(parser)
+        saved = {
+            'state':   dict((attr, getattr(parser, attr)) for attr in parser.RESUME_STATE),
+            'buffers': [codec.plain(row) for row in parser.buffers],
+        }
+        self._atomic_write(entry, zlib.compress(marshal.dumps(saved), 1))
+        self.logger.info("cached {0:d} rows for {1} in {2}".format(len(parser.buffers), parser.fp.name, entry))
+        self.evict()
+
+    def evict(self):
+        """
+        evict - remove least recently used entries until the cache fits in max_bytes
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(self.SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            st = os.stat(path)
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        entries.sort()
+        for (mtime, size, path) in entries:
+            if total <= self.max_bytes:
+                break
+            self.logger.info("evicting {0} from the cache".format(path))
+            os.remove(path)
+            total -= size
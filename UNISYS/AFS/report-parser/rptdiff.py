@@ -0,0 +1,286 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+import os
+import datetime
+import itertools
+
+import batch
+import codec
+import compress
+import sinks
+import spill
+
+class rptdiff(object):
+    """
+    rptdiff - added, removed and changed records between two runs of a report
+
+    Rows of the old and new report are matched on the key columns of their
+    report type ('KEYS'); a row is changed when any other column differs,
+    except for the columns in 'IGNORE' (LAST LOGIN moves on every run).
+    TRNSEC rows are diffed with their association and authority level (ASSN
+    and AUTH LEVEL columns), so a move to another level shows up as a removed
+    and an added row.  Each output row is
+
+        CHANGE   - added, removed or changed
+        CHANGED  - "column: old -> new" for each changed column
+        ...      - the report columns (the old row for removed records)
+
+    When the old report has at most 'max_rows' rows, it is loaded into a hash
+    index on the key and the new report is streamed against it (rows come out
+    in new report order, then the removed rows).  Otherwise both reports are
+    sorted on the key in runs of 'max_rows' rows (in a temporary directory
+    under 'tmp_dir', see spill.py) and merged (rows come out in key order),
+    so memory stays bounded whatever the report sizes.  Rows repeating a key
+    are paired in report order after identical rows have been matched.
+    """
+
+    KEYS        = {
+        'empdwn': ('ASSN', 'TELLER NO'),
+        'trnsec': ('ASSN', 'AUTH LEVEL', 'EMPL NO'),
+        'tslist': ('ASSN #', 'TRX#', 'Assigned level'),
+    }
+    IGNORE      = {
+        'empdwn': ('LAST LOGIN',),
+    }
+    MAX_ROWS    = 500000
+
+    def __init__(self, old, new, filetype, logger, max_rows=None, tmp_dir=None, debug=False):
+        self.old         = old                  # parsers of the same report type
+        self.new         = new
+        self.fp          = new.fp               # see sinks.open_sink()
+        self.filetype    = filetype
+        self.logger      = logger
+        self.max_rows    = max_rows or self.MAX_ROWS
+        self.tmp_dir     = tmp_dir
+        self.debug       = debug
+        self.column_hdrs = []
+        self.counts      = {'added': 0, 'removed': 0, 'changed': 0}
+
+        self.SQL_TYPES = dict(new.SQL_TYPES)
+        if filetype == 'trnsec':
+            self.SQL_TYPES.update({'ASSN': 'INTEGER', 'AUTH LEVEL': 'INTEGER'})
+        self.SQL_INDEXES = tuple(new.SQL_INDEXES) + ('CHANGE',)
+
+    def _rows(self, parser):
+        #
+        #    report rows padded to the column headers (TSLIST rows without job
+        #    IDs are one column short); TRNSEC rows get the association and
+        #    authority level in front
+        #
+        hdrs = None
+        for row in parser.records():
+            if hdrs is None:
+                hdrs = list(parser.column_hdrs)
+                if self.filetype == 'trnsec':
+                    hdrs = ['ASSN', 'AUTH LEVEL'] + hdrs
+                self._columns(hdrs)
+            if self.filetype == 'trnsec':
+                row = [parser.assn, int(parser.level)] + row
+            if len(row) < len(hdrs):
+                row = row + [None] * (len(hdrs) - len(row))
+            yield row
+
+    def _columns(self, hdrs):
+        if self.column_hdrs:
+            if ['CHANGE', 'CHANGED'] + hdrs != self.column_hdrs:
+                raise ValueError("diff: {0} and {1} have different columns".format(self.old.fp.name, self.new.fp.name))
+            return
+
+        missing = [col for col in self.KEYS[self.filetype] if col not in hdrs]
+        if missing:
+            raise ValueError("diff: key column(s) {0} not found in {1}".format(", ".join(missing), self.filetype))
+
+        ignore = self.IGNORE.get(self.filetype, ())
+        self.hdrs        = hdrs
+        self.key_idx     = [hdrs.index(col) for col in self.KEYS[self.filetype]]
+        self.cmp_idx     = [i for (i, col) in enumerate(hdrs) if col not in ignore and i not in self.key_idx]
+        self.column_hdrs = ['CHANGE', 'CHANGED'] + hdrs
+
+    def _key(self, row):
+        return tuple(row[i] for i in self.key_idx)
+
+    def _sort_key(self, row):
+        #
+        #    the key as sorted and merged: None (e.g. the Assigned level of a
+        #    TSLIST transaction without job IDs) sorts first and is never
+        #    compared with a value, and stays apart from ""
+        #
+        return tuple((row[i] is not None, row[i]) for i in self.key_idx)
+
+    def _same(self, old, new):
+        for i in self.cmp_idx:
+            if old[i] != new[i]:
+                return False
+        return True
+
+    def _pair(self, olds, news):
+        """
+        _pair - output rows for the old and new rows of one key
+        """
+        olds = list(olds)
+        changed = []
+        for new in news:
+            for (i, old) in enumerate(olds):
+                if self._same(old, new):
+                    del olds[i]
+                    break
+            else:
+                changed.append(new)
+
+        for (old, new) in zip(olds, changed):
+            cols = ["{0}: {1} -> {2}".format(self.hdrs[i], '' if old[i] is None else old[i],
+                                            '' if new[i] is None else new[i])
+                    for i in self.cmp_idx if old[i] != new[i]]
+            self.counts['changed'] += 1
+            yield ['changed', "; ".join(cols)] + new
+        for new in changed[len(olds):]:
+            self.counts['added'] += 1
+            yield ['added', None] + new
+        for old in olds[len(changed):]:
+            self.counts['removed'] += 1
+            yield ['removed', None] + old
+
+    def _hash_join(self, index, order):
+        #
+        #    the old rows are in 'index' (key -> rows, keys in report order);
+        #    rows of the new report that match an old row exactly are dropped
+        #    as they stream past, the others are held until the end
+        #
+        pending = {}
+        pending_order = []
+        for new in self._rows(self.new):
+            key = self._key(new)
+            olds = index.get(key)
+            if olds is not None:
+                for (i, old) in enumerate(olds):
+                    if self._same(old, new):
+                        del olds[i]
+                        break
+                else:
+                    olds = None
+                if olds is not None:
+                    continue
+
+            if key not in pending:
+                pending[key] = []
+                pending_order.append(key)
+            pending[key].append(new)
+
+        for key in pending_order:
+            for row in self._pair(index.pop(key, ()), pending[key]):
+                yield row
+        for key in order:
+            if key in index:
+                for row in self._pair(index.pop(key), ()):
+                    yield row
+
+    def _run(self, items):
+        return self.spill.run(item[:3] + (codec.plain(item[3]),)
+                              for item in sorted(items, key=lambda item: item[:3]))
+
+    def _sort(self, rows, side, runs, start=0):
+        #
+        #    write (key, side, seq, row) items sorted on (key, side, seq) in
+        #    runs of 'max_rows' items; 'seq' keeps the report order and keeps
+        #    rows out of the comparison
+        #
+        items = []
+        for (seq, row) in enumerate(rows, start):
+            items.append((self._sort_key(row), side, seq, row))
+            if len(items) >= self.max_rows:
+                runs.append(self._run(items))
+                items = []
+        if items:
+            runs.append(self._run(items))
+
+    def _sort_merge(self, items, old_rows):
+        #
+        #    'items' are the old rows read so far, 'old_rows' the rest
+        #
+        runs = [self._run([(self._sort_key(row), side, seq, row) for (key, side, seq, row) in items])]
+        self._sort(old_rows, 0, runs, len(items))
+        self._sort(self._rows(self.new), 1, runs)
+        if self.debug:
+            self.logger.debug("diff: merging {0:d} sorted runs".format(len(runs)))
+
+        for (key, group) in itertools.groupby(self.spill.merge(runs), lambda item: item[0]):
+            olds = []
+            news = []
+            for (key, side, seq, row) in group:
+                (news if side else olds).append(row)
+            for row in self._pair(olds, news):
+                yield row
+
+    def records(self):
+        """
+        records - generator yielding the added, removed and changed rows
+        """
+        self.spill = None
+        old_rows = self._rows(self.old)
+        index    = {}
+        order    = []
+        items    = []
+        try:
+            for (seq, row) in enumerate(old_rows):
+                key = self._key(row)
+                if key not in index:
+                    index[key] = []
+                    order.append(key)
+                index[key].append(row)
+                items.append((key, 0, seq, row))
+                if len(items) > self.max_rows:
+                    break
+            else:
+                self.logger.info("diff: hash join on {0:d} old rows".format(len(items)))
+                for row in self._hash_join(index, order):
+                    yield row
+                return
+
+            index = order = None
+            self.spill = spill.spill("diff.", self.tmp_dir)
+            self.logger.info("diff: more than {0:d} old rows, sort-merge in {1}".format(self.max_rows, self.spill.dir))
+            for row in self._sort_merge(items, old_rows):
+                yield row
+        finally:
+            if self.spill is not None:
+                self.spill.close()
+
+    def write_data(self, output=None):
+        """
+        write_data - write the differences (default: <type>_diff.csv in the
+                     current directory); returns the number of rows written
+        """
+        start_tm = datetime.datetime.now()
+        self.logger.info("start diff {0} -> {1}".format(self.old.fp.name, self.new.fp.name))
+        if output is None:
+            output = os.path.join(os.getcwd(), "{0}_diff.csv".format(self.filetype))
+
+        written_buf = sinks.write_rows(self, self.records(), output)
+
+        end_tm = datetime.datetime.now()
+        self.logger.info("diff complete: {0:d} added, {1:d} removed, {2:d} changed (elapsed time: {3})".format(
+                         self.counts['added'], self.counts['removed'], self.counts['changed'], end_tm - start_tm))
+        return written_buf
+
+def open_reports(fnames, logger, debug=False):
+    """
+    open_reports - build an rptdiff from an old and a new run of the same
+                   report, in that order
+    """
+    if len(fnames) != 2:
+        raise ValueError("diff: needs the old and the new report, in that order")
+
+    filetypes = [batch.detect_type(fname) for fname in fnames]
+    for (fname, filetype) in zip(fnames, filetypes):
+        if filetype is None:
+            raise ValueError("{0}: not an EMPDWN, TSLIST or TRNSEC report".format(fname))
+    if filetypes[0] != filetypes[1]:
+        raise ValueError("diff: {0} ({1}) and {2} ({3}) are different reports".format(fnames[0], filetypes[0],
+                                                                                    fnames[1], filetypes[1]))
+
+    (old, new) = [batch.REPORT_TYPES[filetypes[0]](compress.open_report(fname), logger, debug) for fname in fnames]
+    return rptdiff(old, new, filetypes[0], logger, debug=debug)
@@ -0,0 +1,198 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+import sys
+import random
+import logging
+import argparse
+import datetime
+from os.path import basename
+from os.path import splitext
+
+#
+#    Layouts follow the "Report format" samples in the empdwn, tslist and trnsec
+#    docstrings; every page starts with the report header line and page
+#    numbers restart for each association.
+#
+EMPDWN_HDR = ("000 Wells Fargo Dealer Services              AFS USERS REPORT                       "
+              "EMPDWN  {0}  RUN: {0}   PAGE: {1:8d}")
+EMPDWN_PAGE_HDR = ("OBJECT/RP3/EMPDWN                                                                                    TIME: 19:00:58\n"
+                   "ASSN TELLER NO BRANCH DEPT PIN CHG  STATUS AUTH LVL EMPL NAME                        EMPL ID  LAST LOGIN\n"
+                   "---- --------- ------ ---- -------- ------ -------- -------------------------------- -------- ----------")
+EMPDWN_LINE = "{0:4d}{1:10d}{2:7d} {3:4} {4:8}{5:7d}{6:9d} {7:32} {8:8}"
+
+TSLIST_HDR = ("{0:03d} Wells Fargo Dealer Services              SECURITY TRANSACTION LIST              "
+              "TSLIST  REPORT {1}  RUN {1}  PAGE {2:4d}")
+TSLIST_COL_HDR = "AP TRC LN TRX# TT DESC                JOB DESCRIPTIONS"
+TSLIST_LINE = "{0:2} {1:3} {2:2} {3:4d} {4:2} {5:19}"
+
+TRNSEC_HDR = ("{0:03d} Wells Fargo Dealer Services              TRANSACTION SECURITY REPORT            "
+              "TRNSEC  REPORT {1}  RUN {1}  PAGE {2:4d}")
+TRNSEC_LEVEL = "                                             JD/AUTHORITY LEVEL {0:d} TRANSACTIONS"
+TRNSEC_LINE = ("EMPL NO: {0:04d}-{1:d} HR NO: {2:5} NAME: {3:32} BR NO: {4:3d} LAST PIN CHG: {5:>8} "
+               "PIN CHG DAYS: {6:d} GLOBAL: {7:d}")
+
+FIRST_NAMES = ("AARON", "ALISON", "CHRISTINE", "COREY", "DAMIAN", "DAVID", "DENNIS", "DEVON", "ED", "ELOID",
+               "ERIK", "GLENN", "JAMES", "JOSHUA", "LOUIS J", "MANNY", "NICOLE", "RICHARD", "RIGO", "THOMAS")
+LAST_NAMES  = ("BAUMANN", "BURNHAM", "CALLWOOD", "CAMARENA", "COLLINS", "COX", "DERMODY", "FLETCHER", "GARCIA",
+               "GOLSTON", "HARO", "HEREN", "HOLTON", "KAHN", "KENNEDY", "MEDRANO", "OLDHAM", "RAYFORD",
+               "RICHMAN", "ROSALES", "SALAHSHOUR", "SIOMA", "WEISS")
+DESCS       = ("ALLOCATE ADDTL PRIN", "AVAIL PATTERNS INQ", "LOAN PATTERN MAINT", "CL PATTERN HIST",
+               "DISTRIBUTION CORR", "ACCRUED INT INQ", "ALPHA INQUIRY", "ALT NAME ADDR CHNGE", "BALANCE INQUIRY",
+               "CIF ALPHA INQ", "ACCT NUMBER LOOKUP", "ACCOUNT PROFILE", "COMB 2 CUST - REQ", "PLATFORM INQUIRY",
+               "NEXT TRAN REPLY", "COLLAT SYS SCREENS", "COLLAT TRACK TEST")
+APPS        = ("AC", "AP", "CD", "CF", "MS", "DP")
+TRAN_TYPES  = ("IQ", "FM")
+LETTERS     = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+def parse_size(spec):
+    """
+    parse_size - bytes in a size such as "10M", "1G" or "65536"
+    """
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    spec = spec.strip().upper().rstrip('B')
+    if spec and spec[-1] in units:
+        return int(float(spec[:-1]) * units[spec[-1]])
+    return int(spec)
+
+def _date(rnd):
+    return "{0:02d}/{1:02d}/{2:02d}".format(rnd.randint(1, 12), rnd.randint(1, 28), rnd.randint(14, 16))
+
+def _name(rnd):
+    return "{0} {1}".format(rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES))
+
+def empdwn_pages(rnd, associations, page_lines, run_date):
+    """
+    empdwn_pages - EMPDWN pages; each employee has one row per association and
+                   about a third of the rows have no LAST LOGIN (short lines)
+    """
+    page = 0
+    teller = 100
+    while True:
+        page += 1
+        lines = [EMPDWN_HDR.format(run_date, page), EMPDWN_PAGE_HDR]
+        while len(lines) < page_lines:
+            teller += rnd.randint(1, 9)
+            (branch, name, empl_id) = (rnd.randint(100, 999), _name(rnd), "{0}{1:06d}".format(rnd.choice("AUX"), teller))
+            pin_chg = _date(rnd) if rnd.random() < 0.8 else ""
+            for assn in range(1, associations + 1):
+                line = EMPDWN_LINE.format(assn, teller, branch, "0000", pin_chg, rnd.choice((1, 1, 1, 8)),
+                                          rnd.choice((15, 20, 29)), name, empl_id)
+                if rnd.random() < 0.67:
+                    line += "   " + _date(rnd)
+                lines.append(line.rstrip())
+        yield "\n".join(lines) + "\n"
+
+def tslist_pages(rnd, associations, page_lines, run_date):
+    """
+    tslist_pages - TSLIST pages for each association in turn; about a third of
+                   the transactions have no job IDs (short lines), the rest
+                   1 to 30 of the job IDs 00-99
+    """
+    trx = 1000
+    while True:
+        for assn in range(1, associations + 1):
+            for page in range(1, 11):
+                lines = [TSLIST_HDR.format(assn, run_date, page), TSLIST_COL_HDR]
+                while len(lines) < page_lines:
+                    trx += 1
+                    (app, trc) = (rnd.choice(APPS), "".join(rnd.sample(LETTERS, rnd.randint(2, 3))))
+                    if (app, trc) == ("AP", "TRC"):
+                        trc = "TRN"                 # would read as the column header line
+                    line = TSLIST_LINE.format(app, trc, "00", 1000 + trx % 9000, rnd.choice(TRAN_TYPES), rnd.choice(DESCS))
+                    if rnd.random() < 0.67:
+                        jobs = sorted(rnd.sample(range(100), rnd.randint(1, 30)))
+                        line += " " + " ".join("{0:02d}".format(job) for job in jobs)
+                    lines.append(line.rstrip())
+                yield "\n".join(lines) + "\n"
+
+def trnsec_pages(rnd, associations, page_lines, run_date):
+    """
+    trnsec_pages - TRNSEC pages for each association in turn, with several
+                   authority levels per association; a level starts on a new
+                   page with its transaction codes and continuation pages repeat
+                   only the level line
+    """
+    empl_no = 100
+    while True:
+        for assn in range(1, associations + 1):
+            page = 0
+            for level in range(10, 10 + rnd.randint(3, 8)):
+                codes = sorted(set("{0}-{1}{2}".format(rnd.choice(TRAN_TYPES), rnd.choice(APPS),
+                                                      "".join(rnd.sample(LETTERS, rnd.randint(1, 3))))
+                                   for i in range(rnd.randint(5, 40))))
+                for level_page in range(rnd.randint(1, 4)):
+                    page += 1
+                    lines = [TRNSEC_HDR.format(assn, run_date, page), TRNSEC_LEVEL.format(level)]
+                    if level_page == 0:
+                        for i in range(0, len(codes), 9):
+                            lines.append("      " + " ".join(codes[i:i + 9]))
+                    while len(lines) < page_lines:
+                        empl_no += rnd.randint(1, 9)
+                        lines.append(TRNSEC_LINE.format(empl_no % 10000, empl_no % 10,
+                                                        "{0}{1:04d}".format(rnd.choice("AUX"), rnd.randint(0, 9999)),
+                                                        _name(rnd), rnd.randint(100, 999), _date(rnd).lstrip("0"),
+                                                        rnd.choice((30, 60, 90)), rnd.choice((0, 0, 1))))
+                    yield "\n".join(lines) + "\n"
+
+GENERATORS = {
+    'empdwn': empdwn_pages,
+    'tslist': tslist_pages,
+    'trnsec': trnsec_pages,
+}
+
+def generate(filetype, fname, size, seed=0, associations=2, page_lines=60):
+    """
+    generate - write a synthetic 'filetype' report of at least 'size' bytes to
+               'fname', ending on a page boundary; returns the bytes written
+
+    The same seed always gives the same report (for one Python major version;
+    the random module draws differently on Python 2 and 3).
+    """
+    if filetype not in GENERATORS:
+        raise ValueError("unknown report type \"{0}\": expected one of {1}".format(filetype, ", ".join(sorted(GENERATORS))))
+
+    rnd = random.Random(seed)
+    written = 0
+    with open(fname, "wb") as fp:
+        for page in GENERATORS[filetype](rnd, associations, page_lines, "01/15/16"):
+            page = page.encode('ascii')
+            fp.write(page)
+            written += len(page)
+            if written >= size:
+                break
+
+    return written
+
+if __name__ == "__main__":
+    start_time = datetime.datetime.now()
+
+    root = logging.getLogger(splitext(basename(sys.argv[0]))[0])
+    root.setLevel(logging.DEBUG)
+    ch = logging.StreamHandler(sys.stdout)
+    ch.setLevel(logging.DEBUG)
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - (%(filename)s:%(module)s:%(lineno)d) - %(message)s')
+    ch.setFormatter(formatter)
+    root.addHandler(ch)
+
+    ap = argparse.ArgumentParser(description = "synthetic Unisys/AFS report generator")
+    ap.add_argument("-t", "--type", dest="filetype", required=True, choices=sorted(GENERATORS),
+                    help="report type to generate")
+    ap.add_argument("-s", "--size", dest="size", default="10M",
+                    help="report size, e.g. 10M or 5G (default: 10M)")
+    ap.add_argument("-o", "--output", dest="output", required=True,
+                    help="report file to write")
+    ap.add_argument("-a", "--associations", dest="associations", type=int, default=2,
+                    help="number of 00x associations (default: 2)")
+    ap.add_argument("-p", "--page-lines", dest="page_lines", type=int, default=60,
+                    help="lines per report page (default: 60)")
+    ap.add_argument("--seed", dest="seed", type=int, default=0,
+                    help="random seed (default: 0)")
+    options = ap.parse_args()
+
+    written = generate(options.filetype, options.output, parse_size(options.size),
+                       options.seed, options.associations, options.page_lines)
+    root.info("{0}: {1:d} bytes (elapsed time: {2})".format(options.output, written, datetime.datetime.now() - start_time))
@@ -0,0 +1,359 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+import os
+import json
+import bisect
+import sqlite3
+import datetime
+
+import batch
+import compress
+import lineio
+import sinks
+
+class _tracked(object):
+    """
+    _tracked - a report read line by line, keeping the byte offset of the line
+               last handed to the parser
+    """
+
+    mode = 'rb'
+
+    def __init__(self, fname):
+        self.name   = fname
+        self.offset = 0
+
+    def __iter__(self):
+        pos = 0
+        with open(self.name, "rb") as fp:
+            for line in fp:
+                self.offset = pos
+                pos += len(line)
+                yield line
+
+class _selected(object):
+    """
+    _selected - the lines of a report at the given offsets, in that order;
+                the parse state each line was indexed with is restored on
+                'parser' as the line is handed to it
+    """
+
+    mode = 'rb'
+
+    def __init__(self, fname, lines):
+        self.name   = fname
+        self.lines  = lines             # [(offset, state)]
+        self.parser = None
+
+    def __iter__(self):
+        with open(self.name, "rb") as fp:
+            for (offset, state) in self.lines:
+                fp.seek(offset)
+                for (attr, val) in zip(self.parser.LINE_STATE, state):
+                    setattr(self.parser, attr, val)
+                yield fp.readline()
+
+def _pack(offsets):
+    #
+    #    ascending offsets as varint deltas: a line costs one to three bytes
+    #
+    out = bytearray()
+    prev = 0
+    for offset in offsets:
+        delta = offset - prev
+        prev = offset
+        while delta >= 0x80:
+            out.append((delta & 0x7f) | 0x80)
+            delta >>= 7
+        out.append(delta)
+    return sqlite3.Binary(bytes(out))
+
+def _unpack(blob):
+    offsets = []
+    (prev, delta, shift) = (0, 0, 0)
+    for byte in bytearray(blob):
+        delta |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        prev += delta
+        offsets.append(prev)
+        (delta, shift) = (0, 0)
+    return offsets
+
+class rptindex(object):
+    """
+    rptindex - persistent lookup index on the entities of a report
+
+    build() parses the report once and writes an SQLite file with a row for
+    every value of the fields in 'FIELDS', holding the byte offsets in the
+    report of the data lines with that value (varint deltas in a blob):
+
+        empdwn  - empl_id (EMPL ID), teller (TELLER NO), name (EMPL NAME)
+        trnsec  - empl_id (HR NO), teller (EMPL NO without the check digit),
+                  name (NAME)
+        tslist  - trx (TRX#), job (assigned job ID)
+
+    The parse state a data line is decoded with (the parser's 'LINE_STATE',
+    e.g. the TRNSEC association and authority level) is kept once for each
+    stretch of the report it holds for.
+
+    query() looks keys up in the index and decodes only the matching lines of
+    the report (see _selected), so a lookup takes milliseconds however
+    large the report is.  Keys are matched without regard to case, spacing,
+    leading zeros of numbers or the "=" of TSLIST job IDs.  TRNSEC rows are
+    returned with their association and authority level (ASSN and AUTH LEVEL
+    columns).  The index records the report's size, modification time and
+    parser VERSION; query() refuses an index that no longer matches.
+    """
+
+    FIELDS = {
+        'empdwn': {'empl_id': 'EMPL ID', 'teller': 'TELLER NO', 'name': 'EMPL NAME'},
+        'trnsec': {'empl_id': 'HR NO', 'teller': 'EMPL NO', 'name': 'NAME'},
+        'tslist': {'trx': 'TRX#', 'job': 'Assigned level'},
+    }
+
+    def __init__(self, fname, logger, debug=False):
+        self.fname  = fname             # index file
+        self.logger = logger
+        self.debug  = debug
+
+    @staticmethod
+    def normalize(field, value):
+        """
+        normalize - the form 'value' is stored and looked up in for 'field'
+        """
+        if value is None:
+            return None
+
+        value = " ".join(str(value).split()).upper()
+        if field == 'teller':
+            value = value.split('-')[0]             # TRNSEC EMPL NO: teller number - check digit
+        elif field == 'job':
+            value = value.lstrip('=')
+        if value.isdigit():
+            value = str(int(value))
+        return value or None
+
+    @staticmethod
+    def _row(parser, filetype, row):
+        if filetype == 'trnsec':
+            return [parser.assn, int(parser.level)] + row
+        return row
+
+    @staticmethod
+    def _hdrs(filetype, column_hdrs):
+        if filetype == 'trnsec':
+            return ['ASSN', 'AUTH LEVEL'] + list(column_hdrs)
+        return list(column_hdrs)
+
+    def _check_replace(self):
+        #
+        #    only an earlier index may be overwritten: a mistyped --index must
+        #    not destroy a report or some other file
+        #
+        if not os.path.isfile(self.fname):
+            raise ValueError("{0}: not a file; not replaced by the index".format(self.fname))
+        conn = sqlite3.connect(self.fname)
+        try:
+            try:
+                found = conn.execute("SELECT count(*) FROM meta WHERE name = 'report'").fetchone()[0]
+            except sqlite3.DatabaseError:
+                found = 0
+        finally:
+            conn.close()
+        if not found:
+            raise ValueError("{0}: exists and is not a report index; not replaced (remove it or choose another --index)".format(self.fname))
+
+    def build(self, report):
+        """
+        build - parse 'report' and write its index; returns the number of
+                indexed lines.  An existing file is only replaced when it
+                is a report index.
+        """
+        start_tm = datetime.datetime.now()
+        self.logger.info("start index {0} -> {1}".format(report, self.fname))
+        if compress.detect(report) is not None:
+            raise ValueError("{0}: compressed reports cannot be indexed (offsets are into the uncompressed report)".format(report))
+
+        filetype = batch.detect_type(report)
+        if filetype is None:
+            raise ValueError("{0}: not an EMPDWN, TSLIST or TRNSEC report".format(report))
+
+        fp     = _tracked(report)
+        parser = batch.REPORT_TYPES[filetype](fp, self.logger, self.debug)
+        fields = sorted(self.FIELDS[filetype].items())
+
+        keys    = dict((field, {}) for (field, col) in fields)     # key -> offsets, per field
+        normal  = dict((field, {}) for (field, col) in fields)     # raw value -> key, per field
+        states  = []                                                # (first offset, state)
+        nlines  = 0
+        last    = None
+        idx     = None
+        for row in parser.records():
+            offset = fp.offset
+            if offset != last:
+                last = offset
+                nlines += 1
+                state = [getattr(parser, attr) for attr in parser.LINE_STATE]
+                if len(states) == 0 or states[-1][1] != state:
+                    states.append((offset, state))
+
+            if idx is None:
+                hdrs = self._hdrs(filetype, parser.column_hdrs)
+                idx  = [(keys[field], normal[field], field, hdrs.index(col)) for (field, col) in fields]
+
+            row = self._row(parser, filetype, row)
+            for (field_keys, cache, field, i) in idx:
+                value = row[i] if i < len(row) else None
+                key = cache.get(value)
+                if key is None:
+                    key = cache[value] = self.normalize(field, value)
+                if key is None:
+                    continue
+                offsets = field_keys.get(key)
+                if offsets is None:
+                    field_keys[key] = [offset]
+                elif offsets[-1] != offset:                 # a TSLIST line has a row per job ID
+                    offsets.append(offset)
+
+        st = os.stat(report)
+        meta = {
+            'report':      os.path.abspath(report),
+            'type':        filetype,
+            'version':     parser.VERSION,
+            'size':        st.st_size,
+            'mtime':       st.st_mtime,
+            'column_hdrs': list(parser.column_hdrs),
+        }
+
+        if os.path.exists(self.fname):
+            self._check_replace()
+            os.remove(self.fname)
+        conn = sqlite3.connect(self.fname)
+        try:
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("PRAGMA journal_mode = MEMORY")
+            conn.execute("CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("CREATE TABLE states (start INTEGER PRIMARY KEY, state TEXT)")
+            conn.execute("CREATE TABLE keys (field TEXT, key TEXT, offsets BLOB, PRIMARY KEY (field, key)) WITHOUT ROWID")
+            conn.executemany("INSERT INTO states VALUES (?, ?)", [(start, json.dumps(state)) for (start, state) in states])
+            for (field, field_keys) in sorted(keys.items()):
+                conn.executemany("INSERT INTO keys VALUES (?, ?, ?)",
+                                 ((field, key, _pack(offsets)) for (key, offsets) in sorted(field_keys.items())))
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", [(k, json.dumps(v)) for (k, v) in meta.items()])
+            conn.commit()
+        finally:
+            conn.close()
+
+        end_tm = datetime.datetime.now()
+        self.logger.info("index complete: {0:d} lines, {1} (elapsed time: {2})".format(nlines,
+            ", ".join("{0:d} {1} keys".format(len(keys[field]), field) for (field, col) in fields),
+            end_tm - start_tm))
+        return nlines
+
+    def _meta(self, conn):
+        try:
+            meta = dict((name, json.loads(value)) for (name, value) in conn.execute("SELECT name, value FROM meta"))
+        except sqlite3.DatabaseError:
+            meta = {}
+        if 'report' not in meta:
+            raise ValueError("{0}: not a report index (see --index)".format(self.fname))
+
+        report = meta['report']
+        cls = batch.REPORT_TYPES[meta['type']]
+        if not os.path.exists(report):
+            raise ValueError("{0}: indexed report {1} not found".format(self.fname, report))
+        st = os.stat(report)
+        if st.st_size != meta['size'] or st.st_mtime != meta['mtime'] or cls.VERSION != meta['version']:
+            raise ValueError("{0}: index is out of date for {1}; rebuild it".format(self.fname, report))
+        return meta
+
+    def query(self, terms, output="-"):
+        """
+        query - write the rows matching any of 'terms' ("field=value" strings)
+                to 'output' (see sinks.open_sink()); returns the number of rows
+                written
+        """
+        start_tm = datetime.datetime.now()
+        if not os.path.exists(self.fname):
+            raise ValueError("{0}: index not found".format(self.fname))
+
+        conn = sqlite3.connect(self.fname)
+        try:
+            meta = self._meta(conn)
+            filetype = meta['type']
+            lookups = []
+            for term in terms:
+                (field, sep, value) = term.partition('=')
+                field = field.strip().lower()
+                if sep != '=' or field not in self.FIELDS[filetype]:
+                    raise ValueError("invalid query \"{0}\": expected FIELD=VALUE with FIELD one of {1}".format(
+                                     term, ", ".join(sorted(self.FIELDS[filetype]))))
+                lookups.append((field, self.normalize(field, value)))
+
+            offsets = set()
+            for (field, key) in lookups:
+                for (blob,) in conn.execute("SELECT offsets FROM keys WHERE field = ? AND key = ?", (field, key)):
+                    offsets.update(_unpack(blob))
+
+            (starts, states) = ([], [])
+            if offsets:
+                for (start, state) in conn.execute("SELECT start, state FROM states ORDER BY start"):
+                    starts.append(start)
+                    states.append(state)
+        finally:
+            conn.close()
+
+        found = {}
+        for offset in offsets:
+            found[offset] = json.loads(states[bisect.bisect_right(starts, offset) - 1])
+
+        self.logger.info("query {0}: {1:d} lines".format(" ".join(terms), len(found)))
+        result = rptquery(meta, self._decode(meta, found, lookups), self.logger)
+        written_buf = sinks.write_rows(result, result.records, output)
+
+        end_tm = datetime.datetime.now()
+        self.logger.info("query complete: {0:d} rows (elapsed time: {1})".format(written_buf, end_tm - start_tm))
+        return written_buf
+
+    def _decode(self, meta, found, lookups):
+        #
+        #    decode only the matching lines, in report order, each with the
+        #    parse state it had in the full parse; keep the rows that match
+        #    (a TSLIST line has one row per job ID)
+        #
+        filetype = meta['type']
+        hdrs = self._hdrs(filetype, meta['column_hdrs'])
+        cols = [(field, key, hdrs.index(self.FIELDS[filetype][field])) for (field, key) in lookups]
+        fp = _selected(meta['report'], sorted(found.items()))
+        parser = fp.parser = batch.REPORT_TYPES[filetype](fp, self.logger, self.debug)
+        parser.column_hdrs = list(meta['column_hdrs'])
+        rows = []
+        for row in parser.records():
+            row = self._row(parser, filetype, row)
+            for (field, key, i) in cols:
+                if i < len(row) and self.normalize(field, row[i]) == key:
+                    rows.append(row)
+                    break
+        return rows
+
+class rptquery(object):
+    """
+    rptquery - the rows of a query, for sinks.write_rows()
+    """
+
+    def __init__(self, meta, records, logger):
+        cls = batch.REPORT_TYPES[meta['type']]
+        self.fp          = lineio.filerange(meta['report'], 0, 0)
+        self.logger      = logger
+        self.records     = records
+        self.column_hdrs = rptindex._hdrs(meta['type'], meta['column_hdrs'])
+        self.SQL_TYPES   = dict(cls.SQL_TYPES)
+        self.SQL_INDEXES = cls.SQL_INDEXES
+        if meta['type'] == 'trnsec':
+            self.SQL_TYPES.update({'ASSN': 'INTEGER', 'AUTH LEVEL': 'INTEGER'})
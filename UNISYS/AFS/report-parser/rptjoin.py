@@ -0,0 +1,152 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+import os
+import datetime
+
+import batch
+import compress
+import sinks
+
+class rptjoin(object):
+    """
+    rptjoin - join EMPDWN users to TRNSEC authority levels to TSLIST transactions
+
+    Produces one denormalized "user -> level -> transaction" row for every
+    EMPDWN user found in a TRNSEC authority level and every TSLIST transaction
+    assigned that level (the TSLIST job ID).  All three reports are joined
+    within the association (ASSN, or the 00x report header).  Users are
+    matched to TRNSEC employees on:
+
+        teller   - EMPDWN TELLER NO = TRNSEC EMPL NO (without the check digit)
+        empl_id  - EMPDWN EMPL ID   = TRNSEC HR NO
+
+    The two smaller reports (by file size) are loaded into hash indexes on
+    their join keys and the largest is streamed through records() against
+    them, so the join runs in time linear in the input plus the output rows.
+    """
+
+    column_hdrs = ['ASSN', 'TELLER NO', 'EMPL ID', 'EMPL NAME', 'BRANCH', 'STATUS', 'AUTH LVL',
+                   'EMPL NO', 'HR NO', 'AUTH LEVEL',
+                   'TRX#', 'TRNSEC code', 'TT', 'DESC']
+    SQL_TYPES   = {'ASSN': 'INTEGER', 'TELLER NO': 'INTEGER', 'BRANCH': 'INTEGER', 'STATUS': 'INTEGER',
+                   'AUTH LVL': 'INTEGER', 'AUTH LEVEL': 'INTEGER'}
+    SQL_INDEXES = ('EMPL ID', 'TELLER NO', 'TRX#')
+
+    JOIN_KEYS   = ('teller', 'empl_id')
+
+    def __init__(self, users, employees, transactions, logger, key='teller', debug=False):
+        if key not in self.JOIN_KEYS:
+            raise ValueError("invalid join key \"{0}\": expected one of {1}".format(key, ", ".join(self.JOIN_KEYS)))
+
+        self.users        = users               # empdwn parser
+        self.employees    = employees           # trnsec parser
+        self.transactions = transactions        # tslist parser
+        self.logger       = logger
+        self.key          = key
+        self.debug        = debug
+
+    def _users(self):
+        for row in self.users.records():
+            if self.key == 'teller':
+                ukey = row[1]
+            else:
+                ukey = row[8].strip().upper()
+            yield ((row[0], ukey), (row[0], row[1], row[8], row[7], row[2], row[5], row[6]))
+
+    def _employees(self):
+        parser = self.employees
+        for row in parser.records():
+            if self.key == 'teller':
+                ekey = int(row[0].split('-')[0])
+            else:
+                ekey = row[1].strip().upper()
+            level = int(parser.level)
+            yield ((parser.assn, ekey), (parser.assn, level), (row[0], row[1], level))
+
+    def _transactions(self):
+        for row in self.transactions.records():
+            if len(row) < 9:
+                continue                        # no job IDs assigned
+            yield ((row[0], int(row[8].lstrip('='))), (row[4], row[6], row[5], row[7]))
+
+    @staticmethod
+    def _index(pairs):
+        idx = {}
+        for (key, val) in pairs:
+            idx.setdefault(key, []).append(val)
+        return idx
+
+    def records(self):
+        """
+        records - generator yielding the joined rows
+        """
+        sizes = {
+            'users':        os.path.getsize(self.users.fp.name),
+            'employees':    os.path.getsize(self.employees.fp.name),
+            'transactions': os.path.getsize(self.transactions.fp.name),
+        }
+        streamed = max(sizes, key=sizes.get)
+        self.logger.info("join: streaming {0}, indexing the other reports".format(streamed))
+
+        if streamed == 'employees':
+            users = self._index(self._users())
+            trans = self._index(self._transactions())
+            for (ekey, lkey, emp) in self._employees():
+                for user in users.get(ekey, ()):
+                    for trx in trans.get(lkey, ()):
+                        yield list(user + emp + trx)
+
+        elif streamed == 'users':
+            emps  = self._index((ekey, (lkey, emp)) for (ekey, lkey, emp) in self._employees())
+            trans = self._index(self._transactions())
+            for (ukey, user) in self._users():
+                for (lkey, emp) in emps.get(ukey, ()):
+                    for trx in trans.get(lkey, ()):
+                        yield list(user + emp + trx)
+
+        else:
+            emps  = self._index((lkey, (ekey, emp)) for (ekey, lkey, emp) in self._employees())
+            users = self._index(self._users())
+            for (tkey, trx) in self._transactions():
+                for (ekey, emp) in emps.get(tkey, ()):
+                    for user in users.get(ekey, ()):
+                        yield list(user + emp + trx)
+
+    def write_data(self, output=None):
+        """
+        write_data - write the joined rows (default: access_review.csv in the
+                     current directory); returns the number of rows written
+        """
+        start_tm = datetime.datetime.now()
+        self.logger.info("start join")
+        if output is None:
+            output = os.path.join(os.getcwd(), "access_review.csv")
+
+        written_buf = sinks.write_rows(self, self.records(), output)
+
+        end_tm = datetime.datetime.now()
+        self.logger.info("join complete: {0:d} rows (elapsed time: {1})".format(written_buf, end_tm - start_tm))
+        return written_buf
+
+def open_reports(fnames, logger, key='teller', debug=False):
+    """
+    open_reports - build an rptjoin from one EMPDWN, one TSLIST and one TRNSEC
+                   report, in any order (types are detected from the titles)
+    """
+    reports = {}
+    for fname in fnames:
+        filetype = batch.detect_type(fname)
+        if filetype is None:
+            raise ValueError("{0}: not an EMPDWN, TSLIST or TRNSEC report".format(fname))
+        if filetype in reports:
+            raise ValueError("join: more than one {0} report given".format(filetype))
+        reports[filetype] = batch.REPORT_TYPES[filetype](compress.open_report(fname), logger, debug)
+
+    if sorted(reports) != ['empdwn', 'trnsec', 'tslist']:
+        raise ValueError("join: needs one EMPDWN, one TSLIST and one TRNSEC report")
+
+    return rptjoin(reports['empdwn'], reports['trnsec'], reports['tslist'], logger, key, debug)
@@ -0,0 +1,135 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+import logging
+import multiprocessing
+
+import lineio
+
+def page_offsets(parser):
+    """
+    page_offsets - scan the report for page header lines ('PAGE_HDR')
+
+    Returns a list of (byte offset, page state) tuples, one per page, and the
+    size of the report in bytes.  Page state holds the values of the parser's
+    'PAGE_STATE' attributes in effect at the start of that page.  Only the
+    parser's scan_state() is run on each line, so this is much cheaper than a
+    full parse.
+    """
+    pages = []
+    pos = 0
+    saved_state = [getattr(parser, a) for a in parser.PAGE_STATE]
+    with open(parser.fp.name, "rb") as fp:
+        for line in fp:
+            if parser.PAGE_HDR.match(line) is not None:
+                pages.append((pos, tuple(getattr(parser, a) for a in parser.PAGE_STATE)))
+            parser.scan_state(line)
+            pos += len(line)
+
+    for (attr, val) in zip(parser.PAGE_STATE, saved_state):
+        setattr(parser, attr, val)
+
+    return pages, pos
+
+def split_pages(pages, size, nshards):
+    """
+    split_pages - group pages into at most 'nshards' byte ranges of about equal size
+
+    Returns a list of (start, end, page state) tuples in report order.  Any lines
+    before the first page header are included in the first shard.
+    """
+    if len(pages) == 0:
+        return [(0, size, None)]
+
+    target = float(size) / nshards
+    shards = []
+    (start, state) = (0, pages[0][1])
+    for (offset, page_state) in pages[1:]:
+        if offset - start >= target:
+            shards.append((start, offset, state))
+            (start, state) = (offset, page_state)
+
+    shards.append((start, size, state))
+    return shards
+
+def _parse_shard(args):
+    (cls, fname, start, end, state, options, logger_name, debug) = args
+
+    parser = cls(lineio.filerange(fname, start, end), logging.getLogger(logger_name), debug)
+    for (attr, val) in options:
+        setattr(parser, attr, val)
+    if state is not None:
+        for (attr, val) in zip(cls.PAGE_STATE, state):
+            setattr(parser, attr, val)
+
+    rows   = []
+    states = []                             # (row number, LINE_STATE) where the state changes
+    for row in parser.records():
+        if cls.LINE_STATE:
+            state = tuple(getattr(parser, attr) for attr in cls.LINE_STATE)
+            if len(states) == 0 or states[-1][1] != state:
+                states.append((len(rows), state))
+        rows.append(row)
+    return (rows,
+            states,
+            list(parser.column_hdrs),
+            getattr(parser, 'transaction_codes', None),
+            parser.line_counts,
+            parser.io_stats['bytes'])
+
+def records(parser, jobs):
+    """
+    records - parse a report in page shards on 'jobs' processes
+
+    Generator yielding the parsed rows in original report order, suitable for
+    parser.parse(rows) or parser.stream_data(rows).  Column headers, (for
+    trnsec) transaction codes and the line and byte counts of the workers are
+    merged into 'parser', and the parser's LINE_STATE (e.g. the trnsec
+    association and authority level) is set as each row is yielded, as if the
+    rows came from parser.records().
+    """
+    cls = type(parser)
+    fname = parser.fp.name
+
+    (pages, size) = page_offsets(parser)
+    shards = split_pages(pages, size, jobs * 4)
+    parser.logger.info("{0}: {1:d} pages in {2:d} shards on {3:d} processes".format(fname,
+                                                                                    len(pages),
+                                                                                    len(shards),
+                                                                                    jobs
+                                                                                   )
+                      )
+
+    pool = multiprocessing.Pool(jobs)
+    try:
+        options = [(attr, getattr(parser, attr)) for attr in getattr(cls, 'PARSE_OPTIONS', ())]
+        work = [(cls, fname, start, end, state, options, parser.logger.name, parser.debug)
+                for (start, end, state) in shards]
+        for (rows, states, column_hdrs, transaction_codes, line_counts, nbytes) in pool.imap(_parse_shard, work):
+            if len(parser.column_hdrs) == 0 and len(column_hdrs) != 0:
+                parser.column_hdrs = column_hdrs
+
+            if transaction_codes is not None:
+                for (key, codes) in transaction_codes.items():
+                    saved = parser.transaction_codes.setdefault(key, [])
+                    for code in codes:
+                        if code not in saved:
+                            saved.append(code)
+
+            for (cls_name, count) in line_counts.items():
+                parser.line_counts[cls_name] += count
+            parser.io_stats['bytes'] += nbytes
+
+            changes = dict(states)
+            for (i, row) in enumerate(rows):
+                state = changes.get(i)
+                if state is not None:
+                    for (attr, val) in zip(cls.LINE_STATE, state):
+                        setattr(parser, attr, val)
+                yield row
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,506 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+import io
+import os
+import re
+import sys
+import csv
+import sqlite3
+import zipfile
+import tempfile
+import datetime
+import itertools
+from xml.sax.saxutils import escape
+
+import codec
+import compress
+from os import getcwd
+from os.path import basename
+from os.path import splitext
+
+try:
+    integer_types = (int, long)
+except NameError:                               # Python 3
+    integer_types = (int,)
+
+def _csv_file(fp):
+    #
+    #    the csv module writes bytes on Python 2 and text on Python 3; text is
+    #    encoded as the report was decoded (see codec.ENCODING)
+    #
+    if str is bytes:
+        return fp
+    return io.TextIOWrapper(fp, encoding=codec.ENCODING, newline="")
+
+class csv_sink(object):
+    """
+    csv_sink - write parsed rows to an Excel dialect CSV file ("-" for standard
+               output; gzip, bz2 or xz compressed when the name ends in .gz,
+               .bz2 or .xz)
+
+    Sinks are used as open(), write() (any number of times), close().
+    checkpoint() makes the rows written so far durable and returns a position
+    that can later be passed to open() as 'resume_pos' to drop anything
+    written after it and append from there (see checkpoint.py).
+    """
+
+    def __init__(self, fname, logger):
+        self.fname  = fname
+        self.logger = logger
+        self.csv_fp = None
+        self.writer = None
+        self.seekable = False
+
+    @property
+    def checkpoint_name(self):
+        return "{0}.ckpt".format(self.fname)
+
+    def can_resume(self, resume_pos):
+        """
+        can_resume - True when the output still holds the 'resume_pos' bytes
+                     a checkpoint was taken at
+        """
+        if self.fname == "-" or compress.suffix_kind(self.fname) is not None:
+            return False
+        return os.path.isfile(self.fname) and os.path.getsize(self.fname) >= resume_pos
+
+    def open(self, column_hdrs, resume_pos=None):
+        self.logger.info("writing parsed data to {0}".format(self.fname))
+        if self.fname == "-":
+            if resume_pos is not None:
+                raise ValueError("cannot resume output written to standard output")
+            self.csv_fp = sys.stdout
+        elif compress.suffix_kind(self.fname) is not None:
+            if resume_pos is not None:
+                raise ValueError("cannot resume compressed output {0}".format(self.fname))
+            self.csv_fp = _csv_file(compress.open_output(self.fname, compress.suffix_kind(self.fname)))
+        elif resume_pos is None:
+            self.csv_fp = _csv_file(open(self.fname, "wb"))
+            self.seekable = True
+        else:
+            with open(self.fname, "r+b") as fp:
+                fp.truncate(resume_pos)
+            self.csv_fp = _csv_file(open(self.fname, "ab"))
+            self.seekable = True
+
+        self.writer = csv.writer(self.csv_fp, dialect='excel', delimiter=',')
+        if resume_pos is None:
+            self.writer.writerow(column_hdrs)
+
+    def write(self, rows):
+        written_buf = 0
+        for buf in rows:
+            self.writer.writerow(buf)
+            written_buf += 1
+
+        return written_buf
+
+    def checkpoint(self):
+        self.csv_fp.flush()
+        if not self.seekable:
+            return None                         # standard output or compressed: cannot resume
+        os.fsync(self.csv_fp.fileno())
+        return self.csv_fp.tell()
+
+    def close(self):
+        if self.csv_fp is sys.stdout:
+            self.csv_fp.flush()
+        else:
+            self.csv_fp.close()
+        self.csv_fp = None
+        self.writer = None
+
+class sqlite_sink(object):
+    """
+    sqlite_sink - load parsed rows into a SQLite table
+
+    The table is named after the report type and is replaced on each load.
+    Column types come from the parser's 'SQL_TYPES' (TEXT by default; DATE
+    columns hold YYYY-MM-DD text); rows are
+    inserted with executemany() in batches of BATCH_SIZE inside one transaction
+    (committed only at close() or checkpoint()) and the parser's 'SQL_INDEXES'
+    are built after the load.
+    """
+
+    BATCH_SIZE = 50000
+
+    def __init__(self, dbpath, table, types, indexes, logger):
+        self.dbpath  = dbpath
+        self.table   = table
+        self.types   = types
+        self.indexes = indexes
+        self.logger  = logger
+
+    @staticmethod
+    def _quote(name):
+        return '"{0}"'.format(name.replace('"', '""'))
+
+    @staticmethod
+    def _integer(value):
+        #
+        #    tslist job IDs are written as "=NN" so Excel keeps the leading zero
+        #
+        if value is None or isinstance(value, integer_types):
+            return value
+        value = value.lstrip("=").strip()
+        return int(value) if value else None
+
+    @staticmethod
+    def _date(value):
+        #
+        #    dates are stored as ISO 8601 text (YYYY-MM-DD), which sorts and
+        #    works with SQLite's date functions; unreadable dates are kept as is
+        #
+        value = codec.to_date(value)
+        if isinstance(value, datetime.date):
+            return value.isoformat()
+        return value
+
+    def _convert(self, column_hdrs, rows):
+        #
+        #    rows can be shorter than the column headers (tslist rows without job
+        #    IDs); pad them with NULLs
+        #
+        ncols     = len(column_hdrs)
+        int_cols  = [i for (i, col) in enumerate(column_hdrs) if self.types.get(col) == 'INTEGER']
+        date_cols = [i for (i, col) in enumerate(column_hdrs) if self.types.get(col) == 'DATE']
+        for buf in rows:
+            if len(buf) < ncols:
+                buf = list(buf) + [None] * (ncols - len(buf))
+            elif len(int_cols) != 0 or len(date_cols) != 0:
+                buf = list(buf)
+            for i in int_cols:
+                buf[i] = self._integer(buf[i])
+            for i in date_cols:
+                buf[i] = self._date(buf[i])
+            yield buf
+
+    @property
+    def checkpoint_name(self):
+        return "{0}.{1}.ckpt".format(self.dbpath, self.table)
+
+    def can_resume(self, resume_pos):
+        """
+        can_resume - True when the table still holds the 'resume_pos' rows a
+                     checkpoint was taken at
+        """
+        if not os.path.isfile(self.dbpath):
+            return False
+        conn = sqlite3.connect(self.dbpath)
+        try:
+            try:
+                nrows = conn.execute("SELECT count(*) FROM {0}".format(self._quote(self.table))).fetchone()[0]
+            except sqlite3.DatabaseError:
+                return False
+        finally:
+            conn.close()
+        return nrows >= resume_pos
+
+    def open(self, column_hdrs, resume_pos=None):
+        cols  = [self._quote(col) for col in column_hdrs]
+        table = self._quote(self.table)
+        ddl   = ", ".join("{0} {1}".format(col, self.types.get(hdr, 'TEXT')) for (col, hdr) in zip(cols, column_hdrs))
+
+        self.logger.info("loading parsed data into {0} table {1}".format(self.dbpath, self.table))
+        self.column_hdrs = column_hdrs
+        self.dml  = "INSERT INTO {0} ({1}) VALUES ({2})".format(table, ", ".join(cols), ", ".join("?" * len(cols)))
+        self.pending = []
+        self.conn = sqlite3.connect(self.dbpath)
+        self.conn.execute("PRAGMA synchronous = OFF")
+        self.conn.execute("PRAGMA journal_mode = MEMORY")
+        if resume_pos is None:
+            self.conn.execute("DROP TABLE IF EXISTS {0}".format(table))
+            self.conn.execute("CREATE TABLE {0} ({1})".format(table, ddl))
+            self.rowcount = 0
+        else:
+            self.conn.execute("DELETE FROM {0} WHERE rowid > ?".format(table), (resume_pos,))
+            self.rowcount = resume_pos
+
+    def write(self, rows):
+        written_buf = 0
+        for buf in self._convert(self.column_hdrs, rows):
+            self.pending.append(buf)
+            if len(self.pending) >= self.BATCH_SIZE:
+                self._flush()
+            written_buf += 1
+
+        self._flush()
+        return written_buf
+
+    def _flush(self):
+        if len(self.pending) != 0:
+            self.conn.executemany(self.dml, self.pending)
+            self.rowcount += len(self.pending)
+            self.pending = []
+
+    def checkpoint(self):
+        self._flush()
+        self.conn.commit()
+        return self.rowcount
+
+    def close(self):
+        self.conn.commit()
+        for col in self.indexes:
+            if col not in self.column_hdrs:
+                continue
+            idx = "{0}_{1}_idx".format(self.table, "".join(c if c.isalnum() else "_" for c in col.lower()).strip("_"))
+            self.logger.info("building index {0}".format(idx))
+            self.conn.execute("CREATE INDEX IF NOT EXISTS {0} ON {1} ({2})".format(self._quote(idx),
+                                                                                   self._quote(self.table),
+                                                                                   self._quote(col)
+                                                                                  )
+                             )
+        self.conn.commit()
+        self.conn.close()
+        self.conn = None
+
+class xlsx_sink(object):
+    """
+    xlsx_sink - write parsed rows to an Excel workbook (.xlsx), write only
+
+    Rows are streamed into the worksheet XML inside the zip container as they
+    arrive, with inline strings (no shared string table), so memory use does
+    not grow with the number of rows.  Columns the parser's 'SQL_TYPES' marks
+    INTEGER (and any integer value) are written as numeric cells, DATE columns
+    (and any date value) as date cells, the rest as text.  A sheet holds at most MAX_ROWS rows, Excel's limit, including the
+    column header row; the rows that follow go to a new sheet ("<name> 2",
+    ...) that starts with the column headers again.
+
+    Python 3 streams each sheet straight into the zip file; Python 2's zipfile
+    cannot, so there each sheet is spooled to a temporary file next to the
+    output and added when it is complete.
+    """
+
+    MAX_ROWS   = 1048576
+    MAX_COLS   = 16384
+    FLUSH_ROWS = 1000
+    NS         = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+    NS_R       = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+    NS_PKG     = "http://schemas.openxmlformats.org/package/2006/relationships"
+    NS_CT      = "http://schemas.openxmlformats.org/package/2006/content-types"
+    XML_DECL   = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    SPECIAL    = re.compile(u"[&<>\x00-\x08\x0b\x0c\x0e-\x1f]")   # escaped, or not allowed in XML 1.0
+    INVALID    = re.compile(u"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+    EPOCH      = datetime.date(1899, 12, 30)    # day 0 of Excel's date serial numbers
+
+    def __init__(self, fname, sheet, types, logger):
+        self.fname  = fname
+        self.sheet  = sheet[:28]                # room for " NN" in Excel's 31 characters
+        self.types  = types
+        self.logger = logger
+
+    @property
+    def checkpoint_name(self):
+        return "{0}.ckpt".format(self.fname)
+
+    def can_resume(self, resume_pos):
+        return False                            # a workbook is rewritten whole
+
+    @classmethod
+    def _text(cls, value):
+        if str is bytes:
+            value = value.decode(codec.ENCODING)
+        if cls.SPECIAL.search(value) is not None:
+            value = cls.INVALID.sub(u"", escape(value))
+        if value.strip() != value:
+            return u'<c t="inlineStr"><is><t xml:space="preserve">' + value + u'</t></is></c>'
+        return u'<c t="inlineStr"><is><t>' + value + u'</t></is></c>'
+
+    def _row(self, buf):
+        cells = [u"<row>"]
+        append = cells.append
+        for (kind, value) in zip(self.col_types, buf):
+            if kind == 'INTEGER' and value is not None and not isinstance(value, integer_types):
+                value = sqlite_sink._integer(value)
+            elif kind == 'DATE':
+                value = codec.to_date(value)
+            if value is None or value == "":
+                append(u"<c/>")                 # keeps the following cells in their columns
+            elif isinstance(value, integer_types):
+                append(u"<c><v>%d</v></c>" % value)
+            elif isinstance(value, datetime.date):
+                append(u'<c s="1"><v>%d</v></c>' % (value - self.EPOCH).days)
+            else:
+                append(self._text(value))
+        append(u"</row>")
+        return u"".join(cells)
+
+    def _start_sheet(self):
+        self.sheets.append(self.sheet if len(self.sheets) == 0 else "{0} {1:d}".format(self.sheet, len(self.sheets) + 1))
+        member = "xl/worksheets/sheet{0:d}.xml".format(len(self.sheets))
+        if sys.version_info >= (3, 6):
+            self.spool = None
+            self.sheet_fp = self.zip.open(member, "w", force_zip64=True)
+        else:
+            (fd, self.spool) = tempfile.mkstemp(".xml", basename(self.fname) + ".", os.path.dirname(os.path.abspath(self.fname)))
+            self.sheet_fp = os.fdopen(fd, "wb")
+        self.member = member
+        self.sheet_fp.write((self.XML_DECL + '<worksheet xmlns="{0}"><sheetData>'.format(self.NS)).encode('utf-8'))
+        self.pending = [u"<row>" + u"".join(self._text(col) for col in self.column_hdrs) + u"</row>"]
+        self.sheet_rows = 1
+
+    def _flush(self):
+        if len(self.pending) != 0:
+            self.sheet_fp.write(u"".join(self.pending).encode('utf-8'))
+            self.pending = []
+
+    def _end_sheet(self):
+        self._flush()
+        self.sheet_fp.write(b"</sheetData></worksheet>")
+        self.sheet_fp.close()
+        if self.spool is not None:
+            self.zip.write(self.spool, self.member)
+            os.remove(self.spool)
+            self.spool = None
+        self.sheet_fp = None
+
+    def open(self, column_hdrs, resume_pos=None):
+        if resume_pos is not None:
+            raise ValueError("cannot resume Excel output {0}".format(self.fname))
+
+        if len(column_hdrs) > self.MAX_COLS:
+            raise ValueError("{0}: {1:d} columns, more than an Excel sheet holds ({2:d})".format(self.fname, len(column_hdrs),
+                                                                                                  self.MAX_COLS))
+
+        self.logger.info("writing parsed data to {0}".format(self.fname))
+        self.column_hdrs = column_hdrs
+        self.col_types   = [self.types.get(col) for col in column_hdrs]
+        self.sheets      = []
+        self.spool       = None
+        self.zip         = zipfile.ZipFile(self.fname, "w", zipfile.ZIP_DEFLATED, True)
+        self._start_sheet()
+
+    def write(self, rows):
+        written_buf = 0
+        for buf in rows:
+            if self.sheet_rows == self.MAX_ROWS:
+                self._end_sheet()
+                self.logger.info("{0}: sheet \"{1}\" full, continuing on a new sheet".format(self.fname, self.sheets[-1]))
+                self._start_sheet()
+            self.pending.append(self._row(buf))
+            self.sheet_rows += 1
+            if len(self.pending) >= self.FLUSH_ROWS:
+                self._flush()
+            written_buf += 1
+
+        return written_buf
+
+    def checkpoint(self):
+        self._flush()
+        return None                             # a zip file cannot be resumed
+
+    def close(self):
+        self._end_sheet()
+
+        sheets = "".join('<sheet name="{0}" sheetId="{1:d}" r:id="rId{1:d}"/>'.format(escape(name, {'"': "&quot;"}), i)
+                         for (i, name) in enumerate(self.sheets, 1))
+        sheet_rels = "".join('<Relationship Id="rId{0:d}" Target="worksheets/sheet{0:d}.xml" '
+                             'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'.format(i)
+                             for i in range(1, len(self.sheets) + 1))
+        sheet_types = "".join('<Override PartName="/xl/worksheets/sheet{0:d}.xml" '
+                              'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'.format(i)
+                              for i in range(1, len(self.sheets) + 1))
+        nstyles = len(self.sheets) + 1
+        parts = (
+            ("[Content_Types].xml",
+             '<Types xmlns="{0}">'
+             '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+             '<Default Extension="xml" ContentType="application/xml"/>'
+             '<Override PartName="/xl/workbook.xml" '
+             'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+             '<Override PartName="/xl/styles.xml" '
+             'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+             '{1}</Types>'.format(self.NS_CT, sheet_types)),
+            ("_rels/.rels",
+             '<Relationships xmlns="{0}"><Relationship Id="rId1" Target="xl/workbook.xml" '
+             'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+             '</Relationships>'.format(self.NS_PKG)),
+            ("xl/workbook.xml",
+             '<workbook xmlns="{0}" xmlns:r="{1}"><sheets>{2}</sheets></workbook>'.format(self.NS, self.NS_R, sheets)),
+            ("xl/_rels/workbook.xml.rels",
+             '<Relationships xmlns="{0}">{1}<Relationship Id="rId{2:d}" Target="styles.xml" '
+             'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/>'
+             '</Relationships>'.format(self.NS_PKG, sheet_rels, nstyles)),
+            ("xl/styles.xml",
+             '<styleSheet xmlns="{0}">'
+             '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+             '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+             '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+             '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+             '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+             '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+             '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+             '</styleSheet>'.format(self.NS)),
+        )
+        for (name, xml) in parts:
+            self.zip.writestr(name, (self.XML_DECL + xml).encode('utf-8'))
+        self.zip.close()
+        self.zip = None
+
+def open_sink(parser, output=None, suffix=""):
+    """
+    open_sink - return the sink for an output specification
+
+    output is None (<input name>.csv in the current directory, stdin.csv for
+    standard input), a CSV file name, an Excel workbook name ending in .xlsx,
+    "-" for standard output, or "sqlite:path.db".  'suffix' is added to the CSV file name (before
+    the extension) or the table name, for parsers writing more than one table.
+    """
+    if output is None:
+        base = splitext(basename(compress.strip_suffix(parser.fp.name)))[0].strip("<>")       # "<stdin>"
+        return csv_sink("{0}/{1}{2}.csv".format(getcwd(), base, suffix), parser.logger)
+
+    if output == "-":
+        if suffix:
+            raise ValueError("output \"-\" cannot hold more than one table")
+        return csv_sink(output, parser.logger)
+
+    if output.startswith("sqlite:"):
+        dbpath = output[len("sqlite:"):]
+        if not dbpath:
+            raise ValueError("invalid output \"{0}\": expected sqlite:path.db".format(output))
+        return sqlite_sink(dbpath,
+                           type(parser).__name__ + suffix,
+                           getattr(parser, 'SQL_TYPES', {}),
+                           getattr(parser, 'SQL_INDEXES', ()),
+                           parser.logger
+                          )
+
+    if output.lower().endswith(".xlsx"):
+        (root, ext) = splitext(output)
+        return xlsx_sink(root + suffix + ext,
+                         type(parser).__name__ + suffix,
+                         getattr(parser, 'SQL_TYPES', {}),
+                         parser.logger
+                        )
+
+    plain = compress.strip_suffix(output)              # name_jobs.csv.gz, not name.csv_jobs.gz
+    (root, ext) = splitext(plain)
+    return csv_sink(root + suffix + ext + output[len(plain):], parser.logger)
+
+def write_rows(parser, rows, output=None):
+    """
+    write_rows - write column headers and rows for 'parser' to 'output'
+
+    'rows' may be a list or a generator such as parser.records(); for a
+    generator the column headers are only known once the first row has been
+    read, so that row is pulled before the sink is opened.  Returns the number
+    of rows written.
+    """
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is not None:
+        rows = itertools.chain([first], rows)
+
+    sink = open_sink(parser, output)
+    sink.open(parser.column_hdrs)
+    try:
+        written_buf = sink.write(rows)
+    finally:
+        sink.close()
+
+    return written_buf
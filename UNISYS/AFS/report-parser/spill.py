@@ -0,0 +1,78 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+import os
+import heapq
+import shutil
+import marshal
+import tempfile
+
+class spill(object):
+    """
+    spill - a temporary directory of marshal spill files, and the sorted
+            runs written to it, for the external sorts of pivot.py and
+            rptdiff.py
+
+    Items are written with marshal, so they must be made of Python's basic
+    types (dates are spilled as their report text, see codec.plain()).
+    close() removes the directory and everything left in it.
+    """
+
+    MERGE_RUNS = 128                    # sorted runs open at a time while merging
+
+    def __init__(self, prefix, tmp_dir=None):
+        self.dir    = tempfile.mkdtemp(prefix=prefix, dir=tmp_dir)
+        self.nfiles = 0
+
+    def path(self, suffix):
+        """
+        path - the path of a new spill file, "<n>.<suffix>"
+        """
+        path = os.path.join(self.dir, "{0:d}.{1}".format(self.nfiles, suffix))
+        self.nfiles += 1
+        return path
+
+    @staticmethod
+    def load(path):
+        """
+        load - generator yielding the items of a spill file or run
+        """
+        with open(path, "rb") as fp:
+            while True:
+                try:
+                    yield marshal.load(fp)
+                except EOFError:
+                    break
+
+    def run(self, items):
+        """
+        run - write 'items', already in order, to a new run; returns its path
+        """
+        run_path = self.path("run")
+        with open(run_path, "wb") as fp:
+            for item in items:
+                marshal.dump(item, fp)
+        return run_path
+
+    def merge(self, runs):
+        """
+        merge - iterator over the items of the sorted 'runs', in order
+
+        Runs are merged into new runs MERGE_RUNS at a time (and removed) until
+        one pass can merge the rest.
+        """
+        while len(runs) > self.MERGE_RUNS:
+            merged = []
+            for i in range(0, len(runs), self.MERGE_RUNS):
+                batch = runs[i:i + self.MERGE_RUNS]
+                merged.append(self.run(heapq.merge(*[self.load(path) for path in batch])))
+                for path in batch:
+                    os.remove(path)
+            runs = merged
+        return heapq.merge(*[self.load(path) for path in runs])
+
+    def close(self):
+        shutil.rmtree(self.dir, True)
@@ -0,0 +1,357 @@
+'''
+Created on Oct 18, 2026
+
+@author: rereidy
+'''
+
+#
+#    Round-trip tests on reports made by rptgen.py.  Run from this directory
+#    with "python -m pytest test_reports.py" or "python -m unittest test_reports"
+#    (Python 2.7 or 3).  The --rules tests are skipped without numpy.
+#
+
+import os
+import sys
+import json
+import shutil
+import logging
+import argparse
+import tempfile
+import unittest
+import subprocess
+
+import batch
+import checkpoint
+import codec
+import compress
+import empdwn
+import entitlements
+import pivot
+import rptaudit
+import rptdiff
+import rptgen
+import rptindex
+
+HERE   = os.path.dirname(os.path.abspath(__file__))
+LOGGER = logging.getLogger("test_reports")
+LOGGER.addHandler(logging.NullHandler())
+LOGGER.propagate = False
+
+def _options(**kw):
+    #
+    #    the afs_rpt_parse.py options batch.process_report() reads, at their
+    #    command line defaults
+    #
+    options = dict(filetype=None, output=None, stream=False, pipeline=False, compress=None, xlsx=False,
+                   resume=False, cache_dir=None, cache_size=1024, normalized=False, pivot=False, rules=None,
+                   entitlements=False, who_can=None, both=None, sod=None, workers=1, jobs=1, debug=False)
+    options.update(kw)
+    return argparse.Namespace(**options)
+
+def _read(fname):
+    with open(fname, "rb") as fp:
+        return fp.read()
+
+class report_test(unittest.TestCase):
+    """
+    report_test - a temporary directory with one generated report of each type
+    """
+
+    SIZE = 200 * 1024
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="test_reports.")
+        self.reports = {}
+        for filetype in sorted(rptgen.GENERATORS):
+            self.reports[filetype] = self.generate(filetype, filetype + ".txt")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, True)
+
+    def path(self, fname):
+        return os.path.join(self.dir, fname)
+
+    def generate(self, filetype, fname, size=None, seed=1, associations=2):
+        fname = self.path(fname)
+        rptgen.generate(filetype, fname, size or self.SIZE, seed, associations)
+        return fname
+
+    def parser(self, filetype, fname=None):
+        return batch.REPORT_TYPES[filetype](open(fname or self.reports[filetype], "rb"), LOGGER)
+
+    def process(self, filetype, output, fname=None, **kw):
+        return batch.process_report(fname or self.reports[filetype], filetype,
+                                    _options(output=self.path(output), **kw), LOGGER)[0]
+
+class test_parse(report_test):
+
+    def test_layout_sample(self):
+        parser = self.parser('empdwn')
+        (line, expected) = empdwn.empdwn.LAYOUT_SAMPLE
+        self.assertEqual(codec.plain(parser.codec.decode(line, 0, len(line))), expected)
+        parser.fp.close()
+
+    def test_empdwn_columns(self):
+        #
+        #    fields were read a column late: "CHRISTINE" came out as
+        #    "HRISTINE" and "01/27/15" as "1/27/15"
+        #
+        parser = self.parser('empdwn')
+        hdrs = [fieldspec[0] for fieldspec in parser.fieldspecs]
+        rows = list(parser.records())
+        parser.fp.close()
+        self.assertTrue(len(rows) > 0)
+        for row in rows:
+            row = dict(zip(hdrs, row))
+            self.assertIn(row['ASSN'], (1, 2))
+            self.assertTrue(any(row['EMPL NAME'].startswith(first + " ") for first in rptgen.FIRST_NAMES), row)
+            for col in ('PIN CHG', 'LAST LOGIN'):
+                if row[col] is not None:
+                    self.assertEqual(len(str(row[col])), 8, row)
+
+    def test_modes(self):
+        #
+        #    buffered, -s/--stream and -p/--pipeline write the same output
+        #
+        for filetype in sorted(self.reports):
+            written = self.process(filetype, "buffered.csv")
+            self.assertTrue(written > 0)
+            for mode in ('stream', 'pipeline'):
+                self.assertEqual(self.process(filetype, mode + ".csv", **{mode: True}), written)
+                self.assertEqual(_read(self.path(mode + ".csv")), _read(self.path("buffered.csv")), (filetype, mode))
+
+    def test_compressed(self):
+        for filetype in sorted(self.reports):
+            self.process(filetype, "plain.csv")
+            fname = self.path(filetype + ".txt.gz")
+            with open(self.reports[filetype], "rb") as src:
+                with compress.open_output(fname, 'gzip') as dst:
+                    shutil.copyfileobj(src, dst)
+            self.process(filetype, "gz.csv", fname)
+            self.assertEqual(_read(self.path("gz.csv")), _read(self.path("plain.csv")), filetype)
+
+    def test_stdin_file(self):
+        #
+        #    "-i - < report" is memory mapped through the descriptor, not
+        #    reopened by the name "<stdin>"
+        #
+        self.process('tslist', "file.csv")
+        with open(self.reports['tslist'], "rb") as fp:
+            subprocess.check_call([sys.executable, os.path.join(HERE, "afs_rpt_parse.py"), "-t", "tslist",
+                                   "-i", "-", "-o", self.path("stdin.csv")], stdin=fp, stdout=open(os.devnull, "w"))
+        self.assertEqual(_read(self.path("stdin.csv")), _read(self.path("file.csv")))
+
+    def test_normalized_compressed_names(self):
+        self.process('tslist', "out.csv.gz", normalized=True)
+        self.assertTrue(os.path.isfile(self.path("out_transactions.csv.gz")))
+        self.assertTrue(os.path.isfile(self.path("out_jobs.csv.gz")))
+
+class test_jobs(report_test):
+
+    SIZE = 400 * 1024
+
+    def test_jobs(self):
+        for filetype in sorted(self.reports):
+            self.process(filetype, "j1.csv")
+            self.process(filetype, "j3.csv", jobs=3)
+            self.assertEqual(_read(self.path("j3.csv")), _read(self.path("j1.csv")), filetype)
+
+    @unittest.skipIf(rptaudit.numpy is None, "--rules needs numpy")
+    def test_jobs_rules(self):
+        #
+        #    TRNSEC rows carry their association and level (the parser's
+        #    LINE_STATE), which -j rows lost: int(None)
+        #
+        rules = self.path("rules.json")
+        with open(rules, "w") as fp:
+            json.dump({'rules': [{'name': "level 1", 'report': 'trnsec',
+                                  'where': [{'column': 'AUTH LEVEL', 'op': '==', 'value': 1}]},
+                                 {'name': "association 2", 'report': 'trnsec',
+                                  'where': [{'column': 'ASSN', 'op': '==', 'value': 2}]}]}, fp)
+        written = self.process('trnsec', "j1.csv", rules=rules)
+        self.assertTrue(written > 0)
+        self.assertEqual(self.process('trnsec', "j3.csv", rules=rules, jobs=3), written)
+        self.assertEqual(_read(self.path("j3.csv")), _read(self.path("j1.csv")))
+
+class test_resume(report_test):
+
+    def setUp(self):
+        report_test.setUp(self)
+        self.saved_bytes = checkpoint.CHECKPOINT_BYTES
+        checkpoint.CHECKPOINT_BYTES = 16 * 1024
+        self.report = self.reports['trnsec']
+        self.process('trnsec', "full.csv")
+        self.full = _read(self.path("full.csv"))
+
+    def tearDown(self):
+        checkpoint.CHECKPOINT_BYTES = self.saved_bytes
+        report_test.tearDown(self)
+
+    def resume(self, fname=None):
+        parser = self.parser('trnsec', fname)
+        try:
+            return checkpoint.run(parser, self.path("r.csv"))
+        finally:
+            parser.fp.close()
+
+    def test_growing_report(self):
+        report = _read(self.report)
+        cut = report.rindex(b"\n", 0, report.index(b" Wells Fargo ", len(report) // 2)) + 1     # a page header
+        growing = self.path("growing.txt")
+        with open(growing, "wb") as fp:
+            fp.write(report[:cut])
+        self.resume(growing)
+
+        with open(growing, "ab") as fp:
+            fp.write(report[cut:])
+        parser = self.parser('trnsec', growing)
+        checkpoint.run(parser, self.path("r.csv"))
+        parser.fp.close()
+        self.assertEqual(_read(self.path("r.csv")), self.full)
+
+        full = self.parser('trnsec')
+        full.parse()
+        full.fp.close()
+        self.assertEqual(parser.transaction_codes, full.transaction_codes)
+
+    def test_unchanged_report(self):
+        written = self.resume()
+        self.assertTrue(self.resume() < written)           # only the last page again
+        self.assertEqual(_read(self.path("r.csv")), self.full)
+
+    def test_missing_output(self):
+        self.resume()
+        os.remove(self.path("r.csv"))
+        self.resume()
+        self.assertEqual(_read(self.path("r.csv")), self.full)
+
+    def test_short_output(self):
+        self.resume()
+        with open(self.path("r.csv"), "r+b") as fp:
+            fp.truncate(1000)
+        self.resume()
+        self.assertEqual(_read(self.path("r.csv")), self.full)
+
+    def test_output_error(self):
+        #
+        #    the error opening the output, not a BufferError closing the map
+        #
+        parser = self.parser('trnsec')
+        self.assertRaises(EnvironmentError, checkpoint.run, parser, self.path("missing/r.csv"))
+        parser.fp.close()
+
+class test_diff(report_test):
+
+    def diff(self, filetype, old, new, max_rows=None):
+        (old, new) = [self.parser(filetype, fname) for fname in (old, new)]
+        tmp_dir = self.path("spill")
+        os.mkdir(tmp_dir)
+        try:
+            diff = rptdiff.rptdiff(old, new, filetype, LOGGER, max_rows=max_rows, tmp_dir=tmp_dir)
+            rows = sorted([str(value) for value in row] for row in diff.records())
+            self.assertEqual(os.listdir(tmp_dir), [])
+        finally:
+            os.rmdir(tmp_dir)
+            old.fp.close()
+            new.fp.close()
+        return (rows, diff.counts)
+
+    def check(self, filetype, old, new):
+        #
+        #    the hash join and the sort-merge find the same differences
+        #    (TSLIST rows without job IDs have None keys, see _sort_key())
+        #
+        (hashed, counts) = self.diff(filetype, old, new)
+        (merged, merge_counts) = self.diff(filetype, old, new, 100)
+        self.assertEqual(merged, hashed, filetype)
+        self.assertEqual(merge_counts, counts, filetype)
+        return counts
+
+    def test_longer_report(self):
+        for filetype in sorted(self.reports):
+            new = self.generate(filetype, filetype + "_new.txt", self.SIZE * 3 // 2)
+            counts = self.check(filetype, self.reports[filetype], new)
+            self.assertTrue(counts['added'] > 0, filetype)
+            self.assertEqual(counts['removed'], 0, filetype)
+
+    def test_other_report(self):
+        for filetype in sorted(self.reports):
+            new = self.generate(filetype, filetype + "_new.txt", seed=2)
+            counts = self.check(filetype, self.reports[filetype], new)
+            self.assertTrue(counts['removed'] > 0 and counts['changed'] + counts['added'] > 0, filetype)
+
+class test_pivot(report_test):
+
+    def records(self, max_keys=None):
+        parser = self.parser('empdwn')
+        tmp_dir = self.path("spill")
+        os.mkdir(tmp_dir)
+        try:
+            rows = [[str(value) for value in row] for row in pivot.pivot(parser, LOGGER, max_keys=max_keys,
+                                                                        tmp_dir=tmp_dir).records()]
+            self.assertEqual(os.listdir(tmp_dir), [])
+        finally:
+            os.rmdir(tmp_dir)
+            parser.fp.close()
+        return rows
+
+    def test_spill(self):
+        rows = self.records()
+        self.assertTrue(len(rows) > 0)
+        for max_keys in (100, 5):
+            self.assertEqual(self.records(max_keys), rows, max_keys)
+
+class test_entitlements(report_test):
+
+    def test_associations(self):
+        #
+        #    an authority level belongs to its association: level 13 of one
+        #    association does not grant the transactions of level 13 of another
+        #
+        parser = self.parser('trnsec')
+        index = entitlements.entitlements(parser, LOGGER)
+        index.build()
+        parser.fp.close()
+        self.assertEqual(len(set(assn for (assn, level) in parser.transaction_codes)), 2)
+
+        for code in sorted(index.index):
+            expected = sorted((key for (key, codes) in parser.transaction_codes.items()
+                               if code in codes and key in index.members), key=index._order)
+            found = index.who_can(code)
+            self.assertEqual([key for (key, ids) in found], expected, code)
+            for ((assn, level), ids) in found:
+                for empl_id in ids:
+                    self.assertEqual(index.employees[empl_id][0], assn, code)
+
+class test_outputs(report_test):
+
+    def test_same_output(self):
+        #
+        #    two reports with the same output are refused before either is
+        #    parsed, instead of one overwriting the other
+        #
+        os.mkdir(self.path("a"))
+        other = self.path("a/tslist.txt")
+        shutil.copy(self.reports['tslist'], other)
+        output = self.path("out")
+        os.mkdir(output)
+        for fnames in ([self.reports['tslist'], other], [self.reports['tslist'], self.reports['tslist'] + ".gz"]):
+            self.assertRaises(ValueError, batch.run, fnames, _options(output=output), LOGGER)
+            self.assertEqual(os.listdir(output), [])
+
+        summaries = batch.run([self.reports['tslist'], self.reports['trnsec']], _options(output=output), LOGGER)
+        self.assertEqual([summary['error'] for summary in summaries], [None, None])
+        self.assertEqual(sorted(os.listdir(output)), ["trnsec.csv", "tslist.csv"])
+
+    def test_index_replace(self):
+        index = self.path("index.db")
+        for n in range(2):
+            rptindex.rptindex(index, LOGGER).build(self.reports['tslist'])
+
+        report = _read(self.reports['empdwn'])
+        self.assertRaises(ValueError, rptindex.rptindex(self.reports['empdwn'], LOGGER).build, self.reports['tslist'])
+        self.assertEqual(_read(self.reports['empdwn']), report)
+        self.assertRaises(ValueError, rptindex.rptindex(self.dir, LOGGER).build, self.reports['tslist'])
+
+if __name__ == "__main__":
+    unittest.main()
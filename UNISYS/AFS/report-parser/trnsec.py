@@ -6,12 +6,16 @@ Created on Mar 1, 2016
 
 import re
 import sys
-import csv
 import logging
 import datetime
 from os.path import basename
 from os.path import splitext
 
+import codec
+import classify
+import metrics
+import sinks
+
 class trnsec(object):
     """
     trsec - Module to parse trsec data
@@ -49,14 +53,47 @@ EMPL NO: 7028-4 HR NO: u4102 NAME: COREY GOLSTON                    BR NO: 620 L
 EMPL NO: 8483-0 HR NO: U4425 NAME: ALISON OLDHAM                    BR NO: 620 LAST PIN CHG: 12/21/15 PIN CHG DAYS: 60 GLOBAL: 0
 """
 
+    VERSION          = "1.3"                         # bump when parsed output changes (see rptcache.py)
+    REPORT_TITLE     = "TRANSACTION SECURITY REPORT" # see batch.detect_type()
     column_hdrs      = []
-    TRSEC_RPT_HEADER = re.compile(r"^00[1|2]")
-    TRSEC_LEVEL_LINE = re.compile(r'^\s+JD\/AUTHORITY LEVEL\s+(?P<level>\d+)')
-    TRSEC_COL_HDR    = re.compile(r"^\s{7}\S+")
-    TRSEC_TRANSCODE  = re.compile(r"^\s{7}(?P<trans_code>([A-Z]{2}|[+ |- ]\w{3,4}))+")
-    TRSEC_DATA_LINE  = re.compile(r"^(?P<emp>EMPL NO: \d+\-\d+)\s*(?P<hr>HR NO: \w+)\s*(?P<name>NAME: \w+\s{1}\w+)\s+(?P<br>BR NO: \d+)\s+(?P<pin_chg>LAST PON CHG: \d{2}\/\d{2}\/\d{2})\s+(?P<pin_chg_days>PIN CHG DAYS: \d+)\s+(?P<global>GLOBAL: \d+)")
+    #
+    #    re.M lets '^' match at a line offset inside the memory mapped report;
+    #    patterns are bytes and only the captured fields are decoded
+    #
+    TRSEC_RPT_HEADER = re.compile(br"^00[1|2]", re.M)
+    TRSEC_LEVEL_LINE = re.compile(br'^\s+JD\/AUTHORITY LEVEL\s+(?P<level>\d+)', re.M)
+    TRSEC_COL_HDR    = re.compile(br"^\s{7}\S+", re.M)
+    TRSEC_TRANSCODE  = re.compile(br"^\s+(?P<trans_code>[A-Z]{2}[+-]\w{3,5})(\s|$)", re.M)
+    PAGE_HDR         = TRSEC_RPT_HEADER     # first line of every report page
+    PAGE_STATE       = ('level',)           # parse state carried across pages
+    RESUME_STATE     = ('column_hdrs', 'assn', 'level', 'transaction_codes')     # saved by checkpoint.py
+    LINE_STATE       = ('assn', 'level')    # state a data line is decoded with (see rptindex.py)
+    use_mmap         = True                 # read reports on disk through lineio's mmap
+    SQL_TYPES        = {'BR NO': 'INTEGER', 'PIN CHG DAYS': 'INTEGER', 'GLOBAL': 'INTEGER',
+                        'LAST PIN CHG': 'DATE'}                     # dates are codec.rptdate
+    SQL_INDEXES      = ('EMPL NO', 'HR NO')                 # see sinks.sqlite_sink
+    LINE_CLASSES     = ('header', 'level', 'transaction code', 'data', 'skipped')     # see metrics.py
+    LINE_PREFIXES    = classify.prefix_table((      # see classify.lines(); anything else is skipped
+        (b'001',      classify.HEADER),
+        (b'002',      classify.HEADER),
+        (b'EMPL NO:', classify.DATA),
+        (b' ',        classify.INDENTED),           # authority level or transaction code lines
+        (b'\t',       classify.INDENTED),
+    ))
+    #
+    #    conversions of the TRSEC_DATA_LINE groups ("NAME: value" bytes); each
+    #    is memoized (see codec.memo) as users repeat on every level they hold
+    #
+    cnv_field        = lambda col: codec.to_str(col).split(':')[1].strip(' ')
+    cnv_date         = lambda col: codec.to_date(codec.to_str(col).split(':')[1].strip(' '))
+    FIELD_CONVERSIONS = (cnv_field, cnv_field, cnv_field, cnv_field, cnv_date, cnv_field, cnv_field)
+    TRSEC_DATA_LINE  = re.compile(br"^(?P<emp>EMPL NO: \d+\-\d+)\s*(?P<hr>HR NO: \w+)\s*(?P<name>NAME: .+?)\s+(?P<br>BR NO: \d+)\s+(?P<pin_chg>LAST PIN CHG:\s+\d{1,2}\/\d{2}\/\d{2})\s+(?P<pin_chg_days>PIN CHG DAYS: \d+)\s+(?P<global>GLOBAL: \d+)", re.M)
 
     def __init__(self, fp, logger, debug=False):
+        self.line_counts = dict.fromkeys(self.LINE_CLASSES, 0)     # see metrics.py
+        self.io_stats    = {'bytes': 0}
+        self.metrics     = metrics.metrics(self)
+        self.metrics.start('init')
         start_tm = datetime.datetime.now()
         logger.info("trnsec initialization started")
         
@@ -64,59 +101,106 @@ EMPL NO: 8483-0 HR NO: U4425 NAME: ALISON OLDHAM                    BR NO: 620 L
         self.logger            = logger
         self.debug             = debug
         self.buffers           = []
-        self.transaction_codes = {}
+        self.transaction_codes = {}         # (assn, level) -> transaction codes
+        self.level             = None
+        self.assn              = None
+        self.fields            = [codec.memo(conversion) for conversion in self.FIELD_CONVERSIONS]
         
-        if type(fp) is not file and fp.mode != 'r':
+        if getattr(fp, 'mode', None) not in ('r', 'rb'):
             raise TypeError("first argument must be a file object opened for read")
 
         end_tm = datetime.datetime.now()
         self.logger.info("trnsec initialization complete (elapsed time: {0})".format(end_tm - start_tm))
+        self.metrics.stop('init')
 
-    def parse(self):
-        start_tm = datetime.datetime.now()
-        self.logger.info("starting parse")
+    def scan_state(self, line):
+        """
+        scan_state - update the cross-page state ('PAGE_STATE') for 'line' without
+                     parsing it
+        """
+        if line.startswith(b" "):
+            lvl_mtch = self.TRSEC_LEVEL_LINE.match(line)
+            if lvl_mtch is not None:
+                self.level = codec.to_str(lvl_mtch.group('level'))
 
-        level = None
-        old_level = None
-        trans_codes = []
+    def records(self):
+        """
+        records - generator yielding parsed employee rows one at a time
+
+        Lines come from classify.lines() (the memory mapped report when it is on
+        disk), already classified by 'LINE_PREFIXES', so only the current line
+        is held in memory and each line is matched against at most the regular
+        expressions of its class.  Transaction codes
+        are collected per association and authority level in
+        'transaction_codes' (keyed by (assn, level): each association grants
+        its own levels) as a side effect; the current level is kept in 'level'
+        so parsing can start part way through a report.  'assn' holds the
+        association number from the current page header.  LAST PIN CHG comes back as a date (codec.rptdate)
+        and repeated values are shared between rows ('FIELD_CONVERSIONS').
+        Lines read are counted by class in 'line_counts'; lines matching none
+        of the patterns are 'skipped'.
+        """
+        counts = self.line_counts
+        fields = self.fields
+        memos = [field.values for field in fields]          # looked up directly; a miss calls the memo
+        trans_codes = self.transaction_codes.setdefault((self.assn, self.level), []) if self.level is not None else []
         
-        for line in self.fp.readlines():
-            hdr_mtch = self.TRSEC_RPT_HEADER.match(line.rstrip("\n"))
-            if hdr_mtch is not None:
-                continue
-            
-            lvl_mtch = self.TRSEC_LEVEL_LINE.match(line.rstrip("\n"))
-            if lvl_mtch is not None:
-                level = lvl_mtch.groups('level')
-                if old_level != level:
-                    self.transaction_codes[old_level] = trans_codes
-                    trans_codes = list()
-                    old_level = level
-                    
+        for (cls, line, pos, end) in classify.lines(self.fp, self.LINE_PREFIXES, classify.SKIPPED,
+                                                    self.use_mmap, self.io_stats):
+            if cls is classify.HEADER:
+                self.assn = int(line[pos:pos + 3])
+                if self.level is not None:
+                    trans_codes = self.transaction_codes.setdefault((self.assn, self.level), [])
+                counts['header'] += 1
                 continue
+
+            if cls is classify.INDENTED:
+                lvl_mtch = self.TRSEC_LEVEL_LINE.match(line, pos, end)
+                if lvl_mtch is not None:
+                    self.level = codec.to_str(lvl_mtch.group('level'))
+                    trans_codes = self.transaction_codes.setdefault((self.assn, self.level), [])
+                    counts['level'] += 1
+                    continue
             
-            transcd_mtch = self.TRSEC_TRANSCODE.match(line.rstrip("\n"))
-            if transcd_mtch is not None:
-                for transcd in transcd_mtch.groups():
-                    trans_codes.append(transcd)
+                transcd_mtch = self.TRSEC_TRANSCODE.match(line, pos, end)
+                if transcd_mtch is not None:
+                    for transcd in codec.to_str(line[pos:end]).split():
+                        if transcd not in trans_codes:
+                            trans_codes.append(transcd)
+                    counts['transaction code'] += 1
+                    continue
+
+            if cls is not classify.DATA:
+                counts['skipped'] += 1
                 continue
 
-            line_mtch = self.TRSEC_DATA_LINE.match(line.rstrip)
-            if line.mtch is not None:
-                buf = []
+            line_mtch = self.TRSEC_DATA_LINE.match(line, pos, end)
+            if line_mtch is None:
+                counts['skipped'] += 1
+            else:
+                counts['data'] += 1
                 if len(self.column_hdrs) == 0:
                     for col in line_mtch.groups():
-                        (cname, data) = col.split(':')
-                        self.column_hdrs.append(cname)
-                        buf.append(data)
+                        self.column_hdrs.append(codec.to_str(col).split(':')[0])
 
                     if self.debug:
                         self.logger.debug("column headers: '{0}'".format(",".join(self.column_hdrs)))
-                else:
-                    for col in line.mtch.groups():
-                        buf.append(col.split(':')[1].rstrip(' '))
 
-                self.buffers.append(buf)
+                cols = line_mtch.groups()
+                buf = list(map(dict.get, memos, cols))
+                if None in buf:
+                    buf = [convert(col) if value is None else value for (convert, col, value) in zip(fields, cols, buf)]
+                yield buf
+
+    def parse(self, rows=None):
+        self.metrics.start('parse')
+        start_tm = datetime.datetime.now()
+        self.logger.info("starting parse")
+        if rows is None:
+            rows = self.records()
+
+        for buf in rows:
+            self.buffers.append(buf)
 
         if self.debug:
             self.logger.debug("trnesec column headers created: {0:d}".format(len(self.column_hdrs)))
@@ -125,29 +209,48 @@ EMPL NO: 8483-0 HR NO: U4425 NAME: ALISON OLDHAM                    BR NO: 620 L
             
         end_tm = datetime.datetime.now()            
         self.logger.info("parse complete (elapsed time: {0})".format(end_tm - start_tm))
+        self.metrics.stop('parse', len(self.buffers))
             
-    def write_data(self):
-        from os import getcwd
-        
+    def write_data(self, output=None):
+        """
+        write_data - write the parsed rows in 'buffers' (see sinks.open_sink() for 'output')
+
+        Returns the number of rows written.
+        """
+        self.metrics.start('write')
         start_tm = datetime.datetime.now()
         self.logger.info("start write_data")
-        fname = "{0}/{1}.csv".format(getcwd(), splitext(basename(self.fp.name))[0])
-        with open(fname, "wb") as csv_fp:
-            self.logger.info("writing parsed data to {0}".format(fname))
-            writer = csv.writer(csv_fp, dialect='excel', delimiter=',')
-            writer.writerow(self.column_hdrs)
-            
-            written_buf = 0
-            for buf in self.buffers:
-                writer.writerow(buf)
-                written_buf += 1
-                
-            if self.debug:
-                self.logger.info("buffers written: {0:d}".format(written_buf))
-                
-            end_tm = datetime.datetime.now()
-            self.logger.info("write_data complete (elapsed time: {0})".format(end_tm - start_tm))
+        written_buf = sinks.write_rows(self, self.buffers, output)
+        if self.debug:
+            self.logger.info("buffers written: {0:d}".format(written_buf))
+
+        end_tm = datetime.datetime.now()
+        self.logger.info("write_data complete (elapsed time: {0})".format(end_tm - start_tm))
+        self.metrics.stop('write', written_buf)
+        return written_buf
 
+    def stream_data(self, rows=None, output=None):
+        """
+        stream_data - parse and write in a single pass
+
+        Rows from records() (or 'rows', e.g. from shard.records()) go straight to
+        the output; 'buffers' is not used, so memory use does not grow with the
+        size of the report.
+        """
+        self.metrics.start('stream')
+        start_tm = datetime.datetime.now()
+        self.logger.info("start stream_data")
+        if rows is None:
+            rows = self.records()
+
+        written_buf = sinks.write_rows(self, rows, output)
+        if self.debug:
+            self.logger.info("buffers written: {0:d}".format(written_buf))
+
+        end_tm = datetime.datetime.now()
+        self.logger.info("stream_data complete (elapsed time: {0})".format(end_tm - start_tm))
+        self.metrics.stop('stream', written_buf)
+        return written_buf
 
 if __name__ == "__main__":
     start_time = datetime.datetime.now()
@@ -165,7 +268,7 @@ if __name__ == "__main__":
         if len(sys.argv) != 2:
             raise ValueError("usage: {0} tslist_input_fname tslist_out_fname.csv".format(basename(sys.argv[0])))
         
-        file_parser = trnsec(open(sys.argv[1], "r"), root, True)
+        file_parser = trnsec(open(sys.argv[1], "rb"), root, True)
         file_parser.parse()
         file_parser.write_data()
         
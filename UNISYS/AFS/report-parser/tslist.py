@@ -6,14 +6,17 @@ Created on Feb 29, 2016
 
 import re
 import sys
-import csv
-import struct
 import logging
 import datetime
-import cStringIO
+import itertools
 from os.path import basename
 from os.path import splitext
 
+import codec
+import classify
+import metrics
+import sinks
+
 class tslist(object):
     """
     tslist - Module to parse TSLIST table data
@@ -111,51 +114,75 @@ CF CLT 00 5130 FM COLLAT TRACK TEST
     #
     #   class variables
     #
+    VERSION            = "1.1"                         # bump when parsed output changes (see rptcache.py)
+    REPORT_TITLE       = "SECURITY TRANSACTION LIST"   # see batch.detect_type()
     column_hdrs        = []
-    TSLIST_RPT_HEADER  = re.compile(r"^(?P<rpt>00[1|2])")
-    TSLIST_COL_HDR     = re.compile(r"^AP TRC ")
+    TSLIST_RPT_HEADER  = re.compile(br"^(?P<rpt>00[1|2])", re.M)   # re.M: '^' matches at a line
+    TSLIST_COL_HDR     = re.compile(br"^AP TRC ", re.M)             # offset in the mmap'd report
     TSLIST_LINE_LENGTH = 38                     # see Report format above
-    cnv_text           = lambda s: s.rstrip()   # helper function for input file field conversion
+    PAGE_HDR           = TSLIST_RPT_HEADER      # first line of every report page
+    PAGE_STATE         = ('hdr_lvl', 'old_hdr_lvl')     # parse state carried across pages
+    RESUME_STATE       = ('column_hdrs', 'hdr_lvl', 'old_hdr_lvl')     # saved by checkpoint.py
+    LINE_STATE         = ('hdr_lvl', 'old_hdr_lvl')     # state a data line is decoded with (see rptindex.py)
+    use_mmap           = True                   # read reports on disk through lineio's mmap
+    SQL_TYPES          = {'ASSN #': 'INTEGER', 'Assigned level': 'INTEGER', 'TRANS ID': 'INTEGER', 'JOB ID': 'INTEGER'}
+    SQL_INDEXES        = ('TRX#', 'Assigned level', 'TRANS ID', 'JOB ID')     # see sinks.sqlite_sink
+    normalized         = False                  # one row per transaction (see write_normalized())
+    PARSE_OPTIONS      = ('normalized',)        # copied to shard.py workers, part of the rptcache.py key
+    LINE_CLASSES       = ('header', 'column header', 'data', 'skipped')     # see metrics.py
+    LINE_PREFIXES      = classify.prefix_table((    # see classify.lines(); anything else is data
+        (b'001',     classify.HEADER),
+        (b'002',     classify.HEADER),
+        (b'AP TRC ', classify.COLUMN_HEADER),
+    ))
+    JOB_HDRS           = ['TRANS ID', 'JOB ID'] # transaction -> job ID file (normalized output)
+    NORMALIZED_BATCH   = 10000                  # transactions per write to the two normalized sinks
+    cnv_text           = codec.cnv_text         # helper function for input file field conversion
 
     fieldspecs         = [
-        # column_namne  start_pos  len, conversion_function (defined at the script level)
-        ('AP',          0,         2,   cnv_text),
-        ('TRC',         3,         3,   cnv_text),
-        ('LN',          7,         2,   cnv_text),
-        ('TRX',         10,        4,   cnv_text),
-        ('TT',          15,        2,   cnv_text),
-        ('DESC',        18,        19,  cnv_text),
+        # column_namne  start_pos (1-based column, see the ruler above)  len, conversion_function (defined at the script level)
+        ('AP',          1,         2,   cnv_text),
+        ('TRC',         4,         3,   cnv_text),
+        ('LN',          8,         2,   cnv_text),
+        ('TRX',         11,        4,   cnv_text),
+        ('TT',          16,        2,   cnv_text),
+        ('DESC',        19,        19,  cnv_text),
     ]
 
+    #
+    #    a data line of the sample above and its fields (see codec.check())
+    #
+    LAYOUT_SAMPLE      = (b"CD AIN 00 4401 IQ ACCRUED INT INQ     06 08 71 72 82 84",
+                          ['CD', 'AIN', '00', '4401', 'IQ', 'ACCRUED INT INQ'])
+
     def __init__(self, fp, logger, debug=False):
+        self.line_counts = dict.fromkeys(self.LINE_CLASSES, 0)     # see metrics.py
+        self.io_stats    = {'bytes': 0}
+        self.metrics     = metrics.metrics(self)
+        self.metrics.start('init')
         start_tm = datetime.datetime.now()
         logger.info("tslist initialization started")
         
-        if type(fp) is not file and fp.mode != 'r':
+        if getattr(fp, 'mode', None) not in ('r', 'rb'):
             raise TypeError("tslist: first argument must be a file object opened for read")
 
         self.fp     = fp
         self.logger = logger
         self.debug  = debug
         self.buffers = []
+        self.hdr_lvl     = -1
+        self.old_hdr_lvl = None
+
+        self.codec  = codec.get_codec(self.fieldspecs)
+        self.decode = self.codec.decode
+        self.codec.check(*self.LAYOUT_SAMPLE)
 
-        unpack_len = 0
-        unpack_fmt = ""
-        for fieldspec in self.fieldspecs:
-            start = fieldspec[1] - 1
-            end = start + fieldspec[2]
-            if start > unpack_len:
-                unpack_fmt += str(start - unpack_len) + "x"
-            unpack_fmt += str(end - start) + "s"
-            unpack_len = end
-
-        self.field_indices = range(len(self.fieldspecs))
         if self.debug:
-            self.logger.debug("unpack_len = {0}, unpack_fmt = {1}".format(unpack_len, unpack_fmt))
+            self.logger.debug("unpack_len = {0}, unpack_fmt = {1}".format(self.codec.unpack_len, self.codec.unpack_fmt))
 
-        self.unpacker = struct.Struct(unpack_fmt).unpack_from
         end_tm = datetime.datetime.now()
         self.logger.info("tslist initialization complete (elapsed time: {0})".format(end_tm - start_tm))
+        self.metrics.stop('init')
 
     def _test_array_numeric(self, arr):
         if self.debug:
@@ -182,32 +209,52 @@ CF CLT 00 5130 FM COLLAT TRACK TEST
             
         return valid_hdr
         
-    def parse(self):
+    def scan_state(self, line):
         """
-        parse - parse data lines
-
-        Parsed data lines are saved to the class variable 'buffers'
+        scan_state - update the cross-page state ('PAGE_STATE') for 'line' without
+                     decoding it.  Mirrors the association handling in records().
         """
-        start_tm = datetime.datetime.now()
-        self.logger.info("starting parse")
-        hdr_lvl     = -1
-        old_hdr_lvl = None
-
-        for line in self.fp.readlines():
-            hdr_mtch = self.TSLIST_RPT_HEADER.match(line.rstrip("\n"))
-            if hdr_mtch is not None:
-                if not "SECURITY TRANSACTION LIST" in line:
+        hdr_mtch = self.TSLIST_RPT_HEADER.match(line)
+        if hdr_mtch is not None:
+            self.hdr_lvl = int(hdr_mtch.groups('rpt')[0])
+            if self.old_hdr_lvl is None:
+                self.old_hdr_lvl = self.hdr_lvl
+        elif self.TSLIST_COL_HDR.match(line) is None:
+            self.old_hdr_lvl = self.hdr_lvl
+
+    def records(self):
+        """
+        records - generator yielding parsed data rows one at a time
+
+        Lines come from classify.lines(), already classified by 'LINE_PREFIXES':
+        for a report on disk, each data line is decoded by the compiled codec
+        (see codec.py) at its offset in the memory mapped file, so no line
+        string, padded copy or StringIO is built.  Short
+        lines (no JOB DESCRIPTIONS) are sliced field by field instead of being
+        padded.  A line with several job IDs yields one row per job ID, or, when
+        'normalized' is set, a single row whose last field is the space separated
+        job ID list ("" when there is none).  The association number is kept in
+        'hdr_lvl' and 'old_hdr_lvl' so parsing can start part way through a
+        report (see shard.py).  Lines read are counted by class in 'line_counts';
+        a data line with a non-numeric job ID list is 'skipped'.
+        """
+        counts = self.line_counts
+        for (cls, line, pos, end) in classify.lines(self.fp, self.LINE_PREFIXES, classify.DATA,
+                                                    self.use_mmap, self.io_stats):
+            if cls is classify.HEADER:
+                if line.find(b"SECURITY TRANSACTION LIST", pos, end) < 0:
                     raise ValueError("invalid report header: expected \"SECURITY TRANSACTION LIST\" in header line")
                 
-                hdr_lvl = int(hdr_mtch.groups('rpt')[0])
-                if old_hdr_lvl is None:
-                    old_hdr_lvl = hdr_lvl
-                continue
-
-            colhdr_mtch = self.TSLIST_COL_HDR.match(line.rstrip("\n"))
-            if colhdr_mtch is not None:
+                self.hdr_lvl = int(line[pos:pos + 3])
+                if self.old_hdr_lvl is None:
+                    self.old_hdr_lvl = self.hdr_lvl
+                counts['header'] += 1
+
+            elif cls is classify.COLUMN_HEADER:
+                counts['column header'] += 1
+                line = codec.to_str(line[pos:end])
                 if not self._validate_column_header(line):
-                    raise ValueError("invalid column header: expected \"{0}\": found \"{1}\"".format(line))
+                    raise ValueError("invalid column header: found \"{0}\"".format(line))
 
                 if len(self.column_hdrs) == 0:
                     self.column_hdrs.append('ASSN #')
@@ -223,40 +270,50 @@ CF CLT 00 5130 FM COLLAT TRACK TEST
                     if self.debug:
                         self.logger.debug("tslist column headers: {0}".format(",".join(self.column_hdrs)))
             else:
-                if len(line.rstrip("\n")) < self.TSLIST_LINE_LENGTH:
-                    field_line = "{0:<38}".format(line.rstrip("\n"))
-                else:
-                    field_line = line[:].rstrip("\n")
+                buf = self.decode(line, pos, end)
+                buf.insert(5, "{0}-{1}{2}".format(buf[4], buf[0], buf[1]))      # TRNSEC code
+                buf.insert(0, self.old_hdr_lvl)
 
                 job_descriptions = None
-                if len(line.rstrip("\n")) > self.TSLIST_LINE_LENGTH:
-                    job_descriptions = "{0}".format(line[38:].lstrip().rstrip("\n"))
-
-                f = cStringIO.StringIO(field_line)
-                buf = []
-                buf.append(old_hdr_lvl)
-                for ln in f:
-                    flds = self.unpacker(ln)
-                    for i in self.field_indices:
-                        if i == 5:
-                            buf.append("{0}-{1}{2}".format(buf[5], buf[1], buf[2]))
-                        buf.append(self.fieldspecs[i][3](flds[i]))                        
-
-
-                if job_descriptions is not None:
+                if end - pos > self.TSLIST_LINE_LENGTH:
+                    job_descriptions = codec.to_str(line[pos + self.TSLIST_LINE_LENGTH:end]).lstrip()
+
+                if job_descriptions is not None and not self._test_array_numeric(job_descriptions.split(' ')):
+                    counts['skipped'] += 1
+                elif self.normalized:
+                    counts['data'] += 1
+                    buf.append(job_descriptions or "")
+                    yield buf
+                elif job_descriptions is not None:
+                    counts['data'] += 1
                     original_buf = list(buf)
                     job_ids = job_descriptions.split(' ')
-                    if self._test_array_numeric(job_ids):
-                        for job_id in job_ids:
-                            buf.append("={0}".format(job_id))
-                            self.buffers.append(buf)
-                            buf = list()
-                            buf = list(original_buf)
+                    for job_id in job_ids:
+                        buf.append("={0}".format(job_id))
+                        yield buf
+                        buf = list()
+                        buf = list(original_buf)
                 else:
-                    self.buffers.append(buf)
+                    counts['data'] += 1
+                    yield buf
+
+                if self.old_hdr_lvl != self.hdr_lvl:
+                    self.old_hdr_lvl = self.hdr_lvl
+
+    def parse(self, rows=None):
+        """
+        parse - parse data lines
+
+        Parsed data lines are saved to the class variable 'buffers'
+        """
+        self.metrics.start('parse')
+        start_tm = datetime.datetime.now()
+        self.logger.info("starting parse")
+        if rows is None:
+            rows = self.records()
 
-                if old_hdr_lvl != hdr_lvl:
-                    old_hdr_lvl = hdr_lvl
+        for buf in rows:
+            self.buffers.append(buf)
 
         if self.debug:
             self.logger.debug("tslist column headers created: {0:d}".format(len(self.column_hdrs)))
@@ -264,28 +321,106 @@ CF CLT 00 5130 FM COLLAT TRACK TEST
 
         end_tm = datetime.datetime.now()            
         self.logger.info("parse complete (elapsed time: {0})".format(end_tm - start_tm))
+        self.metrics.stop('parse', len(self.buffers))
         
-    def write_data(self):
-        from os import getcwd
-        
+    def write_data(self, output=None):
+        """
+        write_data - write the parsed rows in 'buffers' (see sinks.open_sink() for 'output')
+
+        Returns the number of rows written.
+        """
+        self.metrics.start('write')
         start_tm = datetime.datetime.now()
         self.logger.info("start write_data")
-        fname = "{0}/{1}.csv".format(getcwd(), splitext(basename(self.fp.name))[0])
-        with open(fname, "wb") as csv_fp:
-            self.logger.info("writing parsed data to {0}".format(fname))
-            writer = csv.writer(csv_fp, dialect='excel', delimiter=',')
-            writer.writerow(self.column_hdrs)
-            
-            written_buf = 0
-            for buf in self.buffers:
-                writer.writerow(buf)
-                written_buf += 1
-                
-            if self.debug:
-                self.logger.info("buffers written: {0:d}".format(written_buf))
-                
-            end_tm = datetime.datetime.now()
-            self.logger.info("write_data complete (elapsed time: {0})".format(end_tm - start_tm))
+        if self.normalized:
+            written_buf = self.write_normalized(self.buffers, output)
+        else:
+            written_buf = sinks.write_rows(self, self.buffers, output)
+        if self.debug:
+            self.logger.info("buffers written: {0:d}".format(written_buf))
+
+        end_tm = datetime.datetime.now()
+        self.logger.info("write_data complete (elapsed time: {0})".format(end_tm - start_tm))
+        self.metrics.stop('write', written_buf)
+        return written_buf
+
+    def stream_data(self, rows=None, output=None):
+        """
+        stream_data - parse and write in a single pass
+
+        Rows from records() (or 'rows', e.g. from shard.records()) go straight to
+        the output; 'buffers' is not used, so memory use does not grow with the
+        size of the report.
+        """
+        self.metrics.start('stream')
+        start_tm = datetime.datetime.now()
+        self.logger.info("start stream_data")
+        if rows is None:
+            rows = self.records()
+
+        if self.normalized:
+            written_buf = self.write_normalized(rows, output)
+        else:
+            written_buf = sinks.write_rows(self, rows, output)
+        if self.debug:
+            self.logger.info("buffers written: {0:d}".format(written_buf))
+
+        end_tm = datetime.datetime.now()
+        self.logger.info("stream_data complete (elapsed time: {0})".format(end_tm - start_tm))
+        self.metrics.stop('stream', written_buf)
+        return written_buf
+
+    def write_normalized(self, rows, output=None):
+        """
+        write_normalized - write normalized rows (see records()) as two tables
+
+        <output>_transactions holds one row per transaction keyed by a TRANS ID
+        assigned in report order; <output>_jobs holds one (TRANS ID, JOB ID) row
+        per job ID assigned to it.  For SQLite output the two are tables
+        tslist_transactions and tslist_jobs.  Both sinks are fed in batches of
+        NORMALIZED_BATCH transactions, so 'rows' may be a generator.  Memory use
+        for parse() is one row per transaction rather than one per job ID.  Returns the
+        number of transactions written.
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is not None:
+            rows = itertools.chain([first], rows)
+
+        trans_sink = sinks.open_sink(self, output, "_transactions")
+        jobs_sink  = sinks.open_sink(self, output, "_jobs")
+        trans_sink.open(['TRANS ID'] + self.column_hdrs[:-1])
+        try:
+            jobs_sink.open(self.JOB_HDRS)
+            try:
+                trans_id = 0
+                while True:
+                    batch = list(itertools.islice(rows, self.NORMALIZED_BATCH))
+                    if len(batch) == 0:
+                        break
+
+                    trans_bufs = []
+                    job_bufs   = []
+                    for buf in batch:
+                        trans_id += 1
+                        trans_bufs.append([trans_id] + buf[:-1])
+                        if buf[-1]:
+                            job_bufs.extend([trans_id, "={0}".format(job_id)] for job_id in buf[-1].split(' '))
+
+                    #
+                    #    both tables may be in one SQLite database; commit each
+                    #    batch so neither sink holds the write lock
+                    #
+                    trans_sink.write(trans_bufs)
+                    trans_sink.checkpoint()
+                    jobs_sink.write(job_bufs)
+                    jobs_sink.checkpoint()
+            finally:
+                jobs_sink.close()
+        finally:
+            trans_sink.close()
+
+        return trans_id
 
 if __name__ == "__main__":
     start_time = datetime.datetime.now()
@@ -303,7 +438,7 @@ if __name__ == "__main__":
             raise ValueError("usage: {0} tslist_input_fname tslist_out_fname.csv".format(basename(sys.argv[0])))
 
         root.info("start {0}".format(basename(sys.argv[0])))
-        file_parser = tslist(open(sys.argv[1], "r"), root, True)
+        file_parser = tslist(open(sys.argv[1], "rb"), root, True)
         file_parser.parse()
         file_parser.write_data()
 